@@ -0,0 +1,63 @@
+"""
+Band-limited oscillators against the naive wav forms
+----------------------------------------------------
+Renders a whole system with every naive wav form and its
+PolyBLEP counterpart, reporting render time and the aliasing
+left in the upper octaves (energy off the harmonics, in dB)
+
+    python -m benchmarks.band_limited [--notes 88] [--duration 1.0]
+"""
+import argparse
+from core import np, time, util, Hz, Wav, PolyBlep
+
+
+def alias_db(carrier: np.ndarray, hz: float, sr: int) -> float:
+
+    """
+    Energy outside the harmonics of a tone relative to the harmonics
+    -----------------------------------------------------------------
+    """
+    spectrum = np.abs(np.fft.rfft(carrier * np.hanning(len(carrier))))**2
+    freqs = np.fft.rfftfreq(len(carrier), 1 / sr)
+    # bins within a few hz of a harmonic (or dc) belong to the tone
+    nearest = np.round(freqs / hz) * hz
+    harmonic = (np.abs(freqs - nearest) < 4 * sr / len(carrier)) & (nearest <= sr / 2)
+
+    return 10 * np.log10(spectrum[~harmonic].sum() / spectrum[harmonic].sum())
+
+
+def run(n_notes: int, duration: float, repeat: int):
+
+    config = Wav.default_config()._replace(duration=duration)
+    freqs = list(Hz(util.Transform.pitch_to_hz['A'][0], config=config).make_system(n_notes).values())
+    # aliasing is measured on the top octave
+    upper = freqs[-12:]
+
+    print(f"{n_notes} notes x {duration}s at {config.sr}hz, best of {repeat}")
+    print(f"{'wav form':<18}{'render (s)':>12}{'per note (ms)':>15}{'alias (dB)':>12}")
+
+    for band_limited, naive in PolyBlep.wav_types.items():
+        for wav_type in (naive, band_limited):
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _, block in Wav.iter_system(freqs, wav_type, config=config):
+                    pass
+                timings.append(time.perf_counter() - start)
+
+            alias = np.mean([alias_db(Wav(hz, config=config).carrier(wav_type), hz, config.sr)
+                                for hz in upper])
+            best = min(timings)
+            print(f"{wav_type:<18}{best:>12.3f}{1000 * best / n_notes:>15.2f}{alias:>12.1f}")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notes', type=int, default=88)
+    parser.add_argument('--duration', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    run(n_notes=args.notes, duration=args.duration, repeat=args.repeat)
@@ -0,0 +1,306 @@
+"""
+Benchmark suite
+---------------
+Times note synthesis, system generation, sample pack builds
+(on disk, and queued as the ui builds them), zip packaging,
+manifest catalogues, full length views and pitch detection, with
+the peak traced memory of every case, and the cold import of the
+core and of the web application, and stores the results as JSON
+
+    python -m benchmarks.suite [--quick] [--out results.json]
+    python -m benchmarks.suite --compare baseline.json [--tolerance 0.15]
+
+Comparing reruns the suite and flags every case slower (or with
+a higher memory peak) than the baseline by more than the tolerance,
+exiting with 1 if anything regressed
+"""
+import sys
+import platform
+import subprocess
+import argparse
+import tracemalloc
+import scipy
+from core import (os, json, time, tempfile, np, util, Hz, Wav, Pack, Archive, Riff,
+                    Tracker, Views, Modulation, Loop, Instrument, Batch, JOBS, RENDER_CACHE,
+                    RenderConfig, Dict, List, Callable)
+
+# cases of a full run and of a quick run
+FULL = {'duration': 10.0, 'systems': [['semi_tone', 12], ['semi_tone', 88], ['quarter_tone', 48]],
+        'system_sizes': [88, 10**6], 'detect_size': 10**6, 'track_duration': 30.0}
+QUICK = {'duration': 1.0, 'systems': [['semi_tone', 12], ['quarter_tone', 48]],
+            'system_sizes': [88, 10**5], 'detect_size': 10**5, 'track_duration': 5.0}
+
+
+def measure(run: Callable[[], None], repeat: int) -> Dict[str, float]:
+
+    """
+    Times a case and traces its memory
+    ----------------------------------
+    Returns:
+        - best wall time of 'repeat' runs and the peak traced
+        memory of one further run (tracing slows the run down,
+        so it is never timed)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def startup(module: str, repeat: int) -> Dict[str, float]:
+
+    """
+    Measures a cold import in a fresh interpreter
+    ---------------------------------------------
+    Returns:
+        - best import time of 'repeat' interpreters and their
+        peak resident memory (in place of the traced peak)
+
+    The peak is the high water mark of the interpreter itself (VmHWM,
+    linux only), ru_maxrss would be inherited from the suite it is
+    started from and report the peak of the suite instead
+    """
+    probe = ("import time; start = time.perf_counter(); import {}; seconds = time.perf_counter() - start; "
+                "status = open('/proc/self/status').read().split('VmHWM:')[1].split(); "
+                "print(seconds, status[0])")
+    timings, peaks = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe.format(module)], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)) or '.')
+        seconds, hwm = output.stdout.split()[-2:]
+        timings.append(float(seconds))
+        # VmHWM is in kilobytes
+        peaks.append(int(hwm) * 1024)
+
+    return {'seconds': min(timings), 'peak_bytes': max(peaks)}
+
+
+def system(name: str, size: int) -> List[float]:
+    config = Wav.default_config()._replace(tone_intvl=name)
+    return Hz(util.Transform.pitch_to_hz['A'][0], config=config).system_array(size).tolist()
+
+
+def queued(freqs: List[float], config: RenderConfig) -> str:
+
+    """
+    Builds a pack the way the ui does
+    ---------------------------------
+    The pack is zipped in memory by Archive.build_zip on the job
+    pool, it and its notes are discarded from the render cache
+    first so every run renders them
+    """
+    key = Archive.pack_key(freqs=freqs, wav_type='sine', config=config, compression=None, layout='files')
+    for cached in [key] + [Archive.note_key(freq, 'sine', config) for freq in freqs]:
+        RENDER_CACHE.discard(cached)
+
+    def render(job) -> str:
+        Archive.build_zip(freqs=freqs, wav_type='sine', config=config, progress=job.advance)
+        return key
+
+    job = JOBS.submit(render, total=len(freqs))
+    while True:
+        # read before checking, so a change in between is not waited for
+        version = job.version
+        if job.finished:
+            break
+        job.wait(version)
+
+    if job.state != 'done':
+        raise RuntimeError(f"job {job.state}: {job.to_dict()['error']}")
+
+    return job.result
+
+
+def cases(scale: Dict, scratch: str, only: str=None) -> Dict[str, Callable[[], None]]:
+
+    """
+    Builds every case of the suite
+    ------------------------------
+    Renders go through the same code as the app but never
+    through the render cache, so every run does the full work.
+    Setup shared by the runs of a case (notes, recordings) is only
+    done when the case is not filtered out by 'only'
+    """
+    config = Wav.default_config()._replace(duration=scale['duration'])
+    runs = {}
+
+    def wanted(name: str) -> bool:
+        return not only or name.startswith(only)
+
+    # a single note of every wav form, and written as a wav file
+    for wav_type in Wav.wav_types:
+        runs[f"note/{wav_type}"] = lambda wav_type=wav_type: Wav(440.0, config=config).carrier(wav_type)
+    runs['note/make_wav'] = lambda: Wav(440.0, config=config).make_wav('sine', directory=scratch)
+
+    # pitch systems a cent apart, as the dict the ui uses and as an array
+    for size in scale['system_sizes']:
+        if size <= 10**4:
+            runs[f"system/make_system/{size}"] = lambda size=size: util.Network.make_system(
+                                                    27.5, 2**(1/1200), size)
+        runs[f"system/system_array/{size}"] = lambda size=size: util.Network.system_array(
+                                                    27.5, 2**(1/1200), size)
+
+    # a thousand Hz objects of the finest named system, tunings come from the registry
+    fine = config._replace(tone_intvl='twenty_fourth_tone')
+    runs['system/hz/1000'] = lambda: [Hz(440.0, config=fine) for _ in range(1000)]
+
+    # a 13-limit just intonation lattice of 59049 ratios
+    runs['system/lattice/13-limit'] = lambda: util.Network.lattice(limit=13, bounds=4)
+
+    # whole packs written to disk and streamed as zip files
+    for name, size in scale['systems']:
+        freqs = system(name, size)
+        runs[f"pack/render/{name}/{size}"] = lambda freqs=freqs: Pack.render(freqs, 'sine', directory=scratch,
+                                                                                config=config)
+        runs[f"pack/zip/{name}/{size}"] = lambda freqs=freqs: b''.join(Archive.stream_zip(
+            (f"{freq}.wav", Riff.size(config.n_samples), [Archive.wav_bytes(freq, 'sine', config)])
+            for freq in freqs))
+        runs[f"pack/job/{name}/{size}"] = lambda freqs=freqs: queued(freqs, config)
+
+    # modulated packs, to be compared with pack/render/semi_tone/12
+    freqs = system('semi_tone', 12)
+    for modulation in Modulation.types[1:]:
+        modulated = config._replace(modulation=modulation, attack=0.05, release=0.5)
+        runs[f"pack/modulated/{modulation}/12"] = lambda freqs=freqs, modulated=modulated: Pack.render(
+                                                    freqs, 'sine', directory=scratch, config=modulated)
+
+    # the same packs as one instrument wav file
+    for name, size in scale['systems']:
+        runs[f"pack/instrument/{name}/{size}"] = lambda freqs=system(name, size): Instrument.write(
+                                                    freqs, 'sine', directory=scratch, config=config)
+
+    # the same packs as single loops
+    for name, size in scale['systems']:
+        looped = config._replace(loop=True)
+        runs[f"pack/loop/{name}/{size}"] = lambda freqs=system(name, size), looped=looped: b''.join(
+            Archive.stream_zip((f"{freq}.wav", Loop.size(freq, looped), [Archive.wav_bytes(freq, 'sine', looped)])
+                                for freq in freqs))
+
+    # a catalogue of overlapping packs from a manifest, into a fresh root every run
+    catalogue = {'defaults': {'hz': 110.0, 'duration': scale['duration']},
+                    'packs': [{'system': ['semi_tone', 'quarter_tone'], 'format': 'zip'},
+                                {'system': ['semi_tone', 'quarter_tone']},
+                                {'system': 'semi_tone', 'layout': 'instrument'}]}
+    runs['batch/catalogue'] = lambda: Batch.run(catalogue, root=tempfile.mkdtemp(dir=scratch))
+
+    # packaging alone, the notes are rendered once up front
+    if wanted('zip/stored/12'):
+        notes = [Archive.wav_bytes(freq, 'sine', config) for freq in system('semi_tone', 12)]
+        runs['zip/stored/12'] = lambda: b''.join(Archive.stream_zip(
+            (f"{n}.wav", len(note), [note]) for n, note in enumerate(notes)))
+
+    # full length views, decimated as they are rendered
+    runs['view/note_envelope'] = lambda: Views.note_envelope(440.0, 'sawtooth', config)
+    runs['view/system_envelope/88'] = lambda: Views.system_envelope(system('semi_tone', 88), 'sine', config)
+    runs['view/spectrogram'] = lambda: Views.spectrogram(440.0, 'sawtooth', config)
+
+    # pitch detection of known frequencies and of a recording
+    if wanted(f"detect/{scale['detect_size']}"):
+        freqs = util.Network.system_array(20.0, 2**(1/1200), scale['detect_size'])
+        runs[f"detect/{scale['detect_size']}"] = lambda: util.Detect.detect(freqs)
+    if wanted('detect/track'):
+        recording = Wav(220.0, config=config._replace(duration=scale['track_duration'])).stream_wav(
+                        'sawtooth_blep', path=os.path.join(scratch, 'recording.wav'))
+        runs['detect/track'] = lambda: Tracker.track(recording)
+
+    return runs
+
+
+def run(quick: bool=False, repeat: int=3, only: str=None) -> Dict:
+
+    """
+    Runs the suite
+    --------------
+    Returns:
+        - environment of the run and the results of every case
+    """
+    scale = QUICK if quick else FULL
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix='pitchcraft_bench_') as scratch:
+        runs = dict(cases(scale, scratch, only), **{
+            # the headless core and the whole web application
+            f"startup/{module}": (lambda module=module: startup(module, repeat)) for module in ('core', 'app')
+        })
+        for name, case in runs.items():
+            if only and not name.startswith(only):
+                continue
+            results[name] = case() if name.startswith('startup/') else measure(case, repeat)
+            print(f"{name:<36}{results[name]['seconds']:>10.4f} s{results[name]['peak_bytes'] / 2**20:>10.1f} MiB",
+                    flush=True)
+
+    return {
+        'environment': {
+            'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'scale': dict(scale, quick=quick, repeat=repeat),
+        'results': results
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, floor: float=0.002) -> List[str]:
+
+    """
+    Flags the cases that regressed against a baseline
+    -------------------------------------------------
+    Receives:
+        - results of this run and of the baseline
+        - allowed relative increase of time and memory
+        - slow downs of less than 'floor' seconds are timing noise
+    Returns:
+        - description of every regression
+    """
+    if results['scale'] != baseline['scale']:
+        print("warning: the baseline was run at a different scale")
+
+    regressions = []
+    print(f"\n{'case':<36}{'time':>10}{'memory':>10}")
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]
+        ratios = {metric: result[metric] / base[metric] if base[metric] else 1.0
+                    for metric in ('seconds', 'peak_bytes')}
+        flags = [metric for metric, ratio in ratios.items() if ratio > 1 + tolerance
+                    and (metric != 'seconds' or result[metric] - base[metric] > floor)]
+        print(f"{name:<36}{ratios['seconds']:>9.2f}x{ratios['peak_bytes']:>9.2f}x  {' '.join(flags)}")
+        regressions += [f"{name} {metric} x{ratios[metric]:.2f}" for metric in flags]
+
+    return regressions
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='short notes and small systems')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best is kept')
+    parser.add_argument('--only', help='only run the cases starting with this prefix')
+    parser.add_argument('--out', help='file to store the results in')
+    parser.add_argument('--compare', help='baseline results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slow down before flagging')
+    parser.add_argument('--floor', type=float, default=0.002, help='slow downs in seconds ignored as noise')
+    args = parser.parse_args()
+
+    results = run(quick=args.quick, repeat=args.repeat, only=args.only)
+
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(results, out, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance, args.floor)
+        if regressions:
+            print('\nregressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
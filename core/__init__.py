@@ -1,27 +1,72 @@
 # python tool
+import io
+import re
 import os
-from shutil import make_archive
-from typing import List, Dict, Union, TypeVar
-# signal and wav utilities
-from scipy import signal as sg 
-from scipy.io.wavfile import read, write
+import json
+import uuid
+import time
+import struct
+import hashlib
+import zipfile
+import tempfile
+import threading
+from shutil import make_archive, copyfile, rmtree
+from itertools import product
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlencode
+from typing import List, Dict, Tuple, Union, Callable, NamedTuple, Iterable, Iterator, TypeVar
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+try:
+    # only from python 3.8, packs are rendered serially without it
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
 # math utilits
 import numpy as np
 from math import log2, pow
-# visual utility
-import matplotlib.pyplot as plt 
-# web utilities
-from flask import Flask, send_from_directory
-import dash 
-# application and server
-server = Flask(__name__)
-server.config['SECRET_KEY'] = 'pitchcraftsourcery'
-server.config.from_object(__name__)
-external_style_sheet = ['https://codepen.io/chriddyp/pen/dZVMbK.css']
-APP = dash.Dash(__name__, server=server, external_stylesheets=external_style_sheet)
-# application core
+# heavy utilities are only imported on first use
+def pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+def wavfile():
+    from scipy.io import wavfile
+    return wavfile
+
+def yaml():
+    # only needed by yaml manifests, which are optional
+    import yaml
+    return yaml
+
+def figure():
+    # drawn without pyplot, so figures are never shared between threads
+    from matplotlib.figure import Figure
+    return Figure
+# application core, free of any web or plotting imports
+from core.config import *
+from core.metrics import *
+from core.oscillator import *
+from core.modulation import *
+from core.riff import *
 from core.generator import *
+from core.loop import *
+from core.pack import *
+from core.cache import *
+from core.archive import *
+from core.batch import *
+from core.views import *
+from core.jobs import *
 from core.util import *
-from core.layout import *
-from core.routes import *
-from core.callbacks import * 
\ No newline at end of file
+from core.tracker import *
+# the web application (core.web) is built on first access of one of its names
+WEB = ('server', 'APP', 'external_style_sheet', 'Flask', 'Response', 'request', 'jsonify',
+        'abort', 'send_from_directory', 'stream_with_context', 'wrap_file', 'dash')
+
+def __getattr__(name: str):
+    if name in WEB:
+        from importlib import import_module
+        return getattr(import_module('core.web'), name)
+    raise AttributeError(f"module 'core' has no attribute '{name}'")
@@ -0,0 +1,452 @@
+from core import (os, np, json, zipfile, List, Dict, Tuple, NamedTuple, Callable, Iterable,
+                    Iterator, Wav, Wavetable, Factory, BufferPool, Riff, Loop, Pack, RenderConfig, RENDER_CACHE,
+                    METRICS, util)
+ENTRY = Tuple[str, int, Iterable[bytes]]
+
+# ~ ~ ~ ~ ~ ~ Archive Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Spool:
+    """
+    Write only buffer handed to zipfile in place of a file
+    ------------------------------------------------------
+    It is neither seekable nor tellable, so zipfile writes entries
+    with data descriptors and whatever it writes can be drained
+    and sent to the client straight away
+    """
+
+    def __init__(self):
+        self.__chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.__chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.__chunks)
+        self.__chunks.clear()
+        return data
+
+
+class Archive:
+    """
+    Archive object streams sample packs as zip files
+    ------------------------------------------------
+        - Every note is rendered, framed as a wav file and emitted
+    as a zip entry while the next note is still to be rendered,
+    so nothing is staged on disk and the first bytes of the pack
+    are ready after a single block of a single note
+
+        - PCM barely compresses, entries are stored by default
+    """
+    # sets the zip compression of the entries
+    _compression: int = zipfile.ZIP_STORED
+    # entries are dated to the zip epoch, so a pack is byte for byte
+    # determined by its content address (see pack_key)
+    _date_time: tuple = (1980, 1, 1, 0, 0, 0)
+    # sets the most samples (notes times samples of a note) a requested pack may hold
+    _max_samples: int = 2**27
+
+    # a wav file per note, or one instrument (see Instrument)
+    layouts = ('files', 'instrument')
+
+    @classmethod
+    def update_compression(cls, compression: int):
+        cls._compression = compression
+
+    @classmethod
+    def update_max_samples(cls, max_samples: int):
+        cls._max_samples = max_samples
+
+    @classmethod
+    def max_notes(cls, config: RenderConfig) -> int:
+
+        """
+        Most notes a requested pack of a config may hold
+        ------------------------------------------------
+        """
+        return max(1, cls._max_samples // max(1, config.n_samples))
+
+    @staticmethod
+    def note_key(freq: float, wav_type: str, config: RenderConfig) -> str:
+
+        """
+        Content address of a single note
+        --------------------------------
+        Every setting the samples depend on is part of it, class
+        level ones (the tables of the wavetable engine) included
+        """
+        return RENDER_CACHE.key(kind='note', hz=freq, wav_type=wav_type, sr=config.sr,
+                                duration=config.duration, duty=config.duty, engine=config.engine,
+                                table=([Wavetable._table_bits, Wavetable._interpolation]
+                                        if config.engine == 'wavetable' else None),
+                                modulator_hz=config.modulator_hz, ac=config.ac, ka=config.ka,
+                                modulation=config.modulation, adsr=[config.attack, config.decay,
+                                                                    config.sustain, config.release],
+                                precision=config.precision, bit_depth=config.bit_depth,
+                                loop=[Loop._max_seconds, Loop._tolerance] if config.loop else False)
+
+    @classmethod
+    def pack_key(cls, freqs: List[float], wav_type: str, config: RenderConfig,
+                    compression: int=None, layout: str='files') -> str:
+
+        """
+        Content address of a whole pack
+        -------------------------------
+        """
+        compression = cls._compression if compression is None else compression
+        return RENDER_CACHE.key(kind='pack' if layout == 'files' else layout, compression=compression,
+                                notes=[cls.note_key(freq, wav_type, config) for freq in freqs])
+
+    @staticmethod
+    def wav_bytes(freq: float, wav_type: str, config: RenderConfig, pool: BufferPool=None) -> bytes:
+
+        """
+        Renders a single note as the bytes of a wav file
+        ------------------------------------------------
+        """
+        if config.loop:
+            return Loop.wav_bytes(freq, wav_type, config, pool)
+
+        wav = Wav(carrier_hz=freq, config=config)
+        header = Riff.header(sr=wav.sr, n_frames=wav.n_samples, bit_depth=config.bit_depth)
+        blocks = Factory._quantize_stream(wav.stream(wav_type, pool=pool), config.bit_depth, pool)
+
+        data = b''.join(Archive._frames(header, blocks, config.bit_depth))
+
+        # odd sized 24 bit data chunks are padded to a word
+        return data + b'\x00' * (Riff.size(wav.n_samples, config.bit_depth) - len(data))
+
+    @staticmethod
+    def wav_entries(freqs: List[float], wav_type: str, config: RenderConfig,
+                    notes: Callable[[float], bytes]=None) -> Iterator[ENTRY]:
+
+        """
+        Generates the wav files of a system as zip entries
+        --------------------------------------------------
+        Receives:
+            - frequencies of the system
+            - wav form type
+            - render config
+            - optional source of the wav bytes of a note (defaults
+            to the render cache)
+        Returns:
+            - (name, size, stream of bytes) for every note, each note
+            is rendered once and then served from the render cache
+        """
+        size = Riff.size(config.n_samples, config.bit_depth)
+        notes = Archive.cached_notes(wav_type, config) if notes is None else notes
+        decimals = Factory._decimals(freqs)
+
+        for freq in freqs:
+            yield (os.path.basename(Factory._wav_path(freq, wav_type, modulation=config.modulation,
+                                                        decimals=decimals)),
+                    Loop.size(freq, config) if config.loop else size,
+                    Archive._deferred(notes, freq))
+
+    @staticmethod
+    def cached_notes(wav_type: str, config: RenderConfig) -> Callable[[float], bytes]:
+
+        """
+        Wav bytes of the notes of a system, from the render cache
+        ---------------------------------------------------------
+        """
+        # the notes are rendered one after the other, sharing their buffers
+        pool = BufferPool()
+
+        return lambda freq: RENDER_CACHE.get_or_render(Archive.note_key(freq, wav_type, config),
+                                                        lambda: Archive.wav_bytes(freq, wav_type, config, pool))
+
+    @staticmethod
+    def _deferred(notes: Callable[[float], bytes], freq: float) -> Iterator[bytes]:
+        # only looked up once the entry is being written
+        yield notes(freq)
+
+    @staticmethod
+    def _frames(header: bytes, blocks: Iterable[np.ndarray], bit_depth: int=16) -> Iterator[bytes]:
+        yield header
+        for block in blocks:
+            yield Riff.frames(block, bit_depth)
+
+    @classmethod
+    def stream_zip(cls, entries: Iterable[ENTRY], compression: int=None) -> Iterator[bytes]:
+
+        """
+        Streams a zip archive of entries
+        --------------------------------
+        Receives:
+            - (name, size, stream of bytes) for every entry
+            - zip compression (defaults to the class setting)
+        Returns:
+            - consecutive chunks of the zip archive
+        """
+        compression = cls._compression if compression is None else compression
+        spool = Spool()
+
+        with zipfile.ZipFile(spool, mode='w', compression=compression) as archive:
+            for name, size, chunks in entries:
+
+                info = zipfile.ZipInfo(name, date_time=cls._date_time)
+                info.compress_type = compression
+                info.file_size = size
+
+                with archive.open(info, mode='w') as entry:
+                    for chunk in chunks:
+                        with METRICS.timed('archive'):
+                            entry.write(chunk)
+                            # an empty chunk would end a chunked response
+                            data = spool.drain()
+                        if data:
+                            METRICS.count('archive', len(data))
+                            yield data
+
+        # data descriptor of the last entry and the central directory
+        yield spool.drain()
+
+    @classmethod
+    def build_zip(cls, freqs: List[float], wav_type: str, config: RenderConfig,
+                    compression: int=None, progress: Callable[[], None]=None,
+                    layout: str='files') -> bytes:
+
+        """
+        Builds a whole sample pack as the bytes of a zip file
+        -----------------------------------------------------
+        Receives:
+            - frequencies of the system
+            - wav form type
+            - render config
+            - zip compression (defaults to the class setting)
+            - function called once every note has been written
+            - 'files' or 'instrument'
+        Returns:
+            - the zip file, served from the render cache when possible
+        """
+        key = cls.pack_key(freqs=freqs, wav_type=wav_type, config=config, compression=compression,
+                            layout=layout)
+        pack = RENDER_CACHE.get(key)
+        if pack is not None:
+            return pack
+
+        if layout == 'instrument':
+            pack = b''.join(cls.stream_zip(Instrument.entries(freqs, wav_type, config, progress),
+                                            compression=compression))
+            RENDER_CACHE.put(key, pack)
+            return pack
+
+        def entries():
+            for entry in cls.wav_entries(freqs=freqs, wav_type=wav_type, config=config):
+                yield entry
+                # resumed once the entry has been written
+                if progress is not None:
+                    progress()
+
+        pack = b''.join(cls.stream_zip(entries(), compression=compression))
+        RENDER_CACHE.put(key, pack)
+
+        return pack
+
+
+class Region(NamedTuple):
+    """
+    Place of a single note in an instrument
+    ---------------------------------------
+        - frequency and name of the note
+        - midi key it is mapped to (None past the last key)
+        - first frame and number of frames of the note
+        - first frame and the frame after the last of its loop
+        (None unless the notes are looped)
+    """
+    hz: float
+    name: str
+    key: int
+    offset: int
+    length: int
+    loop_start: int
+    loop_end: int
+
+
+class Instrument:
+    """
+    Instrument object lays a whole system out as a single wav file
+    ---------------------------------------------------------------
+        - Every note is appended to one contiguous data chunk, so a
+    client loads the whole system with one sequential read or maps
+    it with one mmap. Without loops every note has the same length
+    and the data chunk is exactly the (n_notes, n_samples) PCM of
+    Pack.render_pcm, written with a single write
+
+        - An index (json) gives the frame and byte offset, length and
+    frequency of every note, and an SFZ file maps consecutive keys
+    onto the notes with 'offset' and 'end' (and their loop points)
+    """
+    sample: str = 'instrument.wav'
+    index_name: str = 'index.json'
+    sfz_name: str = 'instrument.sfz'
+
+    @staticmethod
+    def regions(freqs: List[float], config: RenderConfig) -> List[Region]:
+
+        """
+        Lays the notes out one after the other
+        --------------------------------------
+        Receives:
+            - frequencies of the system
+            - render config
+        Returns:
+            - Region of every note, keys start at the key of the
+            first note, shifted down so as many notes as possible fit
+        """
+        pitches = util.Detect.detect(np.asarray(freqs, dtype=np.float64))
+        names = util.Detect.names(pitches.pitch_class, pitches.octave)
+        first = 12 * (int(pitches.octave[0]) + 1) + int(pitches.pitch_class[0]) if len(freqs) else 0
+        first = max(0, min(first, 128 - len(freqs)))
+
+        regions, offset = [], 0
+        for n, freq in enumerate(freqs):
+            key = first + n if first + n < 128 else None
+            if config.loop:
+                loop = Loop.points(freq, config)
+                length, loop_start, loop_end = loop.n_frames, offset + loop.head, offset + loop.n_frames
+            else:
+                length, loop_start, loop_end = config.n_samples, None, None
+            regions.append(Region(float(freq), str(names[n]), key, offset, length, loop_start, loop_end))
+            offset += length
+
+        return regions
+
+    @classmethod
+    def index(cls, regions: List[Region], config: RenderConfig) -> Dict:
+
+        """
+        Index of the notes of an instrument
+        -----------------------------------
+        Byte offsets are from the start of the wav file, the
+        data chunk starts at 'data_offset'
+        """
+        width = Riff.formats[config.bit_depth][1]
+        data_offset = len(Riff.header(sr=config.sr, n_frames=0, bit_depth=config.bit_depth))
+
+        return {
+            'sample': cls.sample, 'sr': config.sr, 'bit_depth': config.bit_depth, 'channels': 1,
+            'dtype': Riff.pcm_dtype(config.bit_depth).str if config.bit_depth != 24 else '<i3',
+            'data_offset': data_offset, 'frames': sum(region.length for region in regions),
+            'notes': [dict(region._asdict(), byte_offset=data_offset + region.offset * width,
+                            byte_length=region.length * width) for region in regions]
+        }
+
+    @classmethod
+    def sfz(cls, regions: List[Region], config: RenderConfig) -> str:
+
+        """
+        SFZ mapping of the notes of an instrument
+        -----------------------------------------
+        'end' is the last frame of a note, as SFZ expects
+        """
+        lines = [f"// {len(regions)} notes, {config.tone_intvl} system", '<control>', '<group>']
+        if config.loop:
+            lines.append(f"loop_mode=loop_continuous ampeg_release={config.release}")
+        else:
+            lines.append('loop_mode=no_loop')
+
+        for region in regions:
+            if region.key is None:
+                continue
+            line = (f"<region> sample={cls.sample} offset={region.offset} end={region.offset + region.length - 1}"
+                    f" lokey={region.key} hikey={region.key} pitch_keycenter={region.key}")
+            if region.loop_start is not None:
+                line += f" loop_start={region.loop_start} loop_end={region.loop_end - 1}"
+            lines.append(f"{line} // {region.name} {round(region.hz, 2)} hz")
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _frames(note: bytes, freq: float, config: RenderConfig) -> bytes:
+
+        """
+        PCM frames of the wav file of a single note
+        -------------------------------------------
+        """
+        n_frames = Loop.points(freq, config).n_frames if config.loop else config.n_samples
+        n_bytes = n_frames * Riff.formats[config.bit_depth][1]
+        # the data chunk ends the file, only its word padding follows
+        end = len(note) - (n_bytes % 2)
+
+        return note[end - n_bytes:end]
+
+    @classmethod
+    def entries(cls, freqs: List[float], wav_type: str, config: RenderConfig,
+                progress: Callable[[], None]=None,
+                notes: Callable[[float], bytes]=None) -> Iterator[ENTRY]:
+
+        """
+        Generates the files of an instrument as zip entries
+        ---------------------------------------------------
+        Receives:
+            - frequencies of the system
+            - wav form type
+            - render config
+            - function called once every note has been written
+            - optional source of the wav bytes of a note (defaults
+            to the render cache)
+        Returns:
+            - (name, size, stream of bytes) of the wav file, its
+            index and its SFZ mapping
+        """
+        regions = cls.regions(freqs, config)
+        n_frames = sum(region.length for region in regions)
+        notes = Archive.cached_notes(wav_type, config) if notes is None else notes
+
+        def chunks() -> Iterator[bytes]:
+            yield Riff.header(sr=config.sr, n_frames=n_frames, bit_depth=config.bit_depth)
+            for freq in freqs:
+                yield cls._frames(notes(freq), freq, config)
+                if progress is not None:
+                    progress()
+            if (n_frames * Riff.formats[config.bit_depth][1]) % 2:
+                yield b'\x00'
+
+        index = json.dumps(cls.index(regions, config), indent=1).encode()
+        sfz = cls.sfz(regions, config).encode()
+
+        yield cls.sample, Riff.size(n_frames, config.bit_depth), chunks()
+        yield cls.index_name, len(index), [index]
+        yield cls.sfz_name, len(sfz), [sfz]
+
+    @classmethod
+    def write(cls, freqs: List[float], wav_type: str, directory: str='sample_packages',
+                workers: int=None, config: RenderConfig=None) -> List[str]:
+
+        """
+        Writes an instrument into a directory
+        -------------------------------------
+        Receives:
+            - frequencies of the system
+            - wav form type
+            - directory to write the instrument into
+            - number of worker processes (full length notes only)
+            - render config (defaults to the class settings of Wav)
+        Returns:
+            - paths of the wav file, the index and the SFZ mapping
+        """
+        config = Wav.default_config() if config is None else config
+        freqs = list(freqs)
+        paths = [os.path.join(directory, name) for name in (cls.sample, cls.index_name, cls.sfz_name)]
+
+        if config.loop:
+            with open(paths[0], 'wb') as wav_file:
+                for chunk in next(cls.entries(freqs, wav_type, config))[2]:
+                    wav_file.write(chunk)
+        else:
+            # the pack is already one contiguous block of PCM
+            with Pack.render_pcm(freqs=freqs, wav_type=wav_type, workers=workers, config=config) as pcm:
+                Riff.write(paths[0], pcm.reshape(-1), sr=config.sr, bit_depth=config.bit_depth)
+
+        regions = cls.regions(freqs, config)
+        with open(paths[1], 'w') as index:
+            json.dump(cls.index(regions, config), index, indent=1)
+        with open(paths[2], 'w') as sfz:
+            sfz.write(cls.sfz(regions, config))
+
+        return paths
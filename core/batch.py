@@ -0,0 +1,391 @@
+from core import (os, np, json, yaml, copyfile, rmtree, product, List, Dict, Tuple, NamedTuple,
+                    Callable, ProcessPoolExecutor, BrokenProcessPool, Hz, Wav, Factory, BufferPool,
+                    Riff, Loop, Pack, Archive, Instrument, Modulation, RenderConfig, util)
+
+# ~ ~ ~ ~ ~ ~ Batch Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class PackSpec(NamedTuple):
+    """
+    Single sample pack of a manifest
+    --------------------------------
+        - starting hz, interval system, system size and wav form
+        - 'files' or 'instrument'
+        - zip file or directory the pack is written to
+        - render config of the notes
+    """
+    hz: float
+    system: str
+    size: int
+    form: str
+    layout: str
+    target: str
+    config: RenderConfig
+
+    @property
+    def zipped(self) -> bool:
+        return self.target.endswith('.zip')
+
+
+class Batch:
+    """
+    Batch object renders a whole catalogue of packs from a manifest
+    ----------------------------------------------------------------
+        - A manifest (json, or yaml when PyYAML is installed) lists
+    pack specs under 'packs', 'defaults' apply to every spec. Any of
+    hz, system, size, form, modulation and layout given as a list
+    expands into one pack per combination
+
+            output: catalogue
+            defaults: {duration: 2.0, form: sine}
+            packs:
+              - {hz: 440, system: [semi_tone, quarter_tone], format: zip}
+              - {hz: 440, system: semi_tone, layout: instrument, loop: true}
+
+        - Notes are shared across the packs: every distinct note (wav
+    form and render config, frequencies within a millionth of a hz)
+    is rendered once into a note store, whatever the number of packs,
+    systems, sizes or layouts it appears in. Packs of the same base
+    frequency share most of their notes (a semi tone system is every
+    other note of a quarter tone system)
+
+        - Missing notes are fanned out across a process pool in groups
+    of rows, every worker writes its notes straight into the store,
+    then every pack is assembled from the store (wav files are hard
+    linked where possible)
+
+        - Runs are resumable: packs are written under a '.part' name and
+    renamed once complete, packs that already exist are skipped, and so
+    are the notes already in the store. The store is removed once every
+    pack is written, unless it is kept for later runs
+    """
+    # sets the number of worker processes (None uses every core)
+    _workers: int = None
+    # sets the largest group of notes rendered by a single task
+    _task_bytes: int = 64 * 2**20
+
+    store_name: str = '.notes'
+    formats = ('directory', 'zip')
+    expanding = ('hz', 'system', 'size', 'form', 'modulation', 'layout')
+
+    @classmethod
+    def update_workers(cls, workers: int):
+        cls._workers = workers
+
+    @classmethod
+    def update_task_bytes(cls, task_bytes: int):
+        cls._task_bytes = task_bytes
+
+    @staticmethod
+    def load(path: str) -> Dict:
+
+        """
+        Reads a manifest
+        ----------------
+        yaml manifests need PyYAML, json ones nothing at all
+        """
+        with open(path) as manifest:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    return yaml().safe_load(manifest)
+                except ImportError:
+                    raise ValueError(f"{path}: yaml manifests need PyYAML, use json instead")
+            return json.load(manifest)
+
+    @staticmethod
+    def _name(hz: float, system: str, size: int, form: str, layout: str, config: RenderConfig) -> str:
+        # derived from everything a manifest usually varies
+        name = f"{system}_{round(float(hz), 2)}_{size}_{form}"
+        if config.modulation != 'none':
+            name += f"_{config.modulation}"
+        if config.loop:
+            name += '_loop'
+        if layout != 'files':
+            name += f"_{layout}"
+        return name
+
+    @classmethod
+    def specs(cls, manifest: Dict, root: str=None) -> List[PackSpec]:
+
+        """
+        Expands a manifest into pack specs
+        ----------------------------------
+        Receives:
+            - manifest, as read by 'load'
+            - directory relative targets are placed in (defaults to
+            the manifest's 'output', then to the working directory)
+        Returns:
+            - PackSpec of every pack, in manifest order
+        """
+        root = manifest.get('output', '.') if root is None else root
+        defaults = manifest.get('defaults', {})
+        specs, targets = [], set()
+
+        for n, entry in enumerate(manifest.get('packs', [])):
+            entry = dict(defaults, **entry)
+            unknown = set(entry) - set(RenderConfig._fields) - set(cls.expanding) - {
+                            'adsr', 'format', 'name'}
+            if unknown:
+                raise ValueError(f"pack {n}: unknown keys {sorted(unknown)}")
+            if 'name' in entry and any(isinstance(entry.get(key), list) for key in cls.expanding):
+                raise ValueError(f"pack {n}: a named pack cannot expand into several packs")
+
+            # every list expands, every combination is a pack
+            choices = [entry.get(key, default) for key, default in
+                        zip(cls.expanding, (440.0, 'semi_tone', None, 'sine', 'none', 'files'))]
+            for hz, system, size, form, modulation, layout in product(
+                    *(choice if isinstance(choice, list) else [choice] for choice in choices)):
+
+                if not util.Tunings.valid(system):
+                    raise ValueError(f"pack {n}: unknown system {system}")
+                if form not in Wav.wav_types:
+                    raise ValueError(f"pack {n}: unknown wav form {form}")
+                if modulation not in Modulation.types:
+                    raise ValueError(f"pack {n}: unknown modulation {modulation}")
+                if layout not in Archive.layouts:
+                    raise ValueError(f"pack {n}: unknown layout {layout}")
+                if entry.get('format', 'directory') not in cls.formats:
+                    raise ValueError(f"pack {n}: format must be one of {cls.formats}")
+
+                config = Wav.default_config()._replace(
+                            tone_intvl=system, modulation=modulation,
+                            **{field: entry[field] for field in RenderConfig._fields
+                                if field in entry and field not in ('tone_intvl', 'modulation')})
+                if 'adsr' in entry:
+                    config = config._replace(attack=entry['adsr'][0], decay=entry['adsr'][1],
+                                                sustain=entry['adsr'][2], release=entry['adsr'][3])
+                try:
+                    Modulation.check_adsr(*Modulation.adsr(config))
+                    Wav.check_hz(hz, config.sr)
+                except (ValueError, TypeError) as error:
+                    raise ValueError(f"pack {n}: {error}")
+                Riff.pcm_dtype(config.bit_depth)
+
+                size = util.Tunings.get(system).size if size is None else int(size)
+                name = entry.get('name') or cls._name(hz, system, size, form, layout, config)
+                if entry.get('format') == 'zip' and not name.endswith('.zip'):
+                    name += '.zip'
+                target = os.path.join(root, name)
+                if target in targets:
+                    raise ValueError(f"pack {n}: {target} is written by another pack, give it a name")
+                targets.add(target)
+
+                specs.append(PackSpec(float(hz), system, size, form, layout, target, config))
+
+        return specs
+
+    @staticmethod
+    def _note_config(config: RenderConfig) -> RenderConfig:
+        # the notes themselves never depend on the pitch system
+        return config._replace(tone_intvl=RenderConfig._field_defaults['tone_intvl'])
+
+    @classmethod
+    def plan(cls, specs: List[PackSpec]) -> Tuple[Dict[PackSpec, List[float]], Dict[tuple, List[float]]]:
+
+        """
+        Shares the notes of every pack
+        ------------------------------
+        Receives:
+            - pack specs
+        Returns:
+            - notes of every pack, mapped onto the notes they share
+            - distinct notes of every (wav form, note config)
+        """
+        systems, notes, shared = {}, {}, {}
+        for spec in specs:
+            # every system is generated once
+            system = (spec.hz, spec.system, spec.size)
+            if system not in systems:
+                systems[system] = Hz(hz=spec.hz, config=spec.config).system_array(spec.size)
+
+            group = (spec.form, cls._note_config(spec.config))
+            seen = shared.setdefault(group, {})
+            freqs = systems[system]
+            for freq, close in zip(freqs.tolist(), np.round(freqs, 6).tolist()):
+                seen.setdefault(close, freq)
+            notes[spec] = [seen[close] for close in np.round(freqs, 6).tolist()]
+
+        return notes, {group: list(seen.values()) for group, seen in shared.items()}
+
+    @staticmethod
+    def note_path(store: str, freq: float, wav_type: str, config: RenderConfig) -> str:
+        return os.path.join(store, f"{Archive.note_key(freq, wav_type, config)}.wav")
+
+    @staticmethod
+    def _store(freqs: List[float], wav_type: str, config: RenderConfig, paths: List[str]):
+
+        """
+        Renders a group of notes into the note store
+        --------------------------------------------
+        Worker entry point, every note is written under a '.part'
+        name and renamed once complete
+        """
+        if config.loop:
+            pool = BufferPool()
+            for freq, path in zip(freqs, paths):
+                with open(f"{path}.part", 'wb') as wav_file:
+                    wav_file.write(Loop.wav_bytes(freq, wav_type, config, pool))
+                os.replace(f"{path}.part", path)
+            return
+
+        pcm = np.empty((len(freqs), config.n_samples), dtype=Riff.pcm_dtype(config.bit_depth))
+        Pack._render_rows(pcm, freqs, wav_type, 0, config)
+        for row, path in enumerate(paths):
+            Riff.write(f"{path}.part", pcm[row], sr=config.sr, bit_depth=config.bit_depth)
+            os.replace(f"{path}.part", path)
+
+    @classmethod
+    def render_notes(cls, groups: Dict[tuple, List[float]], store: str, workers: int=None,
+                        progress: Callable[[int], None]=None) -> int:
+
+        """
+        Renders every note missing from the note store
+        ----------------------------------------------
+        Receives:
+            - distinct notes of every (wav form, note config)
+            - note store directory
+            - number of worker processes (defaults to the class setting)
+            - function called with the number of notes of every finished task
+        Returns:
+            - number of notes rendered
+        """
+        workers = cls._workers if workers is None else workers
+        workers = os.cpu_count() if workers is None else workers
+
+        missing = []
+        for (wav_type, config), freqs in groups.items():
+            paths = [cls.note_path(store, freq, wav_type, config) for freq in freqs]
+            todo = [(freq, path) for freq, path in zip(freqs, paths) if not os.path.exists(path)]
+            if todo:
+                missing.append((wav_type, config, todo))
+
+        # contiguous groups of rows, split evenly across the workers and bounded in size
+        total = sum(len(todo) for *_, todo in missing)
+        tasks = []
+        for wav_type, config, todo in missing:
+            note_bytes = max(1, config.n_samples * Riff.pcm_dtype(config.bit_depth).itemsize)
+            step = max(1, min(-(-total // max(1, workers)), cls._task_bytes // note_bytes))
+            for start in range(0, len(todo), step):
+                freqs, paths = zip(*todo[start:start + step])
+                tasks.append((list(freqs), wav_type, config, list(paths)))
+
+        def done(task: tuple):
+            if progress is not None:
+                progress(len(task[0]))
+
+        if workers > 1 and len(tasks) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                    futures = [(task, pool.submit(cls._store, *task)) for task in tasks]
+                    for task, future in futures:
+                        future.result()
+                        done(task)
+                return total
+            except BrokenProcessPool:
+                # workers could not run, render what is left in process
+                tasks = [task for task in tasks if not all(os.path.exists(path) for path in task[3])]
+
+        for task in tasks:
+            cls._store(*task)
+            done(task)
+
+        return total
+
+    @staticmethod
+    def _link(source: str, path: str):
+        # the notes of a pack are the files of the store
+        try:
+            os.link(source, path)
+        except OSError:
+            copyfile(source, path)
+
+    @classmethod
+    def assemble(cls, spec: PackSpec, freqs: List[float], store: str) -> str:
+
+        """
+        Writes a pack from the note store
+        ---------------------------------
+        Receives:
+            - pack spec
+            - notes of the pack, as planned
+            - note store directory
+        Returns:
+            - target of the pack, only created once it is complete
+        """
+        config = cls._note_config(spec.config)
+
+        def notes(freq: float) -> bytes:
+            with open(cls.note_path(store, freq, spec.form, config), 'rb') as note:
+                return note.read()
+
+        entries = (Instrument.entries(freqs, spec.form, spec.config, notes=notes) if spec.layout == 'instrument'
+                    else Archive.wav_entries(freqs, spec.form, spec.config, notes=notes))
+        part = f"{spec.target}.part"
+        if os.path.isdir(part):
+            rmtree(part)
+
+        if spec.zipped:
+            with open(part, 'wb') as pack:
+                for chunk in Archive.stream_zip(entries):
+                    pack.write(chunk)
+        elif spec.layout == 'files':
+            os.makedirs(part)
+            decimals = Factory._decimals(freqs)
+            for freq in freqs:
+                cls._link(cls.note_path(store, freq, spec.form, config),
+                            Factory._wav_path(freq, spec.form, part, spec.config.modulation, decimals))
+        else:
+            os.makedirs(part)
+            for name, size, chunks in entries:
+                with open(os.path.join(part, name), 'wb') as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
+
+        os.replace(part, spec.target)
+        return spec.target
+
+    @classmethod
+    def run(cls, manifest: Dict, root: str=None, workers: int=None, keep_notes: bool=False,
+            log: Callable[[str], None]=None) -> Dict[str, List[str]]:
+
+        """
+        Renders every pack of a manifest
+        --------------------------------
+        Receives:
+            - manifest, as read by 'load'
+            - directory relative targets are placed in
+            - number of worker processes (defaults to the class setting)
+            - boolean switch to keep the note store for later runs
+            - function called with a line of progress
+        Returns:
+            - targets written and targets skipped, as they already existed
+        """
+        log = (lambda line: None) if log is None else log
+        specs = cls.specs(manifest, root)
+        pending = [spec for spec in specs if not os.path.exists(spec.target)]
+        skipped = [spec.target for spec in specs if os.path.exists(spec.target)]
+        for target in skipped:
+            log(f"skipped {target}")
+
+        root = manifest.get('output', '.') if root is None else root
+        store = os.path.join(root, cls.store_name)
+        written = []
+
+        if pending:
+            os.makedirs(store, exist_ok=True)
+            notes, groups = cls.plan(pending)
+            log(f"{len(pending)} packs, {sum(len(freqs) for freqs in notes.values())} notes "
+                f"of which {sum(len(freqs) for freqs in groups.values())} distinct")
+            rendered = cls.render_notes(groups, store, workers=workers)
+            log(f"rendered {rendered} notes")
+
+            for spec in pending:
+                parent = os.path.dirname(spec.target)
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+                written.append(cls.assemble(spec, notes[spec], store))
+                log(f"wrote {spec.target}")
+
+        if not keep_notes and os.path.isdir(store):
+            rmtree(store)
+
+        return {'written': written, 'skipped': skipped}
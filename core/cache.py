@@ -0,0 +1,375 @@
+from core import (io, os, json, time, hashlib, tempfile, threading, OrderedDict, Future,
+                    Dict, Tuple, Callable, Iterable, Iterator, METRICS)
+
+# ~ ~ ~ ~ ~ ~ Cache Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class RenderCache:
+    """
+    RenderCache object keeps rendered audio keyed by its parameters
+    ----------------------------------------------------------------
+        - A render is fully determined by its parameters, so the key
+    is a hash of them (content addressed). Renders are kept in a
+    memory tier and a disk tier, both bounded in bytes and evicted
+    least recently used first. A disk hit is promoted to memory
+
+        - Identical renders requested while one is in flight wait
+    for it instead of starting their own (request coalescing)
+
+        - The disk tier may be shared by several processes, each
+    process only bounds the files it knows about. It survives
+    restarts, so keys are salted with a format version (bumped
+    whenever rendering changes) and scratch files of interrupted
+    writes are swept on startup
+    """
+    # sets the version every key is salted with
+    _version: int = 1
+    # sets the age (in seconds) past which scratch files are stale
+    _stale_seconds: float = 3600.0
+
+    def __init__(self, memory_bytes: int=256 * 2**20, disk_bytes: int=2 * 2**30,
+                    directory: str=None):
+
+        self.__memory_bytes = memory_bytes
+        self.__disk_bytes = disk_bytes if directory else 0
+        self.__directory = directory
+        self.__memory = OrderedDict()
+        self.__disk = OrderedDict()
+        self.__memory_size = 0
+        self.__disk_size = 0
+        self.__in_flight: Dict[str, Future] = {}
+        self.__lock = threading.RLock()
+        self.__counts = dict.fromkeys(['memory_hits', 'disk_hits', 'misses',
+                                        'coalesced', 'evictions'], 0)
+
+        if self.__disk_bytes:
+            os.makedirs(directory, exist_ok=True)
+            self.__sweep()
+            # seed the disk tier oldest first from what is already there
+            files = [os.path.join(directory, name) for name in os.listdir(directory)
+                        if not name.startswith('.')]
+            for path in sorted(files, key=os.path.getmtime):
+                self.__disk[os.path.basename(path)] = os.path.getsize(path)
+                self.__disk_size += self.__disk[os.path.basename(path)]
+            self.__evict()
+
+    @staticmethod
+    def key(**params) -> str:
+
+        """
+        Generates the content address of a render
+        ------------------------------------------
+        Receives:
+            - every parameter that determines the render
+        Returns:
+            - sha256 hex digest of the parameters and of the
+            format version
+        """
+        params = dict(params, cache_version=RenderCache._version)
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.__directory, key)
+
+    def __sweep(self):
+
+        # scratch files (dot files) only outlive their write if it was
+        # interrupted, recent ones may still be written by another process
+        now = time.time()
+        for name in os.listdir(self.__directory):
+            path = os.path.join(self.__directory, name)
+            try:
+                if name.startswith('.') and now - os.path.getmtime(path) > self._stale_seconds:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __evict(self):
+
+        while self.__memory_size > self.__memory_bytes:
+            _, data = self.__memory.popitem(last=False)
+            self.__memory_size -= len(data)
+            self.__counts['evictions'] += 1
+
+        while self.__disk_size > self.__disk_bytes:
+            key, size = self.__disk.popitem(last=False)
+            self.__disk_size -= size
+            self.__counts['evictions'] += 1
+            try:
+                os.remove(self.__path(key))
+            except FileNotFoundError:
+                pass
+
+    def __lookup(self, key: str) -> bytes:
+
+        # called without the lock, disk hits are read outside of it
+        # so a cold read never holds up the other users of the cache
+        with self.__lock:
+            if key in self.__memory:
+                self.__memory.move_to_end(key)
+                self.__counts['memory_hits'] += 1
+                return self.__memory[key]
+
+            if key not in self.__disk:
+                return None
+
+        try:
+            with open(self.__path(key), 'rb') as cached:
+                data = cached.read()
+        except FileNotFoundError:
+            # evicted meanwhile, or removed by another process
+            with self.__lock:
+                if key in self.__disk:
+                    self.__disk_size -= self.__disk.pop(key)
+            return None
+
+        with self.__lock:
+            if key in self.__disk:
+                self.__disk.move_to_end(key)
+            self.__counts['disk_hits'] += 1
+            self.__store_memory(key, data)
+
+        return data
+
+    def __stored(self, key: str) -> bool:
+        return key in self.__memory or key in self.__disk
+
+    def __store_memory(self, key: str, data: bytes):
+
+        if len(data) > self.__memory_bytes or key in self.__memory:
+            return
+        self.__memory[key] = data
+        self.__memory_size += len(data)
+        self.__evict()
+
+    def get(self, key: str) -> bytes:
+
+        """
+        Looks up a render, None if it is not cached
+        -------------------------------------------
+        """
+        return self.__lookup(key)
+
+    def open(self, key: str):
+
+        """
+        Opens a render for reading, None if it is not cached
+        -----------------------------------------------------
+        Memory hits are read from their bytes, disk hits straight
+        from their file (without loading it), so parts of a large
+        render can be served by seeking into it
+        """
+        with self.__lock:
+            if key in self.__memory:
+                self.__memory.move_to_end(key)
+                self.__counts['memory_hits'] += 1
+                return io.BytesIO(self.__memory[key])
+
+            if key in self.__disk:
+                try:
+                    cached = open(self.__path(key), 'rb')
+                except FileNotFoundError:
+                    # removed by another process
+                    self.__disk_size -= self.__disk.pop(key)
+                    return None
+                self.__disk.move_to_end(key)
+                self.__counts['disk_hits'] += 1
+                return cached
+
+        return None
+
+    def put(self, key: str, data: bytes):
+
+        """
+        Stores a render in both tiers
+        -----------------------------
+        """
+        # renders are already bytes, only views are copied
+        data = data if isinstance(data, bytes) else bytes(data)
+        with self.__lock:
+            self.__store_memory(key, data)
+            if len(data) > self.__disk_bytes or key in self.__disk:
+                return
+
+        # written outside the lock so lookups never wait on the disk,
+        # then renamed so readers never see a partial file
+        scratch = self.__path(f".{key}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            with open(scratch, 'wb') as cached:
+                cached.write(data)
+        except BaseException:
+            # a full disk (or anything else) never leaves its scratch file behind
+            if os.path.exists(scratch):
+                os.remove(scratch)
+            raise
+
+        with self.__lock:
+            if key in self.__disk:
+                # stored by another thread meanwhile
+                os.remove(scratch)
+                return
+            os.replace(scratch, self.__path(key))
+            self.__disk[key] = len(data)
+            self.__disk_size += len(data)
+            self.__evict()
+
+    def discard(self, key: str):
+
+        """
+        Drops a render from both tiers
+        ------------------------------
+        """
+        with self.__lock:
+            data = self.__memory.pop(key, None)
+            if data is not None:
+                self.__memory_size -= len(data)
+
+            size = self.__disk.pop(key, None)
+            if size is not None:
+                self.__disk_size -= size
+                try:
+                    os.remove(self.__path(key))
+                except FileNotFoundError:
+                    pass
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+
+        """
+        Looks up a render, rendering it on a miss
+        -----------------------------------------
+        Receives:
+            - content address of the render
+            - function producing the render
+        Returns:
+            - the render, produced at most once across concurrent callers
+        """
+        while True:
+            data = self.__lookup(key)
+            if data is not None:
+                return data
+            with self.__lock:
+                future, owner = self.__claim(key)
+
+            if owner:
+                break
+            if future is None:
+                # stored since the lookup
+                continue
+            data = future.result()
+            if data is not None:
+                return data
+            # the render in flight was abandoned (or too large to keep), try again
+
+        try:
+            data = render()
+            self.put(key, data)
+            future.set_result(data)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+
+        return data
+
+    def __claim(self, key: str) -> Tuple[Future, bool]:
+
+        # called under the lock, the first caller of a key owns its render
+        # (None if it has been stored since it was looked up)
+        if self.__stored(key):
+            return None, False
+
+        future = self.__in_flight.get(key)
+        if future is None:
+            future = self.__in_flight[key] = Future()
+            self.__counts['misses'] += 1
+            return future, True
+
+        self.__counts['coalesced'] += 1
+        return future, False
+
+    def tee(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+
+        """
+        Passes a stream through, caching it once it completes
+        -----------------------------------------------------
+            - The stream is registered in flight like get_or_render,
+        concurrent requests for the same key wait for it and are sent
+        the whole render instead of rendering it again
+
+            - A stream that is abandoned part way, or that outgrows
+        both tiers, is not cached (and its waiters render their own)
+        """
+        while True:
+            data = self.__lookup(key)
+            if data is not None:
+                break
+            with self.__lock:
+                future, owner = self.__claim(key)
+            if future is not None:
+                break
+
+        if data is None and not owner:
+            data = future.result()
+        if data is not None:
+            yield data
+            return
+
+        if not owner:
+            # the stream waited on was not kept, this one is not coordinated
+            collected = []
+            for chunk in chunks:
+                collected.append(chunk)
+                yield chunk
+            self.put(key, b''.join(collected))
+            return
+
+        limit = max(self.__memory_bytes, self.__disk_bytes)
+        collected, size, data = [], 0, None
+        try:
+            for chunk in chunks:
+                if collected is not None:
+                    size += len(chunk)
+                    # past both bounds it could never be cached
+                    collected = collected if size <= limit else None
+                    if collected is not None:
+                        collected.append(chunk)
+                yield chunk
+
+            if collected is not None:
+                data = b''.join(collected)
+                self.put(key, data)
+            future.set_result(data)
+        except GeneratorExit:
+            # abandoned by its client
+            future.set_result(None)
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+
+        """
+        Reports hit and miss counters and the size of each tier
+        -------------------------------------------------------
+        """
+        with self.__lock:
+            return dict(self.__counts,
+                        memory_entries=len(self.__memory), memory_bytes=self.__memory_size,
+                        memory_limit=self.__memory_bytes,
+                        disk_entries=len(self.__disk), disk_bytes=self.__disk_size,
+                        disk_limit=self.__disk_bytes,
+                        in_flight=len(self.__in_flight))
+
+
+# shared by every request of the process
+RENDER_CACHE = RenderCache(directory=os.path.join(tempfile.gettempdir(), 'pitchcraft_cache'))
+# hit counters are totals, sizes and renders in flight are gauges
+METRICS.register('render_cache', lambda: {
+    (f"{name}_total" if name in ('memory_hits', 'disk_hits', 'misses', 'coalesced', 'evictions') else name): value
+    for name, value in RENDER_CACHE.stats().items()
+})
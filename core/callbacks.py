@@ -1,47 +1,106 @@
 import core
+import dash
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
 APP = core.APP
 
 @APP.callback(
     Output('input-sys-size', 'value'),
     [Input('input-sys', 'value')],
-    prevent_initial_callback=True
+    prevent_initial_call=True
 )
 def set_sysSize(input_sys):
 
-    return core.util.Systems.octave_systems[input_sys]
+    # the finest systems are capped at the largest pack the server renders
+    return min(core.util.Systems.octave_systems[input_sys],
+                core.Archive.max_notes(core.Wav.default_config()))
 
 @APP.callback(
-    Output('download-link', 'href'),
+    Output('job-id', 'data'),
     [Input('make-command', 'n_clicks')],
     state=[
         State('input-freq', 'value'),
         State('input-sys', 'value'),
         State('input-sys-size', 'value'),
-        State('input-form', 'value')
+        State('input-form', 'value'),
+        State('input-modulation', 'value'),
+        State('input-loop', 'value'),
+        State('input-layout', 'value')
     ],
-    prevent_initial_callback=True
+    prevent_initial_call=True
 )
 def system_samples(n_clicks, in_freq,
-                    in_sys, in_sys_size, in_form):
-    
-    core.generator.Hz().update(in_sys.replace(' ', '_'))
+                    in_sys, in_sys_size, in_form, in_mod, in_loop, in_layout):
 
-    PITCH = core.generator.Hz(hz=in_freq)
-    PITCH.system_size = in_sys_size
+    if not n_clicks:
+        raise PreventUpdate
 
-    if not core.os.path.exists('sample_packages'):
-        core.os.mkdir('sample_packages')
+    # the pack is rendered as a job so the request returns straight away
+    params = {
+        'hz': in_freq,
+        'system': in_sys.replace(' ', '_'),
+        'size': in_sys_size,
+        'form': in_form,
+        'modulation': in_mod or 'none',
+        'layout': in_layout or 'files'
+    }
+    if in_loop:
+        params['loop'] = 1
+    job = core.routes.submit_pack(params)
 
-    for ii, freq in PITCH.make_system().items():
+    return job.id
 
-        core.generator.Wav(carrier_hz=freq).make_wav(in_form)
-    
-    core.make_archive('samples', 'zip', 'sample_packages')
+@APP.callback(
+    [
+        Output('job-progress', 'value'),
+        Output('job-status', 'children'),
+        Output('download-link', 'href'),
+        Output('job-poll', 'disabled')
+    ],
+    [
+        Input('job-poll', 'n_intervals'),
+        Input('job-id', 'data'),
+        Input('cancel-command', 'n_clicks')
+    ],
+    prevent_initial_call=True
+)
+def job_progress(n_intervals, job_id, n_cancels):
+
+    job = core.JOBS.get(job_id) if job_id else None
+    if job is None:
+        raise PreventUpdate
+
+    if 'cancel-command' in dash.callback_context.triggered[0]['prop_id']:
+        job.cancel()
+
+    status = job.to_dict()
+    # keep polling until the job is finished, then link its immutable url
+    href = core.routes.download_url(status['params']) if job.state == 'done' else None
+
+    return (str(status['progress']), f"{status['state']} {status['done']}/{status['total']}", 
+            href, job.finished)
+
+@APP.callback(
+    [
+        Output('waveform-graph', 'figure'),
+        Output('spectrogram-image', 'src')
+    ],
+    [
+        Input('input-freq', 'value'),
+        Input('input-form', 'value'),
+        Input('input-modulation', 'value')
+    ]
+)
+def show_note(in_freq, in_form, in_mod):
+
+    if in_freq is None or in_form not in core.Wav.wav_types or in_mod not in core.Modulation.types:
+        raise PreventUpdate
+
+    # only the envelope points are sent, the spectrogram is a cached image
+    config = core.Wav.default_config()._replace(modulation=in_mod)
+    lo, hi = core.Views.note_envelope(float(in_freq), in_form, config)
+    query = core.urlencode({'hz': in_freq, 'form': in_form, 'size': 1, 'modulation': in_mod})
 
-    wavs = [w for w in core.os.listdir('sample_packages') if w.endswith('.wav')]
-    for w in wavs:
-        core.os.remove(core.os.path.join('sample_packages', w))
-    
-    return 'downloads/samples.zip'
\ No newline at end of file
+    return (core.Views.graph(lo, hi, config.duration, title=f"{in_freq} hz {in_form}"),
+            f"views/spectrogram.png?{query}")
@@ -0,0 +1,56 @@
+from core import tempfile, contextmanager, NamedTuple, Iterator
+
+# ~ ~ ~ ~ ~ ~ Render Configuration ~ ~ ~ ~ ~ ~ ~ #
+
+class RenderConfig(NamedTuple):
+    """
+    Immutable settings of a single render
+    -------------------------------------
+        - Every request builds its own config and passes it explicitly
+    into Hz, Wav, Factory and Pack, so concurrent renders never share
+    (or mutate) class level state
+
+        - Wav.default_config() snapshots the class level defaults,
+    changes are made with _replace which returns a new config
+    """
+    # pitch system
+    tone_intvl: str = 'semi_tone'
+    # wav constructing factors
+    sr: int = 44100
+    duration: float = 10.0 # in seconds
+    duty: float = 0.8
+    modulator_hz: float = 0.25
+    ac: float = 1.0
+    ka: float = 0.25
+    # modulation ('none', 'am', 'fm' or 'ring') and ADSR envelope (in seconds, sustain level)
+    modulation: str = 'none'
+    attack: float = 0.0
+    decay: float = 0.0
+    sustain: float = 1.0
+    release: float = 0.0
+    # render every note as a single loop instead of the whole duration
+    loop: bool = False
+    # oscillator engine and block sizes
+    engine: str = 'direct'
+    chunk_size: int = 8
+    stream_chunk: int = 65536
+    # synthesis precision ('float64' or 'float32') and output bit depth (16, 24 or 32 float)
+    precision: str = 'float64'
+    bit_depth: int = 16
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.sr * self.duration)
+
+
+@contextmanager
+def scratch_space() -> Iterator[str]:
+
+    """
+    Request scoped scratch directory
+    --------------------------------
+    Created empty for the caller and removed with everything in it
+    once the context exits, so requests never share files
+    """
+    with tempfile.TemporaryDirectory(prefix='pitchcraft_') as directory:
+        yield directory
@@ -1,5 +1,7 @@
 
-from core import (sg, read, write, np, util, plt, List, Dict, Union, TypeVar)
+from core import (os, np, util, pyplot, List, Dict, Tuple, Union, 
+                    Callable, Mapping, Iterable, Iterator, TypeVar, Wavetable, PolyBlep, Shapes, Modulation,
+                    Riff, RenderConfig, METRICS)
 RANGE = TypeVar('range')
 FIG = TypeVar('matplotlib.figure.Figure')
 
@@ -11,18 +13,24 @@ class Hz:
     # sets the system's base interval unit
     tone_intvl='semi_tone'
 
-    def __init__(self, hz: float=None):
+    def __init__(self, hz: float=None, config: RenderConfig=None):
 
         """
         Constructor develops three systems:
             - octave interval system (system of interval divison within one octave)
             - interval system of divisions
             - octave system used to measure natural system size given 8 octaves
+        The interval unit is taken from the render config when one is given,
+        otherwise from the class level tone interval, and may be any tuning
+        of the registry ('semi_tone', '19edo', '13edt' ...). Tunings are
+        computed once, so constructing an Hz is a single lookup
         """
+        tone_intvl = Hz.tone_intvl if config is None else config.tone_intvl
+        tuning = util.Tunings.get(tone_intvl)
         self.__hz = hz
-        self.__intervals=util.Network.make_octave_interval_system(tone_intvl=Hz.tone_intvl)
-        self.__interval_system=util.Systems.interval_systems[Hz.tone_intvl]
-        self.__system_size=util.Systems.octave_systems[Hz.tone_intvl]
+        self.__tone_intvl = tone_intvl
+        self.__interval_system=tuning.step
+        self.__system_size=tuning.size
     
     @property
     def hz(self):
@@ -32,6 +40,10 @@ class Hz:
     def hz(self, hz: float):
         self.__hz = hz
 
+    @property
+    def tone_intvl_type(self):
+        return self.__tone_intvl
+
     @property
     def interval_system_base_unit(self):
         return self.__interval_system
@@ -46,7 +58,8 @@ class Hz:
     
     @property
     def intervals(self):
-        return self.__intervals
+        # the intervals within one period, built on access
+        return util.Network.make_octave_interval_system(tone_intvl=self.__tone_intvl)
 
     @classmethod
     def tone_interval(cls):
@@ -73,6 +86,9 @@ class Hz:
 
         return util.Network.make_octaves(hz=self.hz, n_octaves=n_octaves)
 
+    def octave_array(self, n_octaves: int) -> np.ndarray:
+        return util.Network.octave_array(hz=self.hz, n_octaves=n_octaves)
+
     def make_system(self, system_size: int=None) -> Dict[str, float]:
 
         """
@@ -95,6 +111,19 @@ class Hz:
         return util.Network.make_system(hz=self.hz, system_type=self.interval_system_base_unit, 
                                                     system_size=system_size)
 
+    def system_array(self, system_size: int=None, start: int=0) -> np.ndarray:
+
+        """
+        Generates the chromatic system's frequencies as an array
+        --------------------------------------------------------
+        Same frequencies as make_system, at full precision,
+        positions [start, start + system_size)
+        """
+        system_size = self.system_size if system_size is None else system_size
+
+        return util.Network.system_array(hz=self.hz, system_type=self.interval_system_base_unit,
+                                            system_size=system_size, start=start)
+
     def make_overtone_series(self, system_size: RANGE=range(0, 16)) -> List[float]:
 
         """
@@ -109,6 +138,9 @@ class Hz:
         """
 
         return util.Network.make_overtone_series(hz=self.hz, system_size=system_size)
+
+    def overtone_array(self, system_size: RANGE=range(0, 16)) -> np.ndarray:
+        return util.Network.overtone_array(hz=self.hz, system_size=system_size)
         
     def make_just_series(self) -> List[float]:
 
@@ -124,11 +156,137 @@ class Hz:
 
         return util.Network.make_just_series(hz=self.hz)
 
+    def just_array(self, limit: int=5, bounds: Union[int, Dict[int, int]]=2, n_periods: int=1,
+                    period: float=2.0) -> np.ndarray:
+
+        """
+        Generates the frequencies of a Just Intonation lattice
+        ------------------------------------------------------
+        Recieves:
+            - Starting Hz
+            - prime limit and the largest exponent of every prime
+            - number of periods and the period
+        Returns:
+            - every ratio of the lattice in every period, ascending,
+            ready to be rendered like any other system
+        """
+        lattice = util.Network.lattice(limit=limit, bounds=bounds, period=period)
+
+        return util.Network.just_array(hz=self.hz, lattice=lattice, n_periods=n_periods, period=period)
+
+
+class BufferPool:
+
+    """
+    Reusable buffers shared by the notes of a render
+    ------------------------------------------------
+    A buffer is allocated the first time a (name, dtype) is asked
+    for and handed back on every later request, grown only when a
+    larger shape is asked for. Smaller shapes (the short last chunk
+    of a system or a stream) get a view of the front of it, so the
+    notes of a pack allocate their buffers once.
+    A pool must only be used by one thread at a time
+    """
+
+    def __init__(self):
+
+        self.__buffers = {}
+        self.__tags = {}
+        self.__allocations = 0
+
+    @property
+    def allocations(self):
+        return self.__allocations
+
+    def get(self, name: str, shape: Union[int, tuple], dtype: np.dtype=np.float64) -> np.ndarray:
+
+        shape = (int(shape),) if np.ndim(shape) == 0 else tuple(int(n) for n in shape)
+        key = (name, np.dtype(dtype))
+        size = int(np.prod(shape))
+        if key not in self.__buffers or self.__buffers[key].size < size:
+            self.__buffers[key] = np.empty(size, dtype=key[1])
+            self.__allocations += 1
+
+        return self.__buffers[key][:size].reshape(shape)
+
+    def cached(self, name: str, tag: tuple, shape: Union[int, tuple],
+                dtype: np.dtype=np.float64) -> Tuple[np.ndarray, bool]:
+
+        """
+        Buffer remembering what it was last filled with
+        -----------------------------------------------
+        Returns:
+            - the buffer and whether it already holds the values
+            'tag' describes, the caller fills it otherwise
+        """
+        buffer = self.get(name, shape, dtype)
+        fresh = self.__tags.get(name) != (tag, buffer.shape, buffer.dtype)
+        self.__tags[name] = (tag, buffer.shape, buffer.dtype)
+
+        return buffer, not fresh
+
 
 class Factory:
+    # full scale of each output bit depth
+    _full_scale: Dict[int, float] = {16: 32767, 24: 8388607, 32: 1.0}
+
+    # sets the most decimals of a hz a file name is given
+    _max_decimals: int = 12
+
+    @staticmethod
+    def _wav_path(hz: float, wav_type: str, directory: str='sample_packages',
+                    modulation: str='none', decimals: int=2) -> str:
+        # named to the hundredth of a hz unless the system needs finer names
+        prefix = 'simple' if modulation == 'none' else modulation
+        return os.path.join(directory, f"{prefix}_{round(float(hz), decimals)}_{wav_type}.wav")
+
+    @classmethod
+    def _decimals(cls, freqs: List[float]) -> int:
+
+        """
+        Decimals of a hz that tell every note of a system apart
+        --------------------------------------------------------
+        Dense tunings (thousands of divisions of the octave) put notes
+        closer than a hundredth of a hz, their file names would collide
+        and the notes overwrite each other
+        """
+        freqs = set(float(freq) for freq in freqs)
+        for decimals in range(2, cls._max_decimals):
+            if len(set(round(freq, decimals) for freq in freqs)) == len(freqs):
+                return decimals
+
+        return cls._max_decimals
+
+    @staticmethod
+    def _quantize(carrier: np.ndarray, bit_depth: int=16, out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Scales a carrier and quantizes it to the output bit depth
+        ----------------------------------------------------------
+        Recieves:
+            - carrier array (scaled in place)
+            - bit depth (16, 24 or 32 float)
+            - optional buffer to receive the samples
+        Returns:
+            - the quantized samples, truncated towards zero
+            exactly as np.int16 does
+        """
+        with METRICS.timed('quantize'):
+            carrier *= 0.3 # the amplitude of the wav
+            if Factory._full_scale[bit_depth] != 1.0:
+                carrier *= Factory._full_scale[bit_depth]
+
+            if out is None:
+                out = np.empty(carrier.shape, dtype=Riff.pcm_dtype(bit_depth))
+            np.copyto(out, carrier, casting='unsafe')
+
+        METRICS.count('quantize', out.nbytes)
+        return out
+
     @staticmethod
     def _make_wav(carrier: List[float], sr: int, hz: float, wav_type: str, 
-                modulator: List[float]=None, ac: float=None, ka: float=None):
+                out: np.ndarray=None, directory: str='sample_packages',
+                bit_depth: int=16, pool: BufferPool=None, modulation: str='none'):
 
         """
         Dynamically generates tone as wav file
@@ -138,28 +296,79 @@ class Factory:
             - Carrier array
             - Sample Rate
             - Wav Form Type
-            - Modulator Carrier Hz
-            - AC
-            - KA
+            - optional buffer to receive the tone
+            - directory to write the wav file into
+            - bit depth (16, 24 or 32 float)
+            - optional buffer pool to quantize into
+            - modulation the carrier was rendered with (names the file)
         Return:
             - Returns nothing as a function but saves a wav file
-            based on the dictating data
-        """
-        # currently there is the option to overlay
-        # a modulation envelope over the tone 
-        if modulator:
-            # construct the envelope pattern
-            envelope = ac * (1.0 + ka * modulator)
-            # develop the modulated data, passing it through the envelope
-            modulated = envelope * carrier
-            modulated *= 0.3 # the severity of the modualtion
-            # generate the tone
-            modulated_data = np.int16(modulated * 32767)
-            write(f"modulated_{hz}_{wav_type}.wav", rate=sr, data=modulated_data)
-        # if no modulation desired, a consistent tone is generated
-        carrier *= 0.3 # the amplitude of the wav
-        data = np.int16(carrier * 32767)
-        write(f"sample_packages/simple_{hz}_{wav_type}.wav", rate=sr, data=data)
+            based on the dictating data, when a buffer is supplied
+            the tone is quantized into it instead of written
+        """
+        # modulation and envelopes are already part of the carrier
+        if out is None and pool is not None:
+            out = pool.get('pcm', len(carrier), Riff.pcm_dtype(bit_depth))
+            data = Factory._quantize(carrier, bit_depth, out=out)
+        elif out is not None:
+            Factory._quantize(carrier, bit_depth, out=out)
+            return
+        else:
+            data = Factory._quantize(carrier, bit_depth)
+        Riff.write(Factory._wav_path(hz, wav_type, directory, modulation), data, sr=sr, bit_depth=bit_depth)
+
+    @staticmethod
+    def _quantize_stream(blocks: Iterable[np.ndarray], bit_depth: int=16,
+                            pool: BufferPool=None) -> Iterator[np.ndarray]:
+
+        """
+        Quantizes a stream of carrier blocks
+        ------------------------------------
+        Each block is only valid until the next one is requested
+        when a buffer pool is supplied
+        """
+        for block in blocks:
+            out = None if pool is None else pool.get('pcm', len(block), Riff.pcm_dtype(bit_depth))
+            yield Factory._quantize(block, bit_depth, out=out)
+
+    @staticmethod
+    def _stream_wav(blocks: Iterable[np.ndarray], sr: int, hz: float, wav_type: str,
+                    n_frames: int, path: str=None, memmap: bool=False, 
+                    bit_depth: int=16, pool: BufferPool=None) -> str:
+
+        """
+        Generates tone as wav file, one block at a time
+        -----------------------------------------------
+        Recieves:
+            - iterable of carrier blocks
+            - Sample Rate
+            - Starting Hz
+            - Wav Form Type
+            - total number of frames
+            - path (defaults to the sample package path)
+            - boolean switch to synthesize into a memory map of the file
+            - bit depth (16, 24 or 32 float)
+            - optional buffer pool to quantize into
+        Return:
+            - path of the wav file, only one block is ever held in memory
+        """
+        path = Factory._wav_path(hz, wav_type) if path is None else path
+
+        if not memmap:
+            Riff.write_stream(path, Factory._quantize_stream(blocks, bit_depth, pool), 
+                                sr=sr, n_frames=n_frames, bit_depth=bit_depth)
+            return path
+
+        data = Riff.memmap(path, sr=sr, n_frames=n_frames, bit_depth=bit_depth)
+        pos = 0
+        for block in blocks:
+            # quantize straight into the data chunk of the file
+            Factory._quantize(block, bit_depth, out=data[pos:pos + len(block)])
+            pos += len(block)
+        data.flush()
+        del data
+
+        return path
 
     @staticmethod
     def show_signal(wav_data: Union[List[float], 
@@ -179,14 +388,18 @@ class Factory:
             "sawtooth":"green",
             "triangle":"yellow"
         }
+        # matplotlib is only imported once a graph is drawn
+        plt = pyplot()
         fig = plt.figure()
         plt.rcParams['figure.facecolor'] = 'black'
         plt.rcParams['axes.facecolor'] = 'black'
 
-        if type(wav_data) == dict:
+        if isinstance(wav_data, Mapping):
 
             for wav_type, data in wav_data.items():
-                plt.plot(data[:zoom], color=multi_signal[wav_type])
+                # band-limited forms are dashed in the colour of their naive form
+                plt.plot(data[:zoom], color=multi_signal[PolyBlep.wav_types.get(wav_type, wav_type)],
+                            linestyle='--' if wav_type in PolyBlep.wav_types else '-')
         else:
             plt.plot(wav_data[:zoom], color='red')
 
@@ -194,6 +407,34 @@ class Factory:
 
         return fig
 
+class Carriers(Mapping):
+
+    """
+    Read only mapping of wav form type to carrier
+    ---------------------------------------------
+    Each carrier is rendered on first access and kept,
+    so only the wav forms that are used are ever computed
+    """
+
+    def __init__(self, render: Dict[str, Callable]):
+
+        self.__render = render
+        self.__carriers = {}
+
+    def __getitem__(self, wav_type: str):
+
+        if wav_type not in self.__carriers:
+            self.__carriers[wav_type] = self.__render[wav_type]()
+
+        return self.__carriers[wav_type]
+
+    def __iter__(self):
+        return iter(self.__render)
+
+    def __len__(self):
+        return len(self.__render)
+
+
 class Wav:
 
     """
@@ -208,28 +449,58 @@ class Wav:
     _modulator_hz: float = 0.25
     _ac: float = 1.0
     _ka: float = 0.25
+    # sets the modulation ('none', 'am', 'fm' or 'ring') and the
+    # ADSR envelope (attack, decay and release in seconds, sustain level)
+    _modulation: str = 'none'
+    _adsr: Tuple[float, float, float, float] = (0.0, 0.0, 1.0, 0.0)
+    # sets the oscillator engine
+    # 'direct' evaluates the wav form over the whole time grid
+    # 'wavetable' reads single cycle tables with a phase accumulator
+    _engine: str = 'direct'
+    # sets the number of notes rendered together in a system
+    _chunk_size: int = 8
+    # sets the number of samples per block when streaming
+    _stream_chunk: int = 65536
+    # sets the synthesis precision and the output bit depth
+    _precision: str = 'float64'
+    _bit_depth: int = 16
+
+    engines = ('direct', 'wavetable')
+    precisions = ('float64', 'float32')
+    wav_types = ('sine', 'square', 'square_duty', 'sawtooth', 'triangle',
+                    *PolyBlep.wav_types)
 
-    def __init__(self, carrier_hz: float=util.Transform.pitch_to_hz['A'][4]):
+    def __init__(self, carrier_hz: float=util.Transform.pitch_to_hz['A'][4], engine: str=None,
+                    config: RenderConfig=None):
 
         """
         Constructor develops necessary components to generate wav form and wav file
         ---------------------------------------------------------------------------
         Default Hz is A4 (440.0hz)
+        Settings are taken from the render config, which defaults
+        to a snapshot of the class level settings
         """
+        config = Wav.default_config() if config is None else config
+        config = config if engine is None else config._replace(engine=engine)
+        self.__config = config
         self.__hz = carrier_hz
-        self.__sr = Wav._sr
-        self.__duration = Wav._duration
-        self.__duty = Wav._duty
-        self.__modulator = np.sin(2 * np.pi * Wav._modulator_hz * ((self.__sr * self.__duration)/self.__sr))
-        self.__t_samples = np.arange(self.__sr * self.__duration)
-        self.__wav = 2 * np.pi * self.__hz * self.__t_samples / self.__sr
-        self.__W = {
-            'sine': self.sin_carrier,
-            'square': self.sq_carrier,
-            'square_duty': self.sq_duty_carrier,
-            'sawtooth': self.sawtooth_carrier,
-            'triangle': self.triangle_carrier
-        }
+        self.__sr = config.sr
+        self.__duration = config.duration
+        self.__duty = config.duty
+        self.__engine = config.engine
+        self.__modulator = None
+        # the time grid and phase are only built if the direct engine needs them
+        self.__t_samples = None
+        self.__wav = None
+        self.__W = Carriers({
+            'sine': lambda: self.sin_carrier,
+            'square': lambda: self.sq_carrier,
+            'square_duty': lambda: self.sq_duty_carrier,
+            'sawtooth': lambda: self.sawtooth_carrier,
+            'triangle': lambda: self.triangle_carrier,
+            **{wav_type: lambda wav_type=wav_type: self.carrier(wav_type)
+                for wav_type in PolyBlep.wav_types}
+        })
 
     # ~~~~ object configurations ~~~~~
     @property
@@ -264,36 +535,54 @@ class Wav:
     def duty(self, duty):
         self.__duty = duty
 
+    @property
+    def config(self):
+        return self.__config
+
+    @property
+    def engine(self):
+        return self.__engine
+
+    @property
+    def n_samples(self):
+        return int(self.sr * self.duration)
+
     @property
     def t_samples(self):
+        if self.__t_samples is None:
+            self.__t_samples = np.arange(self.sr * self.duration)
         return self.__t_samples
     
     @property
     def wav(self):
+        if self.__wav is None:
+            self.__wav = 2 * np.pi * self.hz * self.t_samples / self.sr
         return self.__wav
     
     @property
     def sin_carrier(self):
-        return np.sin(self.wav)
+        return self.carrier('sine')
 
     @property
     def sq_carrier(self):
-        return sg.square(self.wav)
+        return self.carrier('square')
 
     @property
     def sq_duty_carrier(self):
-        return sg.square(self.wav, self.duty)
+        return self.carrier('square_duty')
 
     @property
     def sawtooth_carrier(self):
-        return sg.sawtooth(self.wav)
+        return self.carrier('sawtooth')
 
     @property
     def triangle_carrier(self):
-        return np.abs(sg.sawtooth(self.wav))
+        return self.carrier('triangle')
 
     @property
     def modulator(self):
+        if self.__modulator is None:
+            self.__modulator = Modulation.modulator(self.config, 0, self.n_samples)
         return self.__modulator
     
     @property
@@ -324,41 +613,426 @@ class Wav:
     def update_kc(cls, ka: float):
         cls._ka = ka
 
+    @classmethod
+    def update_modulation(cls, modulation: str):
+        if modulation not in Modulation.types:
+            raise ValueError(f"unknown modulation: {modulation}")
+        cls._modulation = modulation
+
+    @classmethod
+    def update_adsr(cls, attack: float, decay: float, sustain: float, release: float):
+        cls._adsr = (float(attack), float(decay), float(sustain), float(release))
+
+    @classmethod
+    def default_config(cls) -> RenderConfig:
+
+        """
+        Snapshot of the class level settings as a render config
+        --------------------------------------------------------
+        """
+        return RenderConfig(tone_intvl=Hz.tone_intvl, sr=cls._sr, duration=cls._duration,
+                            duty=cls._duty, modulator_hz=cls._modulator_hz, ac=cls._ac,
+                            ka=cls._ka, modulation=cls._modulation, attack=cls._adsr[0],
+                            decay=cls._adsr[1], sustain=cls._adsr[2], release=cls._adsr[3],
+                            engine=cls._engine, chunk_size=cls._chunk_size,
+                            stream_chunk=cls._stream_chunk, precision=cls._precision,
+                            bit_depth=cls._bit_depth)
+
+    @staticmethod
+    def check_hz(hz: float, sr: int) -> float:
+
+        """
+        Validates the starting hz of a system
+        -------------------------------------
+        Returns:
+            - the hz as a float, raises ValueError unless it is
+            finite, positive and below the nyquist frequency
+        """
+        hz = float(hz)
+        if not (np.isfinite(hz) and 0 < hz < sr / 2):
+            raise ValueError(f"hz must be finite and within (0, {sr / 2}): {hz}")
+
+        return hz
+
+    @classmethod
+    def update_chunk_size(cls, chunk_size: int):
+        cls._chunk_size = chunk_size
+
+    @classmethod
+    def update_stream_chunk(cls, stream_chunk: int):
+        cls._stream_chunk = stream_chunk
+
+    @classmethod
+    def update_precision(cls, precision: str):
+        if precision not in cls.precisions:
+            raise ValueError(f"unknown precision: {precision}")
+        cls._precision = precision
+
+    @classmethod
+    def update_bit_depth(cls, bit_depth: int):
+        Riff.pcm_dtype(bit_depth)
+        cls._bit_depth = bit_depth
+
+    @classmethod
+    def update_engine(cls, engine: str):
+        if engine not in cls.engines:
+            raise ValueError(f"unknown engine: {engine}")
+        cls._engine = engine
+
     # ~~~~ object functionality ~~~~
-    def make_wav(self, wav_type: str, modulated: bool=False):
+    def carrier(self, wav_type: str, engine: str=None):
+
+        """
+        Generates the carrier of a wav form
+        -----------------------------------
+        Recieves:
+            - wav form type
+            - engine (defaults to the engine of the object)
+        Returns:
+            - carrier array over the whole duration
+        """
+        engine = self.engine if engine is None else engine
+
+        if engine == 'wavetable' or self.config.precision != 'float64' or wav_type in PolyBlep.wav_types:
+            # table lookups or wrapped phase, no time grid needed
+            return self.window(wav_type, engine=engine)
+
+        if engine != 'direct':
+            raise ValueError(f"unknown engine: {engine}")
+
+        wav = self.wav
+        if Modulation.bent(self.config):
+            wav = Modulation.bend_radians(wav.copy(), self.hz, self.config, 0)
+
+        return Modulation.apply(Wav._shape(wav_type=wav_type, wav=wav, duty=self.duty),
+                                self.config, 0)
+
+    def window(self, wav_type: str, start: int=0, stop: int=None, t_start: float=None,
+                t_stop: float=None, engine: str=None) -> np.ndarray:
+
+        """
+        Generates only a window of the carrier
+        --------------------------------------
+        Recieves:
+            - wav form type
+            - window in samples [start, stop), or in seconds [t_start, t_stop)
+            (the window is clipped to the duration of the wav)
+            - engine (defaults to the engine of the object)
+        Returns:
+            - the samples of the carrier inside the window, with the
+            same phase they have in the full carrier
+        """
+        start = start if t_start is None else int(round(t_start * self.sr))
+        stop = stop if t_stop is None else int(round(t_stop * self.sr))
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        start = max(0, min(start, stop))
+        engine = self.engine if engine is None else engine
+
+        if engine not in Wav.engines:
+            raise ValueError(f"unknown engine: {engine}")
+
+        if engine == 'wavetable' or self.config.precision != 'float64' or wav_type in PolyBlep.wav_types:
+            word = Wavetable.tuning_word(self.hz, self.sr)
+            acc = Modulation.bend(Wavetable.accumulate(word, start, stop), self.hz, self.config, start)
+            samples = Wav._render_phase(wav_type=wav_type, acc=acc, duty=self.duty, engine=engine,
+                                        dtype=self.config.precision, word=word)
+        else:
+            # the same phase the full time grid gives these samples
+            wav = 2 * np.pi * self.hz * np.arange(start, stop, dtype=np.float64) / self.sr
+            wav = Modulation.bend_radians(wav, self.hz, self.config, start)
+            samples = Wav._shape(wav_type=wav_type, wav=wav, duty=self.duty)
+
+        return Modulation.apply(samples, self.config, start)
+
+    @staticmethod
+    def _shape(wav_type: str, wav: np.ndarray, duty: float, out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Evaluates a wav form over an array of phase (in radians)
+        --------------------------------------------------------
+        The samples keep the precision of the phase, 'out' is used
+        by the wav forms that can be evaluated in place
+        """
+        with METRICS.timed('synthesis'):
+            if wav_type == 'sine':
+                samples = np.sin(wav, out=out)
+            elif wav_type == 'square':
+                samples = Shapes.square(wav, out=out)
+            elif wav_type == 'square_duty':
+                samples = Shapes.square(wav, duty, out=out)
+            elif wav_type == 'sawtooth':
+                samples = Shapes.sawtooth(wav, out=out)
+            elif wav_type == 'triangle':
+                samples = np.abs(Shapes.sawtooth(wav, out=out), out=out)
+            else:
+                raise KeyError(wav_type)
+
+        METRICS.count('synthesis', samples.nbytes)
+        return samples
+
+    @staticmethod
+    def _render_phase(wav_type: str, acc: np.ndarray, duty: float, engine: str,
+                        dtype: np.dtype=np.float64, pool: BufferPool=None,
+                        word: np.ndarray=None, out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Evaluates a wav form at wrapped accumulator phase
+        -------------------------------------------------
+        Recieves:
+            - wav form type
+            - fixed point phase from Wavetable.accumulate
+            - duty
+            - engine
+            - precision of the samples
+            - optional buffer pool holding the samples
+            - tuning word the phase advances by (needed by band-limited forms)
+            - optional array to write the samples into
+        Returns:
+            - samples, only valid until the pool is reused
+        """
+        with METRICS.timed('synthesis'):
+            samples = Wav._evaluate_phase(wav_type, acc, duty, engine, dtype, pool, word, out)
+
+        METRICS.count('synthesis', samples.nbytes)
+        return samples
+
+    @staticmethod
+    def _evaluate_phase(wav_type: str, acc: np.ndarray, duty: float, engine: str,
+                            dtype: np.dtype, pool: BufferPool, word: np.ndarray,
+                            out: np.ndarray=None) -> np.ndarray:
+
+        if out is None:
+            out = np.empty(acc.shape, dtype) if pool is None else pool.get('block', acc.shape, dtype)
+
+        if wav_type in PolyBlep.wav_types:
+            # corrected per frequency, so never read from a table
+            return PolyBlep.shape(wav_type, Wavetable.cycles(acc, out=out),
+                                    Wavetable.increment(word), duty=duty)
+
+        if engine == 'wavetable':
+            return Wavetable.lookup(Wavetable.table(wav_type, duty, dtype), acc, out=out)
+
+        # wrapped phase stays accurate in float32
+        wav = Wavetable.radians(acc, out=out)
+
+        # with the phase already in [0, 2pi) every wav form is evaluated
+        # in place, matching scipy.signal's square and sawtooth
+        if wav_type == 'sine':
+            np.sin(wav, out=wav)
+        elif wav_type in ('square', 'square_duty'):
+            high = np.less(wav, 2 * np.pi * (duty if wav_type == 'square_duty' else 0.5))
+            np.multiply(high, 2, out=wav)
+            wav -= 1
+        elif wav_type in ('sawtooth', 'triangle'):
+            wav /= np.pi
+            wav -= 1
+            if wav_type == 'triangle':
+                np.abs(wav, out=wav)
+        else:
+            raise KeyError(wav_type)
+
+        return wav
+
+    @classmethod
+    def iter_system(cls, freqs: List[float], wav_type: str, chunk_size: int=None, 
+                    engine: str=None, config: RenderConfig=None, pool: BufferPool=None):
+
+        """
+        Generates the carriers of a whole system in blocks of notes
+        -----------------------------------------------------------
+        Recieves:
+            - frequencies of the system
+            - wav form type
+            - chunk size (number of notes rendered per block)
+            - engine (defaults to the engine of the config)
+            - render config (defaults to the class settings)
+            - optional buffer pool, blocks are then only valid
+            until the next block is requested
+        Yields:
+            - slice of the notes in the block
+            - (n_block_notes, n_samples) array of carriers
+        
+        All notes share one time base, every block is a single broadcast
+        of a column of frequencies against it so the peak memory is bound
+        by chunk size rather than by the size of the system. The wrapped
+        phase (uint64, plus the table indices read from it) is only held
+        for one stream chunk of samples at a time, so it never outweighs
+        the block itself
+        """
+        config = cls.default_config() if config is None else config
+        freqs = np.asarray(freqs, dtype=np.float64)
+        chunk_size = config.chunk_size if chunk_size is None else chunk_size
+        engine = config.engine if engine is None else engine
+        n_samples = config.n_samples
+
+        # float64 direct synthesis evaluates the unwrapped time base,
+        # everything else reads the wrapped phase of the accumulator
+        unwrapped = (engine == 'direct' and config.precision == 'float64'
+                        and wav_type not in PolyBlep.wav_types)
+
+        if unwrapped:
+            # shared time base, scaled once to radians per hz
+            t_samples = 2 * np.pi * np.arange(n_samples) / config.sr
+
+        elif engine not in Wav.engines:
+            raise ValueError(f"unknown engine: {engine}")
+
+        for start in range(0, len(freqs), chunk_size):
+            rows = slice(start, min(start + chunk_size, len(freqs)))
+            hz = freqs[rows, np.newaxis]
+            shape = (rows.stop - rows.start, n_samples)
+
+            if unwrapped:
+                wav = None if pool is None else pool.get('phase', shape)
+                wav = Modulation.bend_radians(np.multiply(hz, t_samples, out=wav), hz, config, 0, pool)
+                block = Wav._shape(wav_type=wav_type, wav=wav, duty=config.duty, out=wav)
+            else:
+                word = Wavetable.tuning_word(hz, config.sr)
+                block = np.empty(shape, config.precision) if pool is None else pool.get('block', shape, config.precision)
+                for begin in range(0, n_samples, config.stream_chunk):
+                    cols = slice(begin, min(begin + config.stream_chunk, n_samples))
+                    span = (shape[0], cols.stop - cols.start)
+                    acc = None if pool is None else pool.get('acc', span, np.uint64)
+                    acc = Modulation.bend(Wavetable.accumulate(word, cols.start, cols.stop, out=acc),
+                                            hz, config, cols.start, pool)
+                    Wav._render_phase(wav_type=wav_type, acc=acc, duty=config.duty, engine=engine,
+                                        dtype=config.precision, pool=pool, word=word, out=block[:, cols])
+
+            # one gain, shared by every note of the block
+            yield rows, Modulation.apply(block, config, 0, pool)
+
+    @classmethod
+    def render_system(cls, freqs: List[float], wav_type: str, chunk_size: int=None,
+                        engine: str=None, out: np.ndarray=None, config: RenderConfig=None) -> np.ndarray:
+
+        """
+        Renders a whole system in one vectorized pass
+        ---------------------------------------------
+        Recieves:
+            - frequencies of the system
+            - wav form type
+            - chunk size (number of notes rendered per block)
+            - engine (defaults to the engine of the config)
+            - optional (n_notes, n_samples) array to fill
+            - render config (defaults to the class settings)
+        Returns:
+            - (n_notes, n_samples) array, one carrier per row
+        """
+        config = cls.default_config() if config is None else config
+        if out is None:
+            out = np.empty((len(freqs), config.n_samples), dtype=config.precision)
+
+        for rows, block in cls.iter_system(freqs=freqs, wav_type=wav_type, chunk_size=chunk_size,
+                                            engine=engine, config=config):
+            out[rows] = block
+
+        return out
+
+    def make_wav(self, wav_type: str, modulated: bool=False, engine: str=None,
+                    out: np.ndarray=None, directory: str='sample_packages'):
 
         """
         Generates Wav File
         ------------------
         Recieves:
             - wav form type
-            - boolean switch if modulation desired
+            - boolean switch for amplitude modulation, when the
+            config of the object has no modulation of its own
+            - engine (defaults to the engine of the object)
+            - optional buffer to receive the tone instead of a file
+            - directory to write the wav file into
         Returns:
-            - Generated Wav File
+            - Generated Wav File, named after its modulation
         """
+        with METRICS.timed('make_wav'):
+            wav = self
+            if modulated and self.config.modulation == 'none':
+                # the modulation is rendered into the carrier by a modulated copy
+                wav = Wav(self.hz, config=self.config._replace(modulation='am'))
 
-        if modulated:
-            # if modulation is turned on, necessary components are automatically added
-            Factory._make_wav(carrier=self.W[wav_type], sr=self.sr,
-                        hz=self.hz, wav_type=wav_type, modulator=self.modulator, 
-                        ac=Wav._ac, ka=Wav._ka)
+            if wav is self and (engine is None or engine == self.engine):
+                carrier = self.W[wav_type]
+            else:
+                carrier = wav.carrier(wav_type, engine=engine)
 
-        else:
-            # if modulation is not declared, a persistant tone is generated
-            Factory._make_wav(carrier=self.W[wav_type], sr=self.sr, 
-                    hz=self.hz, wav_type=wav_type)
+            Factory._make_wav(carrier=carrier, sr=self.sr, hz=self.hz, wav_type=wav_type, 
+                    out=out, directory=directory, bit_depth=self.config.bit_depth,
+                    modulation=wav.config.modulation)
+
+    def stream(self, wav_type: str, chunk_size: int=None, engine: str=None,
+                pool: BufferPool=None) -> Iterator[np.ndarray]:
+
+        """
+        Generates the carrier one block at a time
+        -----------------------------------------
+        Recieves:
+            - wav form type
+            - chunk size (samples per block)
+            - engine (defaults to the engine of the object)
+            - optional buffer pool, blocks are then only valid
+            until the next block is requested
+        Yields:
+            - consecutive blocks of the carrier over the whole duration
 
+        The phase is carried between blocks as a wrapped fixed point
+        accumulator, so long tones stay continuous and do not drift
+        """
+        engine = self.engine if engine is None else engine
+        chunk_size = self.config.stream_chunk if chunk_size is None else chunk_size
+        word = Wavetable.tuning_word(self.hz, self.sr)
+        phase = 0
+
+        if engine not in Wav.engines:
+            raise ValueError(f"unknown engine: {engine}")
+
+        for start in range(0, self.n_samples, chunk_size):
+            n_block = min(chunk_size, self.n_samples - start)
+            acc = None if pool is None else pool.get('acc', n_block, np.uint64)
+            acc = Modulation.bend(Wavetable.accumulate(word, 0, n_block, phase, out=acc),
+                                    self.hz, self.config, start, pool)
+            block = Wav._render_phase(wav_type=wav_type, acc=acc, duty=self.duty, engine=engine,
+                                        dtype=self.config.precision, pool=pool, word=word)
+
+            yield Modulation.apply(block, self.config, start, pool)
+
+            phase = Wavetable.advance(phase, word, n_block)
+
+    def stream_wav(self, wav_type: str, path: str=None, chunk_size: int=None,
+                    engine: str=None, memmap: bool=False) -> str:
+
+        """
+        Generates Wav File with bounded memory
+        --------------------------------------
+        Recieves:
+            - wav form type
+            - path (defaults to the sample package path)
+            - chunk size (samples per block)
+            - engine (defaults to the engine of the object)
+            - boolean switch to synthesize into a memory map of the file
+        Returns:
+            - path of the generated wav file
+        """
+        # one set of block buffers serves the whole tone
+        pool = BufferPool()
+        path = Factory._wav_path(self.hz, wav_type, modulation=self.config.modulation) if path is None else path
+        return Factory._stream_wav(blocks=self.stream(wav_type, chunk_size=chunk_size, engine=engine, pool=pool),
+                                    sr=self.sr, hz=self.hz, wav_type=wav_type, n_frames=self.n_samples, 
+                                    path=path, memmap=memmap, bit_depth=self.config.bit_depth, pool=pool)
 
-    def show_wav(self, wav_type: str, zoom: int=500) -> FIG:
+    def show_wav(self, wav_type: str, zoom: int=500, start: int=0) -> FIG:
 
         """
         Generates a visual representation of the signal
         -----------------------------------------------
+        Only the 'zoom' samples from 'start' on are computed
         """
         if wav_type == 'all': 
-            wav_data=self.W
+            wav_data = {
+                w_type: self.window(w_type, start=start, stop=start + zoom)
+                for w_type in Wav.wav_types
+            }
 
         else: 
-            wav_data = self.W[wav_type]
+            wav_data = self.window(wav_type, start=start, stop=start + zoom)
 
         return Factory.show_signal(wav_data=wav_data, zoom=zoom)
\ No newline at end of file
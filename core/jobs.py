@@ -0,0 +1,215 @@
+from core import (json, uuid, threading, OrderedDict, ThreadPoolExecutor,
+                    Dict, Callable, Iterator, METRICS)
+
+# ~ ~ ~ ~ ~ ~ Render Job Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Cancelled(Exception):
+    """
+    Raised inside a render once its job has been cancelled
+    """
+
+
+class Job:
+    """
+    Job object tracks a single render submitted to the queue
+    --------------------------------------------------------
+        - progress is counted in notes, every change wakes up
+    anyone waiting on the job (pollers and event streams)
+
+        - the result is whatever the render returns, pack renders
+    return the key of the pack in RENDER_CACHE so a finished job
+    never holds the pack itself
+    """
+    states = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+    def __init__(self, total: int, params: Dict):
+
+        self.__id = uuid.uuid4().hex
+        self.__total = total
+        self.__params = params
+        self.__done = 0
+        self.__state = 'queued'
+        self.__error = None
+        self.__result = None
+        self.__version = 0
+        self.__cancel = threading.Event()
+        self.__changed = threading.Condition()
+
+    @property
+    def id(self):
+        return self.__id
+
+    @property
+    def state(self):
+        return self.__state
+
+    @property
+    def finished(self):
+        return self.__state in ('done', 'failed', 'cancelled')
+
+    @property
+    def result(self):
+        return self.__result
+
+    @property
+    def version(self):
+        return self.__version
+
+    def __update(self, **changes):
+        with self.__changed:
+            for name, value in changes.items():
+                setattr(self, f"_Job__{name}", value)
+            self.__version += 1
+            self.__changed.notify_all()
+
+    def start(self):
+        self.__update(state='running')
+
+    def advance(self, n_notes: int=1):
+        self.check()
+        self.__update(done=min(self.__total, self.__done + n_notes))
+
+    def finish(self, result: str):
+        self.__update(state='done', done=self.__total, result=result)
+
+    def fail(self, error: BaseException):
+        if isinstance(error, Cancelled):
+            self.__update(state='cancelled')
+        else:
+            self.__update(state='failed', error=repr(error))
+
+    def cancel(self):
+        self.__cancel.set()
+        if self.__state == 'queued':
+            self.__update(state='cancelled')
+
+    def check(self):
+
+        """
+        Stops the render if the job has been cancelled
+        -----------------------------------------------
+        """
+        if self.__cancel.is_set():
+            raise Cancelled(self.__id)
+
+    def wait(self, version: int, timeout: float=None) -> bool:
+
+        """
+        Waits until the job changes past a known version
+        ------------------------------------------------
+        """
+        with self.__changed:
+            return self.__changed.wait_for(lambda: self.__version != version, timeout=timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.__id,
+            'state': self.__state,
+            'done': self.__done,
+            'total': self.__total,
+            'progress': self.__done / self.__total if self.__total else 1.0,
+            'error': self.__error,
+            'params': self.__params
+        }
+
+
+class JobQueue:
+    """
+    JobQueue object runs renders in an in process worker pool
+    ---------------------------------------------------------
+        - submit returns immediately with a job, its progress can
+    be polled or streamed and its result fetched once it is done
+
+        - NumPy releases the GIL in its kernels so worker threads
+    render concurrently, finished jobs are kept until the newest
+    'keep' finished jobs push them out. Jobs only keep small results
+    (keys), their renders stay within the bounds of the render cache
+
+        - Jobs live in the memory of their process, the server runs
+    a single (threaded) worker process for them (gunicorn.conf.py)
+    """
+
+    def __init__(self, workers: int=2, keep: int=64):
+
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pitchcraft-job')
+        self.__keep = keep
+        self.__jobs: Dict[str, Job] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __prune(self):
+        finished = [job_id for job_id, job in self.__jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.__keep)]:
+            del self.__jobs[job_id]
+
+    def __run(self, job: Job, render: Callable[[Job], str]):
+
+        if job.finished:
+            # cancelled while it was queued
+            return
+        job.start()
+        try:
+            with METRICS.timed('job'):
+                result = render(job)
+            job.finish(result)
+        except BaseException as error:
+            job.fail(error)
+
+    def submit(self, render: Callable[[Job], str], total: int, params: Dict=None) -> Job:
+
+        """
+        Queues a render
+        ---------------
+        Receives:
+            - render function, called with its job, returning its
+            result (the render cache key of a pack)
+            - number of notes in the render
+            - parameters of the render (reported back with the job)
+        Returns:
+            - the queued job
+        """
+        job = Job(total=total, params=params or {})
+        with self.__lock:
+            self.__prune()
+            self.__jobs[job.id] = job
+        self.__pool.submit(self.__run, job, render)
+
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self.__lock:
+            return self.__jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def events(self, job_id: str, heartbeat: float=15.0) -> Iterator[str]:
+
+        """
+        Streams the progress of a job as server sent events
+        ---------------------------------------------------
+        """
+        job = self.get(job_id)
+        version = None
+        while job is not None:
+            if job.version != version:
+                version = job.version
+                yield f"data: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+            elif not job.wait(version, timeout=heartbeat):
+                # keeps proxies from closing an idle stream
+                yield ": heartbeat\n\n"
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            states = [job.state for job in self.__jobs.values()]
+        return {state: states.count(state) for state in Job.states}
+
+
+# shared by every request of the process
+JOBS = JobQueue()
+# queue depth and renders in flight
+METRICS.register('jobs', JOBS.stats, label='state')
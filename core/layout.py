@@ -31,7 +31,8 @@ standard_layout=html.Div(
         dcc.Dropdown(id='input-sys-size',
                     options=[
                         {'label': i, 'value': i,}
-                        for i in core.util.Systems.octave_systems.values()
+                        for i in dict.fromkeys(min(size, core.Archive.max_notes(core.Wav.default_config()))
+                                                for size in core.util.Systems.octave_systems.values())
                     ],
                     value=88,
                     placeholder='System Size',
@@ -46,15 +47,68 @@ standard_layout=html.Div(
                     type='text',
                     value='sine',
                     placeholder='wav form'),
+
+        dcc.Dropdown(id='input-modulation',
+                    options=[
+                        {'label': i, 'value': i,}
+                        for i in core.Modulation.types
+                    ],
+                    value='none',
+                    placeholder='Modulation',
+                    style={
+                        'width': '45%'
+                    }),
         html.Hr(),
 
         html.H3('Make Samples'),
 
+        # a single seamless loop per note instead of the whole duration
+        dcc.Checklist(id='input-loop',
+                    options=[
+                        {'label': 'Loop', 'value': 'loop'}
+                    ],
+                    value=[]),
+
+        # a wav file per note, or one wav file with an index and an SFZ mapping
+        dcc.RadioItems(id='input-layout',
+                    options=[
+                        {'label': i, 'value': i,}
+                        for i in core.Archive.layouts
+                    ],
+                    value='files'),
+
         html.Button('Generate',
                     id='make-command', n_clicks=0),
+
+        html.Button('Cancel',
+                    id='cancel-command', n_clicks=0),
         html.Br(),
+
+        html.Progress(id='job-progress',
+                    value='0',
+                    max='1'),
+
+        html.Div(id='job-status'),
+
+        # the render runs as a job, its progress is polled
+        dcc.Interval(id='job-poll',
+                    interval=500,
+                    disabled=True),
+
+        dcc.Store(id='job-id'),
         
-        html.A(id='download-link', children='Download Samples')
+        html.A(id='download-link', children='Download Samples'),
+        html.Hr(),
+
+        html.H3('View Samples'),
+
+        # full length views, decimated before they reach the browser
+        dcc.Graph(id='waveform-graph'),
+
+        html.Img(id='spectrogram-image',
+                    style={
+                        'width': '100%'
+                    })
 ],
 className='container')
 
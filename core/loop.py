@@ -0,0 +1,156 @@
+from core import np, NamedTuple, Tuple, Wav, Factory, BufferPool, Riff, RenderConfig
+
+# ~ ~ ~ ~ ~ ~ Loop Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class LoopPoints(NamedTuple):
+    """
+    Loop of a single note
+    ---------------------
+        - frames before the loop (the attack and decay of the note)
+        - frames of the loop
+        - whole cycles of the tone inside the loop
+        - frequency retuned so the cycles fit the loop exactly
+        and the retuning in cents
+        - config the looped note is rendered from
+    """
+    head: int
+    length: int
+    cycles: int
+    hz: float
+    cents: float
+    config: RenderConfig
+
+    @property
+    def n_frames(self) -> int:
+        return self.head + self.length
+
+
+class Loop:
+    """
+    Loop object renders notes as a single seamless loop
+    ---------------------------------------------------
+        - The tones are strictly periodic, so instead of the whole
+    duration only a whole number of cycles is rendered. A loop of
+    n frames holds k cycles of hz when n = k * sr / hz, which is
+    never exact: every k up to the longest loop is tried at once
+    and the shortest whose retuning (to k * sr / n) stays within
+    the tolerance is kept, the closest one otherwise
+
+        - Modulated notes also need a whole number of modulator
+    cycles, so their loop is one modulator period long
+
+        - The attack and decay of the envelope are rendered ahead of
+    the loop, the release is left to the sampler. The loop points
+    are written to the 'smpl' chunk of the wav file
+    """
+    # sets the longest loop in seconds and the allowed retuning in cents
+    _max_seconds: float = 1.0
+    _tolerance: float = 0.1
+
+    @classmethod
+    def update_max_seconds(cls, max_seconds: float):
+        cls._max_seconds = max_seconds
+
+    @classmethod
+    def update_tolerance(cls, tolerance: float):
+        cls._tolerance = tolerance
+
+    @classmethod
+    def fit(cls, hz: float, sr: int, max_frames: int=None, tolerance: float=None) -> Tuple[int, int]:
+
+        """
+        Finds the shortest loop of whole cycles
+        ---------------------------------------
+        Receives:
+            - frequency and sample rate
+            - longest loop in frames
+            - allowed retuning in cents
+        Returns:
+            - frames and cycles of the loop
+        """
+        max_frames = int(cls._max_seconds * sr) if max_frames is None else max_frames
+        tolerance = cls._tolerance if tolerance is None else tolerance
+
+        # every whole number of cycles that fits, at least one
+        cycles = np.arange(1, max(1, int(max_frames * hz / sr)) + 1)
+        frames = np.maximum(np.round(cycles * sr / hz), 1)
+        cents = np.abs(1200 * np.log2(cycles * sr / (frames * hz)))
+        within = np.flatnonzero(cents <= tolerance)
+        best = within[0] if len(within) else np.argmin(cents)
+
+        return int(frames[best]), int(cycles[best])
+
+    @staticmethod
+    def _duration(n_frames: int, sr: int) -> float:
+        # the duration whose frame count is exactly n_frames
+        duration = n_frames / sr
+        while int(sr * duration) < n_frames:
+            duration = np.nextafter(duration, np.inf)
+        while int(sr * duration) > n_frames:
+            duration = np.nextafter(duration, 0)
+
+        return float(duration)
+
+    @classmethod
+    def points(cls, hz: float, config: RenderConfig) -> LoopPoints:
+
+        """
+        Loop of a note
+        --------------
+        Receives:
+            - frequency of the note
+            - render config of the note
+        Returns:
+            - loop points and the config the looped note is rendered from
+        """
+        sr = config.sr
+        head = int(round((config.attack + config.decay) * sr))
+
+        if config.modulation != 'none' and config.modulator_hz > 0:
+            # one modulator period, both tones retuned to fit it
+            length = max(1, int(round(sr / config.modulator_hz)))
+            cycles = max(1, int(round(length * hz / sr)))
+            config = config._replace(modulator_hz=sr / length)
+        else:
+            length, cycles = cls.fit(hz, sr)
+
+        config = config._replace(duration=cls._duration(head + length, sr), release=0.0)
+
+        retuned = cycles * sr / length
+        return LoopPoints(head, length, cycles, retuned, float(1200 * np.log2(retuned / hz)), config)
+
+    @classmethod
+    def size(cls, hz: float, config: RenderConfig) -> int:
+
+        """
+        Size in bytes of the wav file of a looped note
+        ----------------------------------------------
+        """
+        return Riff.size(cls.points(hz, config).n_frames, config.bit_depth,
+                            extra=len(Riff.smpl(config.sr, 0, 1)))
+
+    @classmethod
+    def wav_bytes(cls, hz: float, wav_type: str, config: RenderConfig, pool: BufferPool=None) -> bytes:
+
+        """
+        Renders a note as the bytes of a looped wav file
+        ------------------------------------------------
+        Receives:
+            - frequency of the note
+            - wav form type
+            - render config of the note
+            - optional buffer pool shared by the notes of a pack
+        Returns:
+            - wav file holding the attack and the loop, with the
+            loop points in its 'smpl' chunk
+        """
+        loop = cls.points(hz, config)
+        wav = Wav(loop.hz, config=loop.config)
+        header = Riff.header(sr=config.sr, n_frames=loop.n_frames, bit_depth=config.bit_depth,
+                                extra=Riff.smpl(config.sr, loop.head, loop.n_frames, hz))
+
+        data = b''.join([header, *(Riff.frames(block, config.bit_depth) for block in
+                            Factory._quantize_stream(wav.stream(wav_type, pool=pool), config.bit_depth, pool))])
+
+        # odd sized 24 bit data chunks are padded to a word
+        return data + b'\x00' * (cls.size(hz, config) - len(data))
@@ -0,0 +1,131 @@
+from core import os, time, threading, contextmanager, nullcontext, Dict, Tuple, Callable, Iterator
+
+# ~ ~ ~ ~ ~ ~ Metrics Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Metrics:
+    """
+    Metrics object counts the time and bytes of every render stage
+    ---------------------------------------------------------------
+        - Stages are timed with 'timed' and their output counted
+    with 'count'. While metrics are disabled both return a no-op
+    straight away, so the render path only pays the call. The
+    make_wav and job stages include the stages they run
+
+        - Gauges (queue depth, renders in flight, cache state) are
+    only read when the metrics are exposed, by the collectors
+    registered with 'register'
+
+        - Counters are per process, renders run in the process pool
+    of Pack are not counted
+    """
+    # enabled with the PITCHCRAFT_METRICS environment variable
+    _enabled: bool = os.environ.get('PITCHCRAFT_METRICS', '0') not in ('', '0')
+
+    stages = ('synthesis', 'quantize', 'encode', 'write', 'archive', 'cleanup', 'make_wav', 'job')
+
+    def __init__(self):
+
+        self.__lock = threading.Lock()
+        self.__seconds = dict.fromkeys(Metrics.stages, 0.0)
+        self.__calls = dict.fromkeys(Metrics.stages, 0)
+        self.__bytes = dict.fromkeys(Metrics.stages, 0)
+        self.__collectors: Dict[str, Tuple[Callable[[], Dict], str]] = {}
+
+    @classmethod
+    def update_enabled(cls, enabled: bool):
+        cls._enabled = enabled
+
+    @property
+    def enabled(self):
+        return Metrics._enabled
+
+    @contextmanager
+    def __timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.__lock:
+                self.__seconds[stage] += elapsed
+                self.__calls[stage] += 1
+
+    def timed(self, stage: str):
+
+        """
+        Times a stage of a render
+        -------------------------
+        Used as a context manager around the stage
+        """
+        if not Metrics._enabled:
+            return nullcontext()
+        return self.__timer(stage)
+
+    def count(self, stage: str, n_bytes: int):
+
+        """
+        Counts the bytes a stage produced
+        ---------------------------------
+        """
+        if Metrics._enabled:
+            with self.__lock:
+                self.__bytes[stage] += int(n_bytes)
+
+    def register(self, name: str, collect: Callable[[], Dict], label: str=None):
+
+        """
+        Registers a gauge collector
+        ---------------------------
+        Receives:
+            - name prefix of the collected metrics
+            - function returning {metric: value}, read on every exposition
+            - label name, the metrics are then the values of one
+            labelled metric named after the prefix
+        """
+        self.__collectors[name] = (collect, label)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self.__lock:
+            return {'seconds': dict(self.__seconds), 'calls': dict(self.__calls),
+                    'bytes': dict(self.__bytes)}
+
+    def exposition(self) -> str:
+
+        """
+        Renders every metric in the Prometheus text format
+        --------------------------------------------------
+        """
+        lines = []
+
+        def family(name: str, kind: str, help: str, samples: Iterator[Tuple[str, float]]):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+        snapshot = self.snapshot()
+        family('pitchcraft_metrics_enabled', 'gauge', 'Whether render stages are instrumented',
+                [('', int(Metrics._enabled))])
+        family('pitchcraft_stage_seconds_total', 'counter', 'Time spent in each render stage',
+                ((f'{{stage="{stage}"}}', value) for stage, value in snapshot['seconds'].items()))
+        family('pitchcraft_stage_calls_total', 'counter', 'Number of times each render stage ran',
+                ((f'{{stage="{stage}"}}', value) for stage, value in snapshot['calls'].items()))
+        family('pitchcraft_stage_bytes_total', 'counter', 'Bytes produced by each render stage',
+                ((f'{{stage="{stage}"}}', value) for stage, value in snapshot['bytes'].items()))
+
+        for prefix, (collect, label) in self.__collectors.items():
+            values = collect()
+            if label is not None:
+                family(f"pitchcraft_{prefix}", 'gauge', f"{prefix} by {label}".replace('_', ' '),
+                        ((f'{{{label}="{key}"}}', value) for key, value in values.items()))
+                continue
+
+            for metric, value in values.items():
+                kind = 'counter' if metric.endswith('_total') else 'gauge'
+                family(f"pitchcraft_{prefix}_{metric}", kind, f"{prefix} {metric}".replace('_', ' '),
+                        [('', value)])
+
+        return '\n'.join(lines) + '\n'
+
+
+# shared by every request of the process
+METRICS = Metrics()
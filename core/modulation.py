@@ -0,0 +1,250 @@
+from core import np, Tuple, Wavetable, RenderConfig
+
+# ~ ~ ~ ~ ~ ~ Modulation Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Modulation:
+    """
+    Modulation object shapes carriers with a low frequency modulator
+    -----------------------------------------------------------------
+        - The modulator is m(t) = sin(2pi * modulator_hz * t) and the
+    carrier amplitude is ac, both from the render config:
+            am:   ac * (1 + ka * m(t)) * carrier
+            ring: ac * m(t) * carrier
+            fm:   ac * carrier(phase + ka * hz / modulator_hz * m(t))
+    so fm swings the frequency of every note by ka of itself
+
+        - An ADSR envelope (attack, decay, sustain, release) shapes
+    the amplitude of every note over its duration
+
+        - Amplitude modulation and the envelope are fused into one
+    gain per sample, computed in place in pooled buffers, and shared
+    by every note of a block. A pool keeps the modulator and the gain
+    of a whole note, so the notes of a pack rendered one after the
+    other (and block by block) compute them once
+
+        - Frequency modulation is added to the phase: to the fixed
+    point accumulator, so every engine and every wav form (band-limited
+    ones included) is modulated the same way, or to the unwrapped
+    phase of direct float64 synthesis
+    """
+    types = ('none', 'am', 'fm', 'ring')
+
+    @staticmethod
+    def _whole(pool, name: str, tag: tuple, config: RenderConfig, start: int, stop: int,
+                fill) -> np.ndarray:
+
+        """
+        Samples [start, stop) of a signal shared by every note
+        ------------------------------------------------------
+        Without a pool only the window is computed, with one the whole
+        note is computed once and every block of every note slices it
+        """
+        if pool is None:
+            return fill(np.empty(stop - start), start)
+
+        whole, filled = pool.cached(name, tag, config.n_samples)
+        if not filled:
+            fill(whole, 0)
+
+        return whole[start:stop]
+
+    @staticmethod
+    def adsr(config: RenderConfig) -> Tuple[float, float, float, float]:
+        return config.attack, config.decay, config.sustain, config.release
+
+    @staticmethod
+    def check_adsr(attack: float, decay: float, sustain: float, release: float) -> Tuple[float, float, float, float]:
+
+        """
+        Validates an ADSR envelope
+        --------------------------
+        Returns:
+            - the stages as floats, raises ValueError unless every
+            stage is finite, the times are not negative and the
+            sustain level is within [0, 1]
+        """
+        stages = tuple(float(stage) for stage in (attack, decay, sustain, release))
+        if not all(np.isfinite(stages)):
+            raise ValueError(f"ADSR stages must be finite: {stages}")
+        if min(stages[0], stages[1], stages[3]) < 0:
+            raise ValueError(f"ADSR times cannot be negative: {stages}")
+        if not 0 <= stages[2] <= 1:
+            raise ValueError(f"ADSR sustain must be within [0, 1]: {stages[2]}")
+
+        return stages
+
+    @staticmethod
+    def shaped(config: RenderConfig) -> bool:
+
+        """
+        Whether the amplitude of the notes changes at all
+        -------------------------------------------------
+        """
+        return (config.modulation in ('am', 'ring') or (config.modulation == 'fm' and config.ac != 1)
+                or Modulation.adsr(config) != (0.0, 0.0, 1.0, 0.0))
+
+    @staticmethod
+    def bent(config: RenderConfig) -> bool:
+
+        """
+        Whether the phase of the notes is modulated
+        -------------------------------------------
+        """
+        return config.modulation == 'fm' and config.ka != 0 and config.modulator_hz != 0
+
+    @classmethod
+    def modulator(cls, config: RenderConfig, start: int, stop: int, pool=None) -> np.ndarray:
+
+        """
+        Samples [start, stop) of the modulator
+        --------------------------------------
+        """
+        def fill(m: np.ndarray, first: int) -> np.ndarray:
+            m[:] = np.arange(first, first + len(m))
+            m *= 2 * np.pi * config.modulator_hz / config.sr
+            return np.sin(m, out=m)
+
+        return cls._whole(pool, 'modulator', (config.modulator_hz, config.sr), config, start, stop, fill)
+
+    @classmethod
+    def gain(cls, config: RenderConfig, start: int, stop: int, pool=None) -> np.ndarray:
+
+        """
+        Amplitude of samples [start, stop) of every note
+        ------------------------------------------------
+        Receives:
+            - render config
+            - window of sample positions
+            - optional buffer pool holding the gain
+        Returns:
+            - the modulation and the envelope fused into one gain
+            per sample, None if the notes are not shaped at all
+        """
+        if not cls.shaped(config):
+            return None
+
+        def fill(gain: np.ndarray, first: int) -> np.ndarray:
+            last = first + len(gain)
+            if config.modulation == 'am':
+                np.multiply(cls.modulator(config, first, last, pool), config.ka, out=gain)
+                gain += 1
+                gain *= config.ac
+            elif config.modulation == 'ring':
+                np.multiply(cls.modulator(config, first, last, pool), config.ac, out=gain)
+            else:
+                gain.fill(1.0 if config.modulation == 'none' else config.ac)
+
+            return cls._envelope(gain, config, first)
+
+        tag = (config.modulation, config.modulator_hz, config.ac, config.ka, cls.adsr(config),
+                config.duration, config.sr)
+        return cls._whole(pool, 'gain', tag, config, start, stop, fill)
+
+    @classmethod
+    def _envelope(cls, gain: np.ndarray, config: RenderConfig, first: int) -> np.ndarray:
+
+        """
+        Applies the ADSR envelope to a gain in place
+        --------------------------------------------
+        """
+        attack, decay, sustain, release = cls.adsr(config)
+        if (attack, decay, sustain, release) == (0.0, 0.0, 1.0, 0.0):
+            return gain
+
+        # seconds since the start of the note
+        t = np.arange(first, first + len(gain)) / config.sr
+        env = np.empty_like(t)
+
+        if attack > 0:
+            np.multiply(t, 1 / attack, out=env)
+            gain *= np.minimum(env, 1, out=env)
+        if sustain != 1:
+            # falls from full scale to the sustain level after the attack
+            if decay > 0:
+                np.subtract(t, attack, out=env)
+                env /= decay
+                np.clip(env, 0, 1, out=env)
+            else:
+                np.greater_equal(t, attack, out=env)
+            env *= sustain - 1
+            env += 1
+            gain *= env
+        if release > 0:
+            # fades out over the last 'release' seconds of the note
+            np.subtract(config.duration, t, out=env)
+            env /= release
+            gain *= np.clip(env, 0, 1, out=env)
+
+        return gain
+
+    @classmethod
+    def apply(cls, samples: np.ndarray, config: RenderConfig, start: int, pool=None) -> np.ndarray:
+
+        """
+        Shapes samples in place
+        -----------------------
+        Receives:
+            - samples, one note per row (or a single note)
+            - render config
+            - position of the first sample in the note
+            - optional buffer pool holding the gain
+        Returns:
+            - the samples, with the gain of their positions applied
+        """
+        gain = cls.gain(config, start, start + samples.shape[-1], pool)
+        if gain is not None:
+            np.multiply(samples, gain, out=samples)
+
+        return samples
+
+    @classmethod
+    def bend(cls, acc: np.ndarray, hz, config: RenderConfig, start: int, pool=None) -> np.ndarray:
+
+        """
+        Frequency modulates accumulator phase in place
+        ----------------------------------------------
+        Receives:
+            - fixed point phase of samples from 'start' on
+            - frequency (scalar, or column vector for many notes)
+            - render config
+            - position of the first sample in the note
+            - optional buffer pool holding the phase offset
+        Returns:
+            - the phase, offset by the integral of the frequency swing
+        """
+        if not cls.bent(config):
+            return acc
+
+        # phase offset in fixed point, reduced to one cycle
+        full_cycle = float(1 << Wavetable._phase_bits)
+        offset = cls._offset(acc.shape, hz, config, start, pool, unit=2 * np.pi / full_cycle)
+        np.mod(offset, full_cycle, out=offset)
+        # exact in float64, both terms are below 2**49
+        np.add(acc, offset, out=acc, casting='unsafe')
+        acc &= np.uint64((1 << Wavetable._phase_bits) - 1)
+
+        return acc
+
+    @classmethod
+    def bend_radians(cls, wav: np.ndarray, hz, config: RenderConfig, start: int,
+                        pool=None) -> np.ndarray:
+
+        """
+        Frequency modulates unwrapped phase (in radians) in place
+        ---------------------------------------------------------
+        The same offset as 'bend', for direct float64 synthesis
+        """
+        if cls.bent(config):
+            wav += cls._offset(wav.shape, hz, config, start, pool, unit=1.0)
+
+        return wav
+
+    @classmethod
+    def _offset(cls, shape: tuple, hz, config: RenderConfig, start: int, pool,
+                unit: float) -> np.ndarray:
+
+        # integral of a swing of ka * hz, in radians per unit of offset
+        depth = np.asarray(hz, dtype=np.float64) * (config.ka / (unit * config.modulator_hz))
+        m = cls.modulator(config, start, start + shape[-1], pool)
+
+        return np.multiply(depth, m, out=None if pool is None else pool.get('offset', shape))
@@ -0,0 +1,360 @@
+from core import np, Dict, Tuple, Union
+ARRAY = Union[float, np.ndarray]
+
+# ~ ~ ~ ~ ~ ~ Oscillator Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Shapes:
+    """
+    Naive wav forms over a phase in radians
+    ---------------------------------------
+    The same arithmetic as scipy.signal's square and sawtooth (so the
+    same samples) without importing scipy.signal, and evaluated in
+    place when 'out' is supplied
+    """
+
+    @staticmethod
+    def square(phase: np.ndarray, duty: float=0.5, out: np.ndarray=None) -> np.ndarray:
+        # 1 on the first duty of every cycle, -1 on the rest
+        high = np.mod(phase, 2 * np.pi) < duty * 2 * np.pi
+        out = np.multiply(high, 2.0, out=out)
+        out -= 1
+
+        return out
+
+    @staticmethod
+    def sawtooth(phase: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+        # rises from -1 to 1 over every cycle
+        out = np.mod(phase, 2 * np.pi, out=out)
+        out /= np.pi
+        out -= 1
+
+        return out
+
+
+class Wavetable:
+    """
+    Wavetable object reads precomputed single cycle wav forms
+    ---------------------------------------------------------
+        - Direct digital synthesis (DDS): the phase of the oscillator
+    is held in a fixed point accumulator where one full cycle is 2**48.
+    Each sample the accumulator advances by a tuning word proportional
+    to the frequency and wraps around for free in integer math
+
+        - The top bits of the accumulator index a single cycle table
+    of the wav form, the remaining bits are the fractional position
+    between two table entries used for linear interpolation
+
+        - Since the phase of any sample is (n * tuning word) mod 2**48
+    any window of samples can be read without drift, and uint64
+    products stay exact modulo the accumulator width
+    """
+    # sets the accumulator and table resolution
+    _phase_bits: int = 48
+    _table_bits: int = 12
+    _interpolation: str = 'linear'
+    # single cycle tables keyed by wav form type, duty, size and precision
+    _tables: Dict[Tuple[str, float, int, str], np.ndarray] = {}
+
+    interpolations = ('linear', 'none')
+
+    @classmethod
+    def update_table_bits(cls, table_bits: int):
+        cls._table_bits = table_bits
+
+    @classmethod
+    def update_interpolation(cls, interpolation: str):
+        if interpolation not in cls.interpolations:
+            raise ValueError(f"unknown interpolation: {interpolation}")
+        cls._interpolation = interpolation
+
+    @classmethod
+    def table(cls, wav_type: str, duty: float=0.8, dtype: np.dtype=np.float64) -> np.ndarray:
+
+        """
+        Generates a single cycle of a wav form
+        --------------------------------------
+        Receives:
+            - wav form type
+            - duty (only used by square_duty)
+            - precision of the table
+        Returns:
+            - table of 2**table_bits samples with one guard
+            sample appended so interpolation never wraps
+        """
+        key = (wav_type, duty if wav_type == 'square_duty' else None, cls._table_bits,
+                np.dtype(dtype).name)
+        if key not in cls._tables:
+
+            size = 1 << cls._table_bits
+            cycle = 2 * np.pi * np.arange(size) / size
+
+            if wav_type == 'sine':
+                table = np.sin(cycle)
+            elif wav_type == 'square':
+                table = Shapes.square(cycle)
+            elif wav_type == 'square_duty':
+                table = Shapes.square(cycle, duty)
+            elif wav_type == 'sawtooth':
+                table = Shapes.sawtooth(cycle)
+            elif wav_type == 'triangle':
+                table = np.abs(Shapes.sawtooth(cycle))
+            else:
+                raise ValueError(f"no wavetable for wav type: {wav_type}")
+
+            cls._tables[key] = np.append(table, table[0]).astype(dtype)
+
+        return cls._tables[key]
+
+    @classmethod
+    def tuning_word(cls, hz: ARRAY, sr: int) -> np.ndarray:
+
+        """
+        Converts frequency into the accumulator increment per sample
+        -------------------------------------------------------------
+        Frequency resolution is sr / 2**48 (well below 0.000001 hz at 44.1k)
+        """
+        hz = np.asarray(hz, dtype=np.float64)
+        # the unsigned cast is undefined for anything else
+        if not np.all(np.isfinite(hz) & (hz >= 0)):
+            raise ValueError(f"frequencies must be finite and not negative: {hz}")
+
+        return np.round(hz * (1 << cls._phase_bits) / sr).astype(np.uint64)
+
+    @classmethod
+    def accumulate(cls, word: np.ndarray, start: int, stop: int, phase: int=0,
+                    out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Generates accumulator values for samples [start, stop)
+        -------------------------------------------------------
+        Receives:
+            - tuning word (scalar, or column vector for many frequencies)
+            - window of sample positions
+            - starting phase of the accumulator
+            - optional uint64 buffer to receive the phase
+        Returns:
+            - wrapped fixed point phase for every sample
+        """
+        n = np.arange(start, stop, dtype=np.uint64)
+        # uint64 products wrap mod 2**64 which keeps them exact mod 2**48
+        acc = np.multiply(n, word, out=out)
+        acc += np.uint64(phase)
+        acc &= np.uint64((1 << cls._phase_bits) - 1)
+
+        return acc
+
+    @classmethod
+    def advance(cls, phase: int, word: int, n_samples: int) -> int:
+
+        """
+        Advances the accumulator by a number of samples
+        -----------------------------------------------
+        Carried between blocks so streamed wav forms stay continuous
+        """
+        return (int(phase) + int(word) * n_samples) & ((1 << cls._phase_bits) - 1)
+
+    @classmethod
+    def radians(cls, acc: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Converts accumulator phase into radians in [0, 2pi)
+        ---------------------------------------------------
+        Wrapped phase stays accurate in float32 buffers as well
+        """
+        return np.multiply(acc, 2 * np.pi / (1 << cls._phase_bits), out=out)
+
+    @classmethod
+    def cycles(cls, acc: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Converts accumulator phase into cycles in [0, 1)
+        ------------------------------------------------
+        """
+        cycles = np.multiply(acc, 1.0 / (1 << cls._phase_bits), out=out)
+        if cycles.dtype != np.float64:
+            # the end of a cycle can round up onto the next one
+            cycles[cycles >= 1] = 0
+
+        return cycles
+
+    @classmethod
+    def increment(cls, word: np.ndarray) -> np.ndarray:
+
+        """
+        Converts a tuning word into cycles per sample
+        ---------------------------------------------
+        """
+        return np.asarray(word, dtype=np.float64) / (1 << cls._phase_bits)
+
+    @classmethod
+    def lookup(cls, table: np.ndarray, acc: np.ndarray, interpolation: str=None,
+                out: np.ndarray=None) -> np.ndarray:
+
+        """
+        Reads the table at the accumulator phase
+        ----------------------------------------
+        Samples take the precision of the table and are written
+        into 'out' when a buffer is supplied
+        """
+        interpolation = cls._interpolation if interpolation is None else interpolation
+        shift = np.uint64(cls._phase_bits - cls._table_bits)
+        index = (acc >> shift).astype(np.intp)
+
+        if interpolation == 'none':
+            return np.take(table, index, out=out)
+
+        if interpolation != 'linear':
+            raise ValueError(f"unknown interpolation: {interpolation}")
+
+        frac = (acc & np.uint64((1 << int(shift)) - 1)).astype(table.dtype)
+        frac *= 1.0 / (1 << int(shift))
+        lower = np.take(table, index, out=out)
+        # lower + frac * (upper - lower), reusing the temporaries
+        index += 1
+        upper = np.take(table, index)
+        upper -= lower
+        upper *= frac
+        lower += upper
+
+        return lower
+
+    @classmethod
+    def render(cls, wav_type: str, hz: ARRAY, sr: int, start: int, stop: int,
+                duty: float=0.8, interpolation: str=None, phase: int=0,
+                dtype: np.dtype=np.float64) -> np.ndarray:
+
+        """
+        Renders a window of samples of a wav form
+        -----------------------------------------
+        Receives:
+            - wav form type
+            - frequency (scalar, or column vector of frequencies)
+            - sample rate
+            - window of sample positions [start, stop)
+            - duty
+            - interpolation ('linear' or 'none')
+            - precision of the samples
+        Returns:
+            - samples of the wav form, one row per frequency
+        """
+        word = cls.tuning_word(hz, sr)
+        acc = cls.accumulate(word, start, stop, phase)
+
+        return cls.lookup(cls.table(wav_type, duty, dtype), acc, interpolation)
+
+
+class PolyBlep:
+    """
+    PolyBlep object band-limits wav forms at the target sample rate
+    ----------------------------------------------------------------
+        - The naive square and sawtooth jump within a single sample,
+    which folds every harmonic above nyquist back into the audible
+    band. Oversampling and filtering fixes it at a multiple of the
+    render cost, instead the samples within one sample of a jump
+    are corrected with a polynomial band-limited step (PolyBLEP)
+
+        - The triangle only has corners, its slope changes are
+    corrected with the integrated step (PolyBLAMP)
+
+        - Only about two samples per cycle need correcting, they
+    are found with one comparison pass and patched in place
+    """
+    # band-limited wav form types and the naive form they correct
+    wav_types: Dict[str, str] = {
+        'square_blep': 'square',
+        'square_duty_blep': 'square_duty',
+        'sawtooth_blep': 'sawtooth',
+        'triangle_blep': 'triangle'
+    }
+
+    @staticmethod
+    def _near(t: np.ndarray, dt: np.ndarray, edge: float) -> Tuple[tuple, np.ndarray]:
+
+        """
+        Finds the samples within one sample of an edge of the cycle
+        ------------------------------------------------------------
+        Receives:
+            - phase in cycles
+            - phase increment in cycles per sample (broadcast against the phase)
+            - position of the edge in the cycle
+        Returns:
+            - index of those samples
+            - their signed distance to the edge in samples, in (-1, 1)
+        """
+        dt = np.broadcast_to(dt, t.shape)
+        if edge == 0:
+            # the edge is where the phase wraps
+            index = np.nonzero((t < dt) | (t > 1 - dt))
+            x = t[index].astype(np.float64)
+            x[x > 0.5] -= 1
+        else:
+            index = np.nonzero(np.abs(t - t.dtype.type(edge)) < dt)
+            x = t[index].astype(np.float64) - edge
+
+        return index, x / dt[index]
+
+    @staticmethod
+    def blep(x: np.ndarray) -> np.ndarray:
+
+        """
+        Residual of a band-limited step of height 2 at x = 0
+        -----------------------------------------------------
+        """
+        return np.where(x < 0, 1 + x, -(1 - x)) * (1 - np.abs(x))
+
+    @staticmethod
+    def blamp(x: np.ndarray) -> np.ndarray:
+
+        """
+        Residual of a band-limited unit slope change at x = 0
+        ------------------------------------------------------
+        """
+        return (1 - np.abs(x))**3 / 3
+
+    @classmethod
+    def shape(cls, wav_type: str, t: np.ndarray, dt: ARRAY, duty: float=0.8) -> np.ndarray:
+
+        """
+        Evaluates a band-limited wav form in place
+        ------------------------------------------
+        Receives:
+            - band-limited wav form type
+            - phase in cycles [0, 1), overwritten with the samples
+            - phase increment in cycles per sample (scalar or column vector)
+            - duty (only used by square_duty_blep)
+        Returns:
+            - samples matching the naive wav form of the same name
+            away from its discontinuities
+        """
+        if wav_type not in cls.wav_types:
+            raise KeyError(wav_type)
+
+        # the corrections are computed before the phase is overwritten
+        if wav_type in ('square_blep', 'square_duty_blep'):
+            duty = duty if wav_type == 'square_duty_blep' else 0.5
+            rise, x_rise = cls._near(t, dt, 0)
+            fall, x_fall = cls._near(t, dt, duty)
+            high = np.less(t, t.dtype.type(duty))
+            np.multiply(high, 2, out=t)
+            t -= 1
+            t[rise] += cls.blep(x_rise)
+            t[fall] -= cls.blep(x_fall)
+
+        elif wav_type == 'sawtooth_blep':
+            fall, x_fall = cls._near(t, dt, 0)
+            t *= 2
+            t -= 1
+            t[fall] -= cls.blep(x_fall)
+
+        else:
+            # |2t - 1| turns down at the wrap and up half way through,
+            # both by a slope of 4 per cycle
+            peak, x_peak = cls._near(t, dt, 0)
+            trough, x_trough = cls._near(t, dt, 0.5)
+            t *= 2
+            t -= 1
+            np.abs(t, out=t)
+            t[peak] -= 4 * np.broadcast_to(dt, t.shape)[peak] * cls.blamp(x_peak)
+            t[trough] += 4 * np.broadcast_to(dt, t.shape)[trough] * cls.blamp(x_trough)
+
+        return t
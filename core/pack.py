@@ -0,0 +1,167 @@
+from core import (os, np, List, Tuple, ProcessPoolExecutor, BrokenProcessPool, shared_memory,
+                    contextmanager, Wav, Factory, BufferPool, Riff, Loop, RenderConfig, METRICS)
+
+# ~ ~ ~ ~ ~ ~ Sample Pack Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Pack:
+    """
+    Pack object renders every note of a system into wav files
+    ---------------------------------------------------------
+        - Notes are split into contiguous groups of rows and fanned
+    out across a process pool. Each worker attaches to one shared
+    memory block holding the PCM of the whole pack and quantizes
+    its notes straight into its rows, so no audio is pickled back
+    to the parent
+
+        - With a single worker (or if the pool or shared memory,
+    only available from python 3.8, cannot be used) the same rows
+    are rendered serially in process
+
+        - Settings travel with the tasks as a render config, workers
+    never depend on (or change) class level state
+    """
+    # sets the number of worker processes (None uses every core)
+    _workers: int = None
+
+    @classmethod
+    def update_workers(cls, workers: int):
+        cls._workers = workers
+
+    @staticmethod
+    def _render_rows(pcm: np.ndarray, freqs: List[float], wav_type: str,
+                        start: int, config: RenderConfig):
+
+        """
+        Renders a group of notes into their rows of the pack
+        ----------------------------------------------------
+        """
+        # block buffers are reused by every group of notes
+        pool = BufferPool()
+        for rows, block in Wav.iter_system(freqs=freqs, wav_type=wav_type, config=config, pool=pool):
+            for row, carrier in zip(range(rows.start, rows.stop), block):
+                Factory._make_wav(carrier=carrier, sr=config.sr, hz=freqs[row], wav_type=wav_type, 
+                                    out=pcm[start + row], bit_depth=config.bit_depth)
+
+    @staticmethod
+    def _render_shared(name: str, shape: Tuple[int, int], freqs: List[float],
+                        wav_type: str, start: int, config: RenderConfig):
+
+        """
+        Worker entry point, attaches to the shared pack by name
+        --------------------------------------------------------
+        """
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            pcm = np.ndarray(shape, dtype=Riff.pcm_dtype(config.bit_depth), buffer=block.buf)
+            Pack._render_rows(pcm, freqs, wav_type, start, config)
+            del pcm
+        finally:
+            block.close()
+
+    @classmethod
+    @contextmanager
+    def render_pcm(cls, freqs: List[float], wav_type: str, workers: int=None,
+                    config: RenderConfig=None):
+
+        """
+        Renders the PCM of a whole system
+        ---------------------------------------
+        Recieves:
+            - frequencies of the system
+            - wav form type
+            - number of worker processes (defaults to the class setting)
+            - render config (defaults to the class settings of Wav)
+        Returns:
+            - context holding the (n_notes, n_samples) PCM array
+            of the pack, a copy owned by the caller when it was
+            rendered in shared memory (the block is released before
+            the context is entered, whatever views the caller keeps)
+        """
+        config = Wav.default_config() if config is None else config
+        freqs = list(freqs)
+        shape = (len(freqs), config.n_samples)
+        dtype = Riff.pcm_dtype(config.bit_depth)
+        workers = cls._workers if workers is None else workers
+        workers = os.cpu_count() if workers is None else workers
+        workers = max(1, min(workers, len(freqs)))
+
+        block = None
+        if workers > 1 and shared_memory is not None:
+            try:
+                block = shared_memory.SharedMemory(create=True,
+                            size=max(1, shape[0] * shape[1] * dtype.itemsize))
+            except OSError:
+                # no shared memory available, fall back to serial
+                block = None
+
+        if block is not None:
+            pcm = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            try:
+                try:
+                    # contiguous groups of rows, one task per worker
+                    step = -(-len(freqs) // workers)
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        tasks = [
+                            pool.submit(Pack._render_shared, block.name, shape,
+                                        freqs[start:start + step], wav_type, start, config)
+                            for start in range(0, len(freqs), step)
+                        ]
+                        for task in tasks:
+                            task.result()
+
+                except BrokenProcessPool:
+                    # workers could not run, render in process instead
+                    Pack._render_rows(pcm, freqs, wav_type, 0, config)
+
+                # the caller is handed its own copy, so the block
+                # never outlives the render whatever views are kept
+                rendered = pcm.copy()
+            finally:
+                # the mapping can only be closed once no views remain
+                del pcm
+                with METRICS.timed('cleanup'):
+                    block.close()
+                    block.unlink()
+
+            yield rendered
+            return
+
+        # serial fallback
+        pcm = np.empty(shape, dtype=dtype)
+        Pack._render_rows(pcm, freqs, wav_type, 0, config)
+        yield pcm
+
+    @classmethod
+    def render(cls, freqs: List[float], wav_type: str, directory: str='sample_packages',
+                workers: int=None, config: RenderConfig=None) -> List[str]:
+
+        """
+        Renders a whole system as wav files
+        -----------------------------------
+        Recieves:
+            - frequencies of the system
+            - wav form type
+            - directory to write the wav files into
+            - number of worker processes (defaults to the class setting)
+            - render config (defaults to the class settings of Wav)
+        Returns:
+            - paths of the written wav files
+        """
+        config = Wav.default_config() if config is None else config
+        freqs = list(freqs)
+        decimals = Factory._decimals(freqs)
+        paths = [Factory._wav_path(freq, wav_type, directory, config.modulation, decimals) for freq in freqs]
+
+        if config.loop:
+            # loops are a fraction of a second each and differ in length, rendered in process
+            pool = BufferPool()
+            for freq, path in zip(freqs, paths):
+                with open(path, 'wb') as wav_file:
+                    wav_file.write(Loop.wav_bytes(freq, wav_type, config, pool))
+            return paths
+
+        with cls.render_pcm(freqs=freqs, wav_type=wav_type, workers=workers, config=config) as pcm:
+            for row, path in enumerate(paths):
+                Riff.write(path, pcm[row], sr=config.sr, bit_depth=config.bit_depth)
+
+        return paths
@@ -0,0 +1,195 @@
+from core import np, struct, Iterable, METRICS
+
+# ~ ~ ~ ~ ~ ~ Wav File Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Riff:
+    """
+    Riff object writes wav files without holding the whole signal
+    -------------------------------------------------------------
+        - The size of every tone is known before it is rendered,
+    so the RIFF header can be written first and the PCM frames
+    appended block by block as they are synthesized
+
+        - Alternatively the data chunk of a freshly laid out file
+    can be memory mapped and synthesized into directly
+
+        - Samples are 16 bit PCM, 24 bit PCM or 32 bit float,
+    24 bit samples are held in int32 buffers and packed on write
+
+        - Extra chunks (such as the 'smpl' chunk of looped samples)
+    are placed between the format and the data chunk, so the header
+    still holds everything that precedes the frames
+    """
+    # wav format tag and bytes per sample of each bit depth
+    formats: dict = {
+        16: (1, 2), # PCM
+        24: (1, 3), # PCM
+        32: (3, 4) # IEEE float
+    }
+    # buffer type holding the samples of each bit depth
+    dtypes: dict = {
+        16: np.dtype('<i2'),
+        24: np.dtype('<i4'),
+        32: np.dtype('<f4')
+    }
+
+    @staticmethod
+    def pcm_dtype(bit_depth: int) -> np.dtype:
+        if bit_depth not in Riff.dtypes:
+            raise ValueError(f"unsupported bit depth: {bit_depth}")
+        return Riff.dtypes[bit_depth]
+
+    @staticmethod
+    def header(sr: int, n_frames: int, bit_depth: int=16, channels: int=1,
+                extra: bytes=b'') -> bytes:
+
+        """
+        Generates the RIFF/WAVE header of a wav file
+        --------------------------------------------
+        Receives:
+            - sample rate
+            - number of frames
+            - bit depth (16, 24 or 32 float)
+            - number of channels
+            - extra chunks, already word aligned
+        Returns:
+            - header bytes, the PCM frames follow directly
+        """
+        if bit_depth not in Riff.formats:
+            raise ValueError(f"unsupported bit depth: {bit_depth}")
+
+        format_tag, width = Riff.formats[bit_depth]
+        block_align = channels * width
+        data_size = n_frames * block_align
+        # chunks are word aligned, odd sized data is padded
+        pad = data_size % 2
+
+        return b''.join([
+            b'RIFF', struct.pack('<I', 36 + len(extra) + data_size + pad), b'WAVE',
+            b'fmt ', struct.pack('<IHHIIHH', 16, format_tag, channels, sr,
+                                    sr * block_align, block_align, bit_depth),
+            extra,
+            b'data', struct.pack('<I', data_size)
+        ])
+
+    @staticmethod
+    def size(n_frames: int, bit_depth: int=16, channels: int=1, extra: int=0) -> int:
+
+        """
+        Size in bytes of a whole wav file
+        ---------------------------------
+        'extra' is the size of the extra chunks of the header
+        """
+        data_size = n_frames * channels * Riff.formats[bit_depth][1]
+        return 44 + extra + data_size + data_size % 2
+
+    @staticmethod
+    def smpl(sr: int, start: int, end: int, hz: float=None) -> bytes:
+
+        """
+        Generates the 'smpl' chunk of a looped sample
+        ---------------------------------------------
+        Receives:
+            - sample rate
+            - first frame of the loop and the frame after its last
+            - pitch of the sample, sets its midi unity note
+        Returns:
+            - chunk bytes holding one forward loop played
+            indefinitely, samplers sustain a note by looping it
+        """
+        # unity note and the fraction of a semitone above it
+        midi = 60.0 if hz is None else min(max(69 + 12 * np.log2(hz / 440.0), 0.0), 127.0)
+        note = int(midi)
+        fraction = min(int((midi - note) * 2**32), 2**32 - 1)
+
+        return b'smpl' + struct.pack('<I9I6I', 60, 0, 0, int(round(1e9 / sr)), note, fraction,
+                                        0, 0, 1, 0, 0, 0, start, end - 1, 0, 0)
+
+    @staticmethod
+    def frames(pcm: np.ndarray, bit_depth: int=16) -> bytes:
+
+        """
+        Converts a buffer of samples into wav frame bytes
+        -------------------------------------------------
+        """
+        with METRICS.timed('encode'):
+            pcm = np.ascontiguousarray(pcm, dtype=Riff.pcm_dtype(bit_depth))
+            if bit_depth == 24:
+                # keep the low three bytes of every little endian int32
+                frames = pcm.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+            else:
+                frames = pcm.tobytes()
+
+        METRICS.count('encode', len(frames))
+        return frames
+
+    @staticmethod
+    def write_stream(path: str, blocks: Iterable[np.ndarray], sr: int,
+                        n_frames: int, bit_depth: int=16) -> int:
+
+        """
+        Writes a wav file from a stream of sample blocks
+        ------------------------------------------------
+        Receives:
+            - path of the wav file
+            - iterable of sample blocks, already quantized
+            - sample rate
+            - total number of frames the blocks add up to
+            - bit depth
+        Returns:
+            - number of bytes written
+        """
+        header = Riff.header(sr=sr, n_frames=n_frames, bit_depth=bit_depth)
+        written = 0
+
+        with open(path, 'wb') as wav_file:
+            wav_file.write(header)
+            for block in blocks:
+                frames = Riff.frames(block, bit_depth)
+                with METRICS.timed('write'):
+                    wav_file.write(frames)
+                METRICS.count('write', len(frames))
+                written += len(block)
+            if (written * Riff.formats[bit_depth][1]) % 2:
+                wav_file.write(b'\x00')
+
+        if written != n_frames:
+            raise ValueError(f"expected {n_frames} frames, streamed {written}")
+
+        return Riff.size(n_frames, bit_depth)
+
+    @staticmethod
+    def write(path: str, pcm: np.ndarray, sr: int, bit_depth: int=16) -> int:
+
+        """
+        Writes a wav file from a buffer of samples
+        ------------------------------------------
+        """
+        return Riff.write_stream(path, [pcm], sr=sr, n_frames=len(pcm), bit_depth=bit_depth)
+
+    @staticmethod
+    def memmap(path: str, sr: int, n_frames: int, bit_depth: int=16) -> np.memmap:
+
+        """
+        Lays out a wav file and maps its data chunk
+        -------------------------------------------
+        Receives:
+            - path of the wav file
+            - sample rate
+            - number of frames
+            - bit depth (16 or 32 float, 24 bit frames are not addressable)
+        Returns:
+            - writable memory map of the data chunk
+        """
+        if bit_depth == 24:
+            raise ValueError("24 bit frames cannot be memory mapped")
+
+        dtype = Riff.pcm_dtype(bit_depth)
+        header = Riff.header(sr=sr, n_frames=n_frames, bit_depth=bit_depth)
+
+        with open(path, 'wb') as wav_file:
+            wav_file.write(header)
+            # extend the file to its final size without writing the frames
+            wav_file.truncate(Riff.size(n_frames, bit_depth))
+
+        return np.memmap(path, dtype=dtype, mode='r+', offset=len(header), shape=(n_frames,))
@@ -1,16 +1,257 @@
-from core import server, APP, layout, os, send_from_directory
+from core import (server, APP, layout, io, os, zipfile, urlencode, send_from_directory, Response,
+                    request, abort, jsonify, stream_with_context, wrap_file, Dict, List, Tuple, Callable,
+                    Iterable, Hz, Wav, Archive, Instrument, Views, Modulation, RenderConfig, RENDER_CACHE,
+                    Job, JOBS, METRICS, util)
+PACK = Tuple[List[float], str, RenderConfig, int]
+# content addressed urls never change, anything else is revalidated against its etag
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
 
 @server.route('/system')
 def system_build():
     return 'System page'
 
-@server.route('/downloads/<path:path>')
-def serve_static(path):
-    root_dir = os.getcwd()
-    print(root_dir)
-    return send_from_directory(
-        os.path.join(root_dir), path
-    )
+def flag(args: Dict[str, str], name: str) -> bool:
+    # switches are only on when spelled as such, '0' and 'false' are off
+    return str(args.get(name, '')).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def pack_request(args: Dict[str, str]) -> PACK:
+
+    """
+    Reads a sample pack description from request arguments
+    -------------------------------------------------------
+    Recieves:
+        - hz, system, size, form, deflate and loop arguments, and the
+        optional modulation with its attack, decay, sustain and release
+    Returns:
+        - frequencies, wav form type, render config and compression
+        (aborts with 400 on anything invalid, the hz unless it is
+        finite and within (0, nyquist), and sizes as well: a pack
+        holds at least one note and at most Archive.max_notes, which
+        also caps the default size of a tuning)
+    """
+    system = args.get('system', 'semi_tone').replace(' ', '_')
+    wav_type = args.get('form', 'sine')
+    modulation = args.get('modulation', 'none')
+    if (not util.Tunings.valid(system) or wav_type not in Wav.wav_types
+            or modulation not in Modulation.types):
+        abort(400)
+
+    # every request renders from its own immutable config
+    config = Wav.default_config()._replace(tone_intvl=system, modulation=modulation,
+                                            loop=flag(args, 'loop'))
+    try:
+        hz = Wav.check_hz(args.get('hz', 440.0), config.sr)
+        # the natural size of fine tunings is far past any renderable pack
+        size = (int(args['size']) if 'size' in args
+                else min(util.Tunings.get(system).size, Archive.max_notes(config)))
+        adsr = Modulation.check_adsr(*(args.get(stage, getattr(config, stage))
+                                        for stage in ('attack', 'decay', 'sustain', 'release')))
+        config = config._replace(**dict(zip(('attack', 'decay', 'sustain', 'release'), adsr)))
+    except ValueError:
+        abort(400)
+
+    if not 0 < size <= Archive.max_notes(config):
+        abort(400)
+
+    freqs = Hz(hz=hz, config=config).system_array(system_size=size).tolist()
+    compression = zipfile.ZIP_DEFLATED if flag(args, 'deflate') else None
+
+    return freqs, wav_type, config, compression
+
+def pack_layout(args: Dict[str, str]) -> str:
+    # a wav file per note, or a single instrument
+    layout = args.get('layout', 'files')
+    if layout not in Archive.layouts:
+        abort(400)
+    return layout
+
+def pack_address(args: Dict[str, str]) -> Tuple[str, Callable[[], bytes], Callable[[], Iterable[bytes]]]:
+
+    """
+    Content address of the pack a request describes
+    ------------------------------------------------
+    Returns:
+        - key of the pack in the render cache
+        - function building the whole pack
+        - function streaming the pack as it is rendered
+    """
+    freqs, wav_type, config, compression = pack_request(args)
+    layout = pack_layout(args)
+    key = Archive.pack_key(freqs=freqs, wav_type=wav_type, config=config, compression=compression,
+                            layout=layout)
+
+    def build() -> bytes:
+        return Archive.build_zip(freqs=freqs, wav_type=wav_type, config=config, compression=compression,
+                                    layout=layout)
+
+    def stream() -> Iterable[bytes]:
+        if layout == 'instrument':
+            entries = Instrument.entries(freqs=freqs, wav_type=wav_type, config=config)
+        else:
+            entries = Archive.wav_entries(freqs=freqs, wav_type=wav_type, config=config)
+        return RENDER_CACHE.tee(key, Archive.stream_zip(entries, compression=compression))
+
+    return key, build, stream
+
+def download_url(args: Dict[str, str], filename: str='samples.zip') -> str:
+
+    """
+    Immutable url of the pack a request describes
+    ---------------------------------------------
+    The path holds the content address of the pack, the query
+    string still describes it, so the pack can be rendered again
+    by any worker once it has left the cache
+    """
+    args = {k: str(v) for k, v in args.items()}
+    key, _, _ = pack_address(args)
+    return f"downloads/{key}/{filename}?{urlencode(sorted(args.items()))}"
+
+def send_pack(key: str, filename: str, build: Callable[[], bytes], cache_control: str,
+                stream: Callable[[], Iterable[bytes]]=None) -> Response:
+
+    """
+    Serves a pack under a strong etag
+    ---------------------------------
+    Recieves:
+        - content address of the pack, a pack is byte for byte
+        determined by it so it is used as the etag
+        - name the pack is downloaded as
+        - function building the whole pack
+        - Cache-Control of the response
+        - optional function streaming the pack as it is rendered
+    Returns:
+        - 304 when the client already holds the pack, otherwise the
+        pack or the ranges asked for (206), seeked into the cached
+        file or bytes. Packs that are not cached are streamed when
+        possible and built otherwise
+    """
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Cache-Control': cache_control,
+                'Accept-Ranges': 'bytes'}
+
+    if request.if_none_match.contains(key):
+        # nothing is looked up, let alone rendered
+        response = Response(status=304, headers=headers)
+        response.set_etag(key)
+        return response
+
+    pack = RENDER_CACHE.open(key)
+    if pack is None and stream is not None and request.range is None:
+        # whole packs start streaming straight away, ranges need the whole pack
+        response = Response(stream_with_context(stream()), mimetype='application/zip', headers=headers)
+        response.set_etag(key)
+        return response
+
+    if pack is None:
+        pack = io.BytesIO(RENDER_CACHE.get_or_render(key, build))
+    size = pack.seek(0, os.SEEK_END)
+    pack.seek(0)
+
+    response = Response(wrap_file(request.environ, pack), mimetype='application/zip', headers=headers,
+                        direct_passthrough=True)
+    response.content_length = size
+    response.set_etag(key)
+
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+def submit_pack(args: Dict[str, str]) -> Job:
+
+    """
+    Queues the render of the pack a request describes
+    -------------------------------------------------
+    Returns:
+        - the job, whose result is the key of the pack in the render
+        cache (the pack is served from there, rendered again if evicted)
+    """
+    args = {k: str(v) for k, v in args.items()}
+    freqs, wav_type, config, compression = pack_request(args)
+    layout = pack_layout(args)
+    key = Archive.pack_key(freqs=freqs, wav_type=wav_type, config=config, compression=compression,
+                            layout=layout)
+
+    def render(job: Job) -> str:
+        pack = Archive.build_zip(freqs=freqs, wav_type=wav_type, config=config, compression=compression,
+                                    progress=job.advance, layout=layout)
+        METRICS.count('job', len(pack))
+        return key
+
+    return JOBS.submit(render, total=len(freqs), params=args)
+
+@server.route('/downloads/<key>/<filename>')
+def download_pack(key, filename):
+    # the query string describes the pack, the key pins its content
+    address, build, _ = pack_address(request.args)
+    if address != key:
+        abort(404)
+    return send_pack(key, filename, build, IMMUTABLE)
+
+@server.route('/stream/<path:path>')
+def stream_samples(path):
+    # the pack is described entirely by the query string, which depends on
+    # the server defaults, so it is revalidated (see download_pack)
+    key, build, stream = pack_address(request.args)
+    return send_pack(key, os.path.basename(path), build, REVALIDATE, stream=stream)
+
+@server.route('/views/<view>.png')
+def view_image(view):
+    # waveform or spectrogram of the first note, or the waveform of the whole system
+    if view not in Views.views:
+        abort(404)
+    freqs, wav_type, config, _ = pack_request(request.args)
+    if not freqs:
+        abort(400)
+    try:
+        width = int(request.args.get('width', Views._width))
+        height = int(request.args.get('height', Views._height))
+    except ValueError:
+        abort(400)
+    if not (0 < width <= 4000 and 0 < height <= 4000):
+        abort(400)
+
+    return Response(Views.render(view, freqs, wav_type, config, width=width, height=height),
+                    mimetype='image/png')
+
+@server.route('/jobs', methods=['POST'])
+def submit_job():
+    # the pack is described by the form, json body or query string
+    args = request.get_json(silent=True) or request.form or request.args
+    job = submit_pack(args)
+
+    return jsonify(dict(job.to_dict(), download=download_url(args))), 202
+
+@server.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    job = JOBS.cancel(job_id) if request.method == 'DELETE' else JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+@server.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if JOBS.get(job_id) is None:
+        abort(404)
+    return Response(stream_with_context(JOBS.events(job_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+@server.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    if job.state != 'done':
+        return jsonify(job.to_dict()), 409
+    # a job never changes its result, the pack itself is only kept by the render cache
+    _, build, _ = pack_address(job.to_dict()['params'])
+    return send_pack(job.result, 'samples.zip', build, IMMUTABLE)
+
+@server.route('/cache/stats')
+def cache_stats():
+    return jsonify(RENDER_CACHE.stats())
+
+@server.route('/metrics')
+def metrics():
+    # prometheus text exposition format
+    return Response(METRICS.exposition(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @server.route('/favicon.ico')
 def favicon():
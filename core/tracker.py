@@ -0,0 +1,244 @@
+from core import os, np, wavfile, NamedTuple, Tuple, Iterator, util
+
+# ~ ~ ~ ~ ~ ~ Pitch Tracking Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Track(NamedTuple):
+    """
+    Pitch of every analysis frame of a recording
+    --------------------------------------------
+        - start time of the frame in seconds
+        - fundamental frequency (nan where the frame is unvoiced)
+        - nearest pitch class, octave and cent offset from Detect
+    """
+    time: np.ndarray
+    f0: np.ndarray
+    pitch_class: np.ndarray
+    octave: np.ndarray
+    cents: np.ndarray
+
+
+class Tracker:
+    """
+    Tracker object estimates the fundamental frequency of wav files
+    ---------------------------------------------------------------
+        - Wav files are memory mapped and analysed in blocks of
+    overlapping frames, so only one block of samples is ever held
+    in memory whatever the length of the recording
+
+        - Every frame is analysed with YIN: the difference function
+    of the frame against itself at every lag is computed for a whole
+    block of frames at once through the FFT, normalized by its
+    running mean, and the first dip below the threshold gives the
+    period. Frames without a dip are unvoiced
+
+        - Per frame estimates are tagged with their nearest pitch
+    and cent offset by Detect
+    """
+    # sets the analysis frame, the hop between frames
+    # and the number of frames analysed together
+    _frame_size: int = 4096
+    _hop: int = 512
+    _block_frames: int = 64
+    # sets the range of fundamentals searched and the YIN threshold
+    _fmin: float = 40.0
+    _fmax: float = 4200.0
+    _threshold: float = 0.1
+
+    @classmethod
+    def update_frame_size(cls, frame_size: int):
+        cls._frame_size = frame_size
+
+    @classmethod
+    def update_hop(cls, hop: int):
+        cls._hop = hop
+
+    @classmethod
+    def update_block_frames(cls, block_frames: int):
+        cls._block_frames = block_frames
+
+    @classmethod
+    def update_range(cls, fmin: float, fmax: float):
+        cls._fmin = fmin
+        cls._fmax = fmax
+
+    @classmethod
+    def update_threshold(cls, threshold: float):
+        cls._threshold = threshold
+
+    @staticmethod
+    def open(path: str) -> Tuple[int, np.ndarray]:
+
+        """
+        Memory maps the samples of a wav file
+        -------------------------------------
+        24 bit files cannot be mapped by scipy and are read whole
+        """
+        try:
+            return wavfile().read(path, mmap=True)
+        except ValueError:
+            return wavfile().read(path)
+
+    @staticmethod
+    def _block(data: np.ndarray, start: int, stop: int) -> np.ndarray:
+
+        """
+        Reads samples [start, stop) as mono float64
+        -------------------------------------------
+        Samples past the end of the recording read as silence
+        """
+        block = np.asarray(data[start:stop], dtype=np.float64)
+        if block.ndim == 2:
+            block = block.mean(axis=1)
+        if len(block) < stop - start:
+            block = np.pad(block, (0, stop - start - len(block)))
+
+        return block
+
+    @classmethod
+    def yin(cls, frames: np.ndarray, sr: int, fmin: float=None, fmax: float=None,
+            threshold: float=None) -> np.ndarray:
+
+        """
+        Estimates the fundamental of a block of frames
+        ----------------------------------------------
+        Receives:
+            - (n_frames, frame_size) array of samples
+            - sample rate
+            - range of fundamentals searched
+            - threshold of the normalized difference
+        Returns:
+            - fundamental of every frame in hz, nan where unvoiced
+        """
+        fmin = cls._fmin if fmin is None else fmin
+        fmax = cls._fmax if fmax is None else fmax
+        threshold = cls._threshold if threshold is None else threshold
+
+        frame_size = frames.shape[1]
+        max_lag = min(frame_size // 2, int(np.ceil(sr / fmin)))
+        min_lag = max(2, int(sr / fmax))
+        # the head of the frame is compared against every lag of the frame
+        width = frame_size - max_lag
+        n_fft = 1 << int(np.ceil(np.log2(frame_size + width)))
+
+        # sum of x[j] * x[j + lag] over the head, for every lag at once
+        spectrum = np.conj(np.fft.rfft(frames[:, :width], n_fft))
+        spectrum *= np.fft.rfft(frames, n_fft)
+        correlation = np.fft.irfft(spectrum, n_fft)[:, :max_lag + 1]
+
+        # energy of every window of the head's width
+        energy = np.zeros((len(frames), frame_size + 1))
+        np.cumsum(frames**2, axis=1, out=energy[:, 1:])
+        energy = energy[:, width:width + max_lag + 1] - energy[:, :max_lag + 1]
+
+        difference = energy[:, :1] + energy - 2 * correlation
+        difference[:, 0] = 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # cumulative mean normalized difference
+            lags = np.arange(max_lag + 1)
+            normalized = difference * lags / np.cumsum(difference, axis=1)
+        normalized[:, 0] = 1
+
+        search = normalized[:, min_lag:max_lag]
+        below = search < threshold
+        voiced = below.any(axis=1)
+        # first dip below the threshold, followed down to its minimum
+        first = np.argmax(below, axis=1)
+        settled = np.ones_like(below)
+        settled[:, :-1] = search[:, 1:] >= search[:, :-1]
+        settled &= np.arange(search.shape[1]) >= first[:, np.newaxis]
+        lag = np.argmax(settled, axis=1) + min_lag
+
+        # parabola through the minimum of the raw difference and its neighbours
+        rows = np.arange(len(frames))
+        before, at, after = (difference[rows, lag - 1], difference[rows, lag],
+                                difference[rows, np.minimum(lag + 1, max_lag)])
+        curve = before - 2 * at + after
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(curve > 0, (before - after) / (2 * curve), 0)
+
+        return np.where(voiced, sr / (lag + shift), np.nan)
+
+    @classmethod
+    def stream(cls, path: str, hop: int=None, frame_size: int=None,
+                block_frames: int=None) -> Iterator[Track]:
+
+        """
+        Tracks the pitch of a wav file one block of frames at a time
+        -------------------------------------------------------------
+        Receives:
+            - path of the wav file
+            - hop between frames in samples
+            - frame size in samples
+            - number of frames analysed per block
+        Yields:
+            - Track of every frame of the block
+        """
+        hop = cls._hop if hop is None else hop
+        frame_size = cls._frame_size if frame_size is None else frame_size
+        block_frames = cls._block_frames if block_frames is None else block_frames
+
+        sr, data = cls.open(path)
+        # the last frame may run past the end of the recording
+        n_frames = 1 + max(0, int(np.ceil((len(data) - frame_size) / hop)))
+
+        for first in range(0, n_frames, block_frames):
+            count = min(block_frames, n_frames - first)
+            start = first * hop
+            samples = cls._block(data, start, start + (count - 1) * hop + frame_size)
+            # overlapping frames are views into the block
+            frames = np.lib.stride_tricks.as_strided(samples, shape=(count, frame_size),
+                                                        strides=(hop * samples.strides[0], samples.strides[0]),
+                                                        writeable=False)
+
+            f0 = cls.yin(frames, sr)
+            pitches = util.Detect.detect(f0)
+
+            yield Track((first + np.arange(count)) * hop / sr, f0, *pitches)
+
+    @classmethod
+    def track(cls, path: str, hop: int=None, frame_size: int=None) -> Track:
+
+        """
+        Tracks the pitch of a whole wav file
+        ------------------------------------
+        Only the per frame estimates are collected, never the samples
+        """
+        blocks = list(cls.stream(path, hop=hop, frame_size=frame_size))
+
+        return Track(*(np.concatenate(field) for field in zip(*blocks)))
+
+    @classmethod
+    def track_directory(cls, directory: str, hop: int=None,
+                        frame_size: int=None) -> Iterator[Tuple[str, Track]]:
+
+        """
+        Tracks the pitch of every wav file of a directory
+        -------------------------------------------------
+        Files are analysed one after the other in name order
+        """
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith('.wav'):
+                path = os.path.join(directory, name)
+                yield path, cls.track(path, hop=hop, frame_size=frame_size)
+
+    @staticmethod
+    def summary(track: Track) -> Tuple[str, float, float]:
+
+        """
+        Summarises a track as a single note
+        -----------------------------------
+        Returns:
+            - name of the pitch nearest the median f0, the median f0
+            and the median cent offset over the voiced frames
+            (empty name and nan values if no frame is voiced)
+        """
+        voiced = track.pitch_class >= 0
+        if not voiced.any():
+            return '', np.nan, np.nan
+
+        f0 = float(np.median(track.f0[voiced]))
+        pitches = util.Detect.detect(f0)
+
+        return (str(util.Detect.names(pitches.pitch_class, pitches.octave)), f0,
+                float(np.median(track.cents[voiced])))
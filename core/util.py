@@ -1,5 +1,6 @@
 
-from core import np, log2, pow, List, Dict, TypeVar
+from core import (re, np, log2, pow, threading, OrderedDict, List, Dict, Tuple, NamedTuple, Union,
+                    Callable, TypeVar)
 RANGE = TypeVar('range')
 
 # ~ ~ ~ ~ ~ ~ System Utils ~ ~ ~ ~ ~ ~ ~ #
@@ -23,77 +24,36 @@ class Systems:
     	
     base: int = 6
 
-    tones: Dict[str, int] = {
-
-        # generates the number of division for the octave
-
-        'half_base_tone': base // 3,
-        'tri_base_tone': base // 2,
-        'quarter_base_tone': base-2,
-        'fifth_base_tone': base-1,
-        'base_tone': base,
-        'seventh_base_tone': base+1,
-        'eighth_base_tone': base+2,
-        'ninth_base_tone': base+3,
-        'tenth_base_tone': base+4,
-        'eleventh_base_tone': base+5,
-
-        'semi_tone': 2*base,
-        'tri_tone': 3*base,
-        'quarter_tone': 4*base,
-        'sixth_tone': 6*base,
-        'eighth_tone': 8*base,
-        'twelevth_tone': 12*base,
-        'twenty_fourth_tone': 24*base
+    divisions: Dict[str, Callable[[int], int]] = {
+
+        # generates the number of division for the octave from the base
+
+        'half_base_tone': lambda base: base // 3,
+        'tri_base_tone': lambda base: base // 2,
+        'quarter_base_tone': lambda base: base-2,
+        'fifth_base_tone': lambda base: base-1,
+        'base_tone': lambda base: base,
+        'seventh_base_tone': lambda base: base+1,
+        'eighth_base_tone': lambda base: base+2,
+        'ninth_base_tone': lambda base: base+3,
+        'tenth_base_tone': lambda base: base+4,
+        'eleventh_base_tone': lambda base: base+5,
+
+        'semi_tone': lambda base: 2*base,
+        'tri_tone': lambda base: 3*base,
+        'quarter_tone': lambda base: 4*base,
+        'sixth_tone': lambda base: 6*base,
+        'eighth_tone': lambda base: 8*base,
+        'twelevth_tone': lambda base: 12*base,
+        'twenty_fourth_tone': lambda base: 24*base
     }
 
-    interval_systems: Dict[str, float] = {
-
-        # generates the float representation of the interval between frequencies
-
-        'half_base_tone': 2**(1/tones['half_base_tone']),
-        'tri_base_tone': 2**(1/tones['tri_base_tone']),
-        'quarter_base_tone': 2**(1/tones['quarter_base_tone']),
-        'fifth_base_tone': 2**(1/tones['fifth_base_tone']),
-        'base_tone': 2**(1/tones['base_tone']),
-        'seventh_base_tone': 2**(1/tones['seventh_base_tone']),
-        'eighth_base_tone': 2**(1/tones['eighth_base_tone']),
-        'ninth_base_tone': 2**(1/tones['ninth_base_tone']),
-        'tenth_base_tone': 2**(1/tones['tenth_base_tone']),
-        'eleventh_base_tone': 2**(1/tones['eleventh_base_tone']),
-
-        'semi_tone': 2**(1/tones['semi_tone']),
-        'tri_tone': 2**(1/tones['tri_tone']),
-        'quarter_tone': 2**(1/tones['quarter_tone']),
-        'sixth_tone': 2**(1/tones['sixth_tone']),
-        'eighth_tone': 2**(1/tones['eighth_tone']),
-        'twelevth_tone': 2**(1/tones['twelevth_tone']),
-        'twenty_fourth_tone':2**(1/tones['twenty_fourth_tone'])
-    }
-
-    octave_systems: Dict[str, int] = {
-
-        # generates all intervals, as floats between 1 and 2 (the octave)
-        
-        'half_base_tone': (tones['half_base_tone']-1)*8,
-        'tri_base_tone': (tones['tri_base_tone']-1)*8,
-        'quarter_base_tone': (tones['quarter_base_tone']-1)*8,
-        'fifth_base_tone': (tones['fifth_base_tone']-1)*8,
-        'base_tone': (tones['base_tone']-1)*8,
-        'seventh_base_tone': (tones['seventh_base_tone']-1)*8,
-        'eighth_base_tone': (tones['eighth_base_tone']-1)*8,
-        'ninth_base_tone': (tones['ninth_base_tone']-1)*8,
-        'tenth_base_tone': (tones['tenth_base_tone']-1)*8,
-        'eleventh_base_tone': (tones['eleventh_base_tone']-1)*8,
-
-        'semi_tone': (tones['semi_tone']-1)*8,
-        'tri_tone': (tones['tri_tone']-1)*8,
-        'quarter_tone': (tones['quarter_tone']-1)*8,
-        'sixth_tone': (tones['sixth_tone']-1)*8,
-        'eighth_tone': (tones['eighth_tone']-1)*8,
-        'twelevth_tone': (tones['twelevth_tone']-1)*8,
-        'twenty_fourth_tone': (tones['twenty_fourth_tone']-1*8)
-    }
+    # number of divisions of the octave, the float representation of the interval
+    # between frequencies and the natural system size (8 octaves) of every named
+    # system, rebuilt whenever the base changes (see update_system_base)
+    tones: Dict[str, int] = {}
+    interval_systems: Dict[str, float] = {}
+    octave_systems: Dict[str, int] = {}
 
     fiveLimit_N1: Dict[str, float] = {
 
@@ -212,6 +172,171 @@ class Systems:
         Alter the base of all systems
         """
         cls.base = n_base
+        # rebuilt in place, so every holder of the tables sees the new base
+        cls.tones.clear()
+        cls.tones.update({name: divide(n_base) for name, divide in cls.divisions.items()})
+        cls.interval_systems.clear()
+        cls.interval_systems.update({name: 2**(1/tones) for name, tones in cls.tones.items()})
+        cls.octave_systems.clear()
+        cls.octave_systems.update({name: Tunings.natural_size(tones) for name, tones in cls.tones.items()})
+        Tunings.clear()
+
+
+class Tuning(NamedTuple):
+    """
+    Equal division of a period
+    --------------------------
+        - number of divisions and the period they divide (2.0 for
+        an octave, 3.0 for a tritave)
+        - interval between neighbouring positions
+        - natural system size
+        - ratio of every division, period**(k / divisions) for
+        k = 1 ... divisions (the last is the period itself)
+    """
+    divisions: int
+    period: float
+    step: float
+    size: int
+    ratios: np.ndarray
+
+
+class Tunings:
+    """
+    Registry of tunings, generated on demand
+    -----------------------------------------
+        - Besides the named systems (see Systems), any equal division
+    of any period is a tuning: '19edo' divides the octave into 19,
+    '13edt' the tritave into 13 and '7ed1.5' the fifth (3/2) into 7,
+    so new systems need no code at all
+
+        - A tuning is computed once and then kept by its divisions and
+    period (so 'semi_tone' and '12edo' share one), its ratio vector is
+    read only. Tunings are evicted least recently used first once
+    their ratio vectors exceed the memory bound
+    """
+    # sets the memory bound of the ratio vectors in bytes
+    _max_bytes: int = 64 * 2**20
+    # sets the largest number of divisions of a period
+    _max_divisions: int = 10**4
+
+    periods: Dict[str, float] = {'o': 2.0, 't': 3.0}
+    pattern = re.compile(r'^(\d+)ed(o|t|\d+(?:\.\d+)?)$')
+
+    __cache: 'OrderedDict[Tuple[int, float], Tuning]' = OrderedDict()
+    __bytes: int = 0
+    __lock = threading.Lock()
+
+    @classmethod
+    def update_max_bytes(cls, max_bytes: int):
+        cls._max_bytes = max_bytes
+        with cls.__lock:
+            cls.__evict()
+
+    @staticmethod
+    def natural_size(divisions: int) -> int:
+        # positions of the system over 8 periods
+        return (divisions - 1) * 8
+
+    @classmethod
+    def parse(cls, name: str) -> Tuple[int, float]:
+
+        """
+        Divisions and period a tuning name stands for
+        ---------------------------------------------
+        Receives:
+            - name of a system ('semi_tone') or of an equal division
+            ('19edo', '13edt', '7ed1.5')
+        Returns:
+            - number of divisions and period, raises ValueError on
+            anything else
+        """
+        if name in Systems.tones:
+            return Systems.tones[name], 2.0
+
+        match = cls.pattern.match(str(name).strip().lower())
+        if match is None:
+            raise ValueError(f"unknown tuning: {name}")
+        divisions = int(match.group(1))
+        period = cls.periods.get(match.group(2)) or float(match.group(2))
+        if not 0 < divisions <= cls._max_divisions or period <= 1:
+            raise ValueError(f"unsupported tuning: {name}")
+
+        return divisions, period
+
+    @classmethod
+    def valid(cls, name: str) -> bool:
+        try:
+            cls.parse(name)
+        except ValueError:
+            return False
+        return True
+
+    @classmethod
+    def get(cls, name: str) -> Tuning:
+
+        """
+        Tuning of a name, computed on first use
+        ---------------------------------------
+        """
+        divisions, period = cls.parse(name)
+        key = (divisions, period)
+
+        with cls.__lock:
+            tuning = cls.__cache.get(key)
+            if tuning is not None:
+                cls.__cache.move_to_end(key)
+                return tuning
+
+        ratios = np.arange(1, divisions + 1, dtype=np.float64)
+        ratios /= divisions
+        np.power(period, ratios, out=ratios)
+        ratios.flags.writeable = False
+        tuning = Tuning(divisions, period, period**(1 / divisions), cls.natural_size(divisions), ratios)
+
+        with cls.__lock:
+            if key not in cls.__cache:
+                cls.__cache[key] = tuning
+                cls.__bytes += ratios.nbytes
+                cls.__evict()
+            return tuning
+
+    @classmethod
+    def __evict(cls):
+        # the tuning just added is never evicted
+        while cls.__bytes > cls._max_bytes and len(cls.__cache) > 1:
+            _, tuning = cls.__cache.popitem(last=False)
+            cls.__bytes -= tuning.ratios.nbytes
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__cache.clear()
+            cls.__bytes = 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls.__lock:
+            return {'entries': len(cls.__cache), 'bytes': cls.__bytes, 'limit': cls._max_bytes}
+
+# tables of the default base
+Systems.update_system_base(Systems.base)
+
+class Lattice(NamedTuple):
+    """
+    Just intonation pitch set of a prime limit
+    ------------------------------------------
+        - primes of the lattice (the period's own prime is left out)
+        - exponent of every prime for every ratio, one row per ratio
+        - number of periods taken off every ratio, so a ratio is
+        prod(primes**exponents) / period**periods
+        - ratios within one period, sorted from 1 upwards
+        - the same ratios in cents
+    """
+    primes: np.ndarray
+    exponents: np.ndarray
+    periods: np.ndarray
+    ratios: np.ndarray
+    cents: np.ndarray
 
 class Network:
     """
@@ -234,7 +359,26 @@ class Network:
         - make_overtone series:
             - builds system according harmonic series
                 and is factored towards just intonation
+
+    octave_array, system_array and overtone_array build the same
+    systems as NumPy arrays in a single vectorized pass, so systems
+    of millions of positions are cheap to generate and slice. The
+    make_* networks are thin list and dict views of them
+
+    lattice builds p-limit just intonation pitch sets from bounds on
+    the exponent of every prime, and just_array lays them out over
+    any number of periods
     """
+    @staticmethod
+    def octave_array(hz: float, n_octaves: int) -> np.ndarray:
+
+        """
+        Generates Frequences Octaves apart for n Octaves as an array
+        ------------------------------------------------------------
+        """
+        # powers of two are exact, so every octave is exact
+        return hz * np.exp2(np.arange(n_octaves + 1, dtype=np.float64))
+
     @staticmethod
     def make_octaves(hz: float, n_octaves: int) -> List[float]:
 
@@ -242,34 +386,42 @@ class Network:
         Generates Frequences Octaves apart for n Octaves
         ------------------------------------------------
         """
-        # set a container to collect freqs
-        octaves = [hz] 
-        # begin with initializing freq
-        curr_octave = hz
-        for _ in range(n_octaves):
-            # iterate through delcared octaves
-            octave = curr_octave * 2.0
-            # generate the next ocatve and collect
-            octaves.append(octave)
-            curr_octave = octave
-        
-        return octaves
+        return Network.octave_array(hz=hz, n_octaves=n_octaves).tolist()
 
     @staticmethod
     def make_octave_interval_system(tone_intvl: str) -> Dict[str, float]:
         """
         Generates Divisions of the Octave
         ---------------------------------
-        Provides floats representing the size of each interval
+        Provides floats representing the size of each interval,
+        from the ratio vector of the tuning registry
         """
-        # set container for ocatve based system
-        interval_system ={}
-        # iterate through number of divisions
-        for tone in range(Systems.tones[tone_intvl]):
-            # set interval
-            interval_system[f"0-{tone}"] = (2**(tone+1))**(1/Systems.tones[tone_intvl])
+        ratios = Tunings.get(tone_intvl).ratios
 
-        return interval_system
+        return {f"0-{tone}": ratio for tone, ratio in enumerate(ratios.tolist())}
+
+    @staticmethod
+    def system_array(hz: float, system_type: float, system_size: int,
+                        start: int=0) -> np.ndarray:
+        """
+        Generate Musical System as an array
+        -----------------------------------
+        Recieves:
+            - starting Hz
+            - interval between neighbouring positions
+            - number of positions
+            - first position (to build a slice of a larger system)
+        Returns:
+            - float64 array of every freq at its position in the system,
+            hz * system_type**pos at full precision
+        """
+        # each freq is the original hz multiplied by
+        # the position set as the power of the system type
+        system = np.arange(start, start + system_size, dtype=np.float64)
+        np.power(float(system_type), system, out=system)
+        system *= hz
+
+        return system
 
     @staticmethod
     def make_system(hz: float, system_type: float, 
@@ -279,17 +431,24 @@ class Network:
         -----------------------
         Provides floats for every freq at its respective position in the system
         """
-        # set container for system
-        system = {}
-        # iterate through the system size
-        for pos in range(system_size):
-            # set each freq position 
-            freq = hz * (system_type)**pos 
-            # each freq is generated by multiplying the original hz
-            # by the position set as the power of the system type
-            system[f"freq_{pos}"] = round(freq, 2)
+        system = Network.system_array(hz=hz, system_type=system_type, system_size=system_size)
 
-        return system
+        return {f"freq_{pos}": freq for pos, freq in enumerate(system.tolist())}
+
+    @staticmethod
+    def overtone_array(hz: float, system_size: RANGE=range(0,16)) -> np.ndarray:
+        """
+        Generates Overtone Series in Just Intonation as an array
+        --------------------------------------------------------
+        """
+        # every partial position multiplied by the starting frequency,
+        # ranges are built directly, any other iterable of positions is listed
+        if isinstance(system_size, range):
+            partials = np.arange(system_size.start, system_size.stop, system_size.step, dtype=np.float64)
+        else:
+            partials = np.asarray(list(system_size), dtype=np.float64)
+
+        return hz * partials
 
     @staticmethod
     def make_overtone_series(hz: float, system_size: RANGE=range(0,16)) -> List[float]:
@@ -297,31 +456,109 @@ class Network:
         Generates Overtone Series in Just Intonation
         --------------------------------------------
         """
-        overtone_series = []
-        for pos in system_size:
-            # iterate through system size, a defaulted at the first 16 partials
-            # multiple position by the starting frequency
-            harmonic = pos * hz
-            overtone_series.append(harmonic)
-
-        return overtone_series
+        return Network.overtone_array(hz=hz, system_size=system_size).tolist()
 
     @staticmethod
-    def make_just_series(hz: float) -> List[float]:
+    def make_just_series(hz: float, just_system: Dict[str, float]=None) -> List[float]:
 
         """
         Generates Single Ocatve System of Just Intonation
         -------------------------------------------------
+        Recieves:
+            - starting Hz
+            - table of just intervals (defaults to Systems.fiveLimit_Stnrd)
+        Returns:
+            - the starting Hz multiplied by every interval of the table
+        """
+        just_system = Systems.fiveLimit_Stnrd if just_system is None else just_system
+
+        return (hz * np.fromiter(just_system.values(), dtype=np.float64)).tolist()
+
+    @staticmethod
+    def primes(limit: int) -> np.ndarray:
+
+        """
+        Generates every prime up to a limit
+        -----------------------------------
+        """
+        sieve = np.ones(max(limit + 1, 2), dtype=bool)
+        sieve[:2] = False
+        for n in range(2, int(limit**0.5) + 1):
+            if sieve[n]:
+                sieve[n * n::n] = False
+
+        return np.flatnonzero(sieve)
+
+    @staticmethod
+    def lattice(limit: int=5, bounds: Union[int, Dict[int, int]]=2, period: float=2.0,
+                tolerance: float=1e-6) -> Lattice:
+
         """
+        Generates a p-limit Just Intonation Lattice
+        -------------------------------------------
+        Recieves:
+            - prime limit (5 for 5-limit, 7 for 7-limit ...)
+            - largest exponent of every prime, the same for all of
+            them or by prime ({3: 4, 5: 2}), a prime bound to 0 is
+            left out
+            - period the ratios are reduced into (2.0 for the octave)
+            - ratios closer than the tolerance (in cents) are one ratio
+        Returns:
+            - Lattice of every ratio prod(prime**exponent) for
+            exponents in [-bound, bound], reduced into [1, period),
+            only 1/1 when no prime is left
+
+        Every exponent combination is laid out at once by broadcasting,
+        reduced, deduplicated and sorted in the log domain, so lattices
+        of tens of thousands of ratios take milliseconds
+        """
+        log_period = np.log2(period)
+        primes = Network.primes(limit)
+        # the period's own prime only moves ratios by whole periods
+        primes = primes[np.abs(log_period / np.log2(primes) - np.round(log_period / np.log2(primes))) > 1e-12]
+        spans = np.array([bounds.get(int(prime), 0) if isinstance(bounds, dict) else bounds
+                            for prime in primes], dtype=np.int64)
+        primes = primes[spans > 0]
+        spans = spans[spans > 0]
+        if not len(primes):
+            # nothing left to combine, only the unison
+            return Lattice(primes, np.zeros((1, 0), dtype=np.int64), np.zeros(1, dtype=np.int64),
+                            np.ones(1), np.zeros(1))
+
+        # one column per combination of exponents, one row per prime
+        exponents = np.indices(tuple(2 * spans + 1)).reshape(len(spans), -1).T - spans
+        logs = exponents @ np.log2(primes.astype(np.float64))
+
+        # reduced into one period, then sorted
+        periods = np.floor_divide(logs, log_period)
+        logs -= periods * log_period
+        order = np.argsort(logs, kind='stable')
+        logs, exponents, periods = logs[order], exponents[order], periods[order]
+
+        # the first of every run of ratios within the tolerance is kept
+        keep = np.ones(len(logs), dtype=bool)
+        keep[1:] = np.diff(logs) * 1200 > tolerance
+        logs, exponents, periods = logs[keep], exponents[keep], periods[keep]
+
+        return Lattice(primes, exponents, periods.astype(np.int64), np.exp2(logs), logs * 1200)
 
-        just_series = []
+    @staticmethod
+    def just_array(hz: float, lattice: Lattice, n_periods: int=1, period: float=2.0) -> np.ndarray:
 
-        for ii, intvl in Systems.fiveLimitIntvl.items():
-            # iterate through five limit system intervals
-            # multiple the base frequency by the interval
-            just_series.append(hz*intvl)
+        """
+        Generates Just Intonation frequencies of a Lattice as an array
+        ---------------------------------------------------------------
+        Recieves:
+            - starting Hz
+            - lattice of ratios within one period
+            - number of periods
+            - period the lattice was reduced into
+        Returns:
+            - float64 array of every ratio of every period, ascending
+        """
+        periods = np.power(period, np.arange(n_periods, dtype=np.float64))
 
-        return just_series
+        return hz * (periods[:, None] * lattice.ratios).ravel()
 
 # ~ ~ ~ ~ ~ ~ Pitch Utils ~ ~ ~ ~ ~ ~ ~ #
 class Transform:
@@ -456,10 +693,26 @@ class Transform:
                         8: 7902.13}                  
                 }
 
+class Pitches(NamedTuple):
+    """
+    Nearest equal tempered pitch of every frequency of an array
+    ------------------------------------------------------------
+        - pitch class index into Detect.name (-1 where the
+    frequency is not positive)
+        - octave number
+        - cent offset of the frequency from that pitch
+    """
+    pitch_class: np.ndarray
+    octave: np.ndarray
+    cents: np.ndarray
+
+
 class Detect:
     """
     Detect Object algorthimcally detects nearest pitch and cent offset
     ------------------------------------------------------------------
+        - The object works on a single frequency, the static
+    detect and names work on whole arrays of frequencies at once
     """
     # set equal temperment 
     # set relation between A4 and C0
@@ -495,20 +748,63 @@ class Detect:
     def end_freq(self, end_freq):
         self.__end_feq = end_freq
 
+    @staticmethod
+    def detect(freqs: Union[float, np.ndarray]) -> Pitches:
+        """
+        Detects pitch, octave and cent offset of an array of Hz
+        -------------------------------------------------------
+        Recieves:
+            - array of frequencies (any shape)
+        Returns:
+            - Pitches of arrays the shape of the frequencies, computed
+            directly from log2 relative to C0
+        """
+        freqs = np.asarray(freqs, dtype=np.float64)
+        # nan, inf and anything not above 0 hz have no pitch
+        valid = np.isfinite(freqs) & (freqs > 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # position in semi tones above C0
+            h = np.where(valid, 12 * np.log2(freqs / Detect.C0), 0)
+
+        nearest = np.rint(h)
+        # cents are hundredths of the semi tone to the nearest pitch
+        cents = np.where(valid, 100 * (h - nearest), np.nan)
+        octave, pitch_class = np.divmod(nearest.astype(np.int64), 12)
+
+        return Pitches(pitch_class=np.where(valid, pitch_class, -1), octave=octave, cents=cents)
+
+    @staticmethod
+    def names(pitch_class: np.ndarray, octave: np.ndarray) -> np.ndarray:
+        """
+        Names detected pitches
+        ----------------------
+        Only needed for display, detection itself never builds strings
+        """
+        pitch_class = np.asarray(pitch_class)
+        names = np.char.add(np.array(Detect.name)[pitch_class], np.asarray(octave).astype(str))
+
+        return np.where(pitch_class < 0, '', names)
+
     def closest_pitch(self)-> str:
         """
         Detects pitch and octave closest to Hz
         --------------------------------------
         Pitches are in relation to wester equal temperment 12 tone system
         """
-        # detect pitch index
-        h = round(12*log2(self.freq/Detect.C0))
-        # detect octave
-        octave = h // 12
-        # detect pitch name index from pitch name list
-        n = h % 12
+        pitches = self.__pitch()
+
+        return f"{Detect.name[pitches.pitch_class]}{pitches.octave}"
+
+    def __pitch(self) -> Pitches:
+
+        # detect marks frequencies without a pitch with class -1,
+        # which would otherwise index the last name
+        pitches = Detect.detect(self.freq)
+        if pitches.pitch_class < 0:
+            raise ValueError(f"no pitch for a non-positive or non-finite frequency: {self.freq}")
 
-        return f"{Detect.name[n]}{str(octave)}"
+        return pitches
 
     def find_cent_diff(self, freq_: float=None)-> float:
         """
@@ -530,13 +826,8 @@ class Detect:
         Detects cent difference between hz and closest pitch
         ----------------------------------------------------
         """
-        # detect closest pitch
-        f = self.closest_pitch()
-        # if pitch is a natural pitch
-        if len(f) == 2:
-            diff = self.find_cent_diff(freq_=Transform.pitch_to_hz[f[0]][int(f[1])])
-        # if pitch is a sharp
-        elif len(f) == 3:
-            diff = self.find_cent_diff(freq_=Transform.pitch_to_hz[f[0:2]][int(f[2])])
-        
-        return f, diff
\ No newline at end of file
+        # the offset falls out of the same log2 as the pitch
+        pitches = self.__pitch()
+        f = f"{Detect.name[pitches.pitch_class]}{pitches.octave}"
+        # adding 0.0 turns -0.0 into 0.0
+        return f, round(float(pitches.cents), 2) + 0.0
\ No newline at end of file
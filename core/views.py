@@ -0,0 +1,314 @@
+from core import (io, np, figure, List, Dict, Tuple, Callable, Iterator, Wav, Archive,
+                    RenderConfig, RENDER_CACHE)
+
+# ~ ~ ~ ~ ~ ~ View Utils ~ ~ ~ ~ ~ ~ ~ #
+
+class Views:
+    """
+    Views object draws full length waveforms and spectrograms
+    ---------------------------------------------------------
+        - A screen is only a few hundred pixels wide, so long signals
+    are decimated to the minimum and maximum of every pixel column
+    (min/max envelope). Unlike plain striding, no peak is ever lost
+
+        - Notes are rendered in blocks of 'stream_chunk' samples and
+    folded into the envelope block by block, and whole systems one
+    block of notes at a time, so a view never holds the full signal
+
+        - Spectrograms come from a chunked STFT, the power of every
+    frame is pooled into its pixel column as soon as it is computed
+
+        - Views are drawn as PNG images cached in RENDER_CACHE, or
+    handed to a Dash graph as the decimated points only
+    """
+    # sets the size of a view in pixels
+    _width: int = 1000
+    _height: int = 300
+    # sets the STFT frame and hop of spectrograms
+    _n_fft: int = 2048
+    _hop: int = 512
+
+    views = ('waveform', 'system', 'spectrogram')
+
+    @classmethod
+    def update_size(cls, width: int, height: int):
+        cls._width = width
+        cls._height = height
+
+    @classmethod
+    def update_stft(cls, n_fft: int, hop: int):
+        cls._n_fft = n_fft
+        cls._hop = hop
+
+    @staticmethod
+    def bin_edges(n_samples: int, width: int) -> np.ndarray:
+
+        """
+        Splits n samples into width contiguous columns
+        ----------------------------------------------
+        Returns:
+            - width + 1 edges, strictly increasing while width <= n_samples
+        """
+        return np.arange(width + 1, dtype=np.int64) * n_samples // width
+
+    @staticmethod
+    def envelope(samples: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Decimates samples to their min/max envelope
+        -------------------------------------------
+        Receives:
+            - samples, the last axis is decimated
+            - number of columns
+        Returns:
+            - minimum and maximum of every column
+        """
+        samples = np.asarray(samples)
+        edges = Views.bin_edges(samples.shape[-1], min(width, samples.shape[-1]))[:-1]
+
+        return (np.minimum.reduceat(samples, edges, axis=-1),
+                np.maximum.reduceat(samples, edges, axis=-1))
+
+    @staticmethod
+    def _fold(reduce: np.ufunc, out: np.ndarray, edges: np.ndarray,
+                block: np.ndarray, start: int):
+
+        """
+        Folds a block of samples into the columns it overlaps
+        -----------------------------------------------------
+        Receives:
+            - np.minimum or np.maximum
+            - columns so far (last axis)
+            - edges of the columns
+            - block of samples starting at sample 'start'
+        """
+        stop = start + block.shape[-1]
+        first = np.searchsorted(edges, start, side='right') - 1
+        last = np.searchsorted(edges, stop - 1, side='right') - 1
+        local = np.maximum(edges[first:last + 1], start) - start
+        columns = out[..., first:last + 1]
+        reduce(columns, reduce.reduceat(block, local, axis=-1), out=columns)
+
+    @staticmethod
+    def _preview(config: RenderConfig=None) -> RenderConfig:
+
+        """
+        Config waveforms are drawn from
+        -------------------------------
+        float32 synthesis of the wrapped phase is indistinguishable
+        at the resolution of a view and renders twice as fast
+        """
+        config = Wav.default_config() if config is None else config
+        return config._replace(precision='float32')
+
+    @staticmethod
+    def _blocks(wav: Wav, wav_type: str, n_samples: int,
+                chunk: int) -> Iterator[Tuple[int, np.ndarray]]:
+
+        for start in range(0, n_samples, chunk):
+            yield start, wav.window(wav_type, start, min(start + chunk, n_samples))
+
+    @classmethod
+    def note_envelope(cls, hz: float, wav_type: str, config: RenderConfig=None,
+                        width: int=None) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Min/max envelope of a whole note
+        --------------------------------
+        Receives:
+            - frequency and wav form type
+            - render config (defaults to the class settings)
+            - number of columns
+        Returns:
+            - minimum and maximum of every column, only one block
+            of samples is ever rendered at a time
+        """
+        config = cls._preview(config)
+        width = min(cls._width if width is None else width, config.n_samples)
+        edges = cls.bin_edges(config.n_samples, width)
+        lo, hi = np.full(width, np.inf), np.full(width, -np.inf)
+
+        for start, block in cls._blocks(Wav(hz, config=config), wav_type, config.n_samples,
+                                        config.stream_chunk):
+            cls._fold(np.minimum, lo, edges, block, start)
+            cls._fold(np.maximum, hi, edges, block, start)
+
+        return lo, hi
+
+    @classmethod
+    def system_envelope(cls, freqs: List[float], wav_type: str, config: RenderConfig=None,
+                        width: int=None) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Min/max envelope of every note of a system played in turn
+        ----------------------------------------------------------
+        Receives:
+            - frequencies of the system
+            - wav form type
+            - render config (defaults to the class settings)
+            - number of columns over the whole system
+        Returns:
+            - minimum and maximum of every column, every note gets
+            an equal share of the columns (at least one)
+        """
+        if not len(freqs):
+            raise ValueError("a system view needs at least one note")
+
+        config = cls._preview(config)
+        per_note = max(1, min((cls._width if width is None else width) // len(freqs), config.n_samples))
+        lo = np.empty((len(freqs), per_note))
+        hi = np.empty((len(freqs), per_note))
+
+        # blocks of notes from the same renderer as the sample packs
+        for rows, block in Wav.iter_system(freqs=freqs, wav_type=wav_type, config=config):
+            lo[rows], hi[rows] = cls.envelope(block, per_note)
+
+        return lo.ravel(), hi.ravel()
+
+    @classmethod
+    def spectrogram(cls, hz: float, wav_type: str, config: RenderConfig=None, width: int=None,
+                    height: int=None, n_fft: int=None,
+                    hop: int=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+        """
+        Spectrogram of a whole note from a chunked STFT
+        -----------------------------------------------
+        Receives:
+            - frequency and wav form type
+            - render config (defaults to the class settings)
+            - number of time columns and of frequency rows
+            - STFT frame size and hop in samples
+        Returns:
+            - start time of every column, top frequency of every row
+            and the (height, width) power in dB below the peak, the
+            frames of a column are pooled by their maximum
+        """
+        config = Wav.default_config() if config is None else config
+        n_fft = cls._n_fft if n_fft is None else n_fft
+        hop = cls._hop if hop is None else hop
+        n_fft = min(n_fft, config.n_samples)
+
+        n_frames = 1 + (config.n_samples - n_fft) // hop
+        n_bins = n_fft // 2 + 1
+        width = min(cls._width if width is None else width, n_frames)
+        height = min(cls._height if height is None else height, n_bins)
+        columns, rows = cls.bin_edges(n_frames, width), cls.bin_edges(n_bins, height)
+        power = np.zeros((height, width))
+
+        wav = Wav(hz, config=config)
+        taper = np.hanning(n_fft)
+        block_frames = max(1, config.stream_chunk // hop)
+        for first in range(0, n_frames, block_frames):
+            count = min(block_frames, n_frames - first)
+            samples = wav.window(wav_type, first * hop, first * hop + (count - 1) * hop + n_fft)
+            # overlapping frames are views into the block
+            frames = np.lib.stride_tricks.as_strided(samples, shape=(count, n_fft),
+                                                        strides=(hop * samples.strides[0], samples.strides[0]),
+                                                        writeable=False)
+            spectrum = np.abs(np.fft.rfft(frames * taper, axis=1))**2
+            # pooled into frequency rows, then into the time columns of the block
+            pooled = np.maximum.reduceat(spectrum, rows[:-1], axis=1).T
+            cls._fold(np.maximum, power, columns, pooled, first)
+
+        with np.errstate(divide='ignore'):
+            db = 10 * np.log10(power / power.max()) if power.max() > 0 else np.zeros_like(power)
+
+        return (columns[:-1] * hop / config.sr, rows[1:] * config.sr / n_fft,
+                np.maximum(db, -120.0))
+
+    @classmethod
+    def graph(cls, lo: np.ndarray, hi: np.ndarray, duration: float, title: str='') -> Dict:
+
+        """
+        Dash graph figure of an envelope
+        --------------------------------
+        Receives:
+            - minimum and maximum of every column
+            - duration the columns span in seconds
+            - title of the graph
+        Returns:
+            - figure holding only the decimated points, the band
+            between minimum and maximum is filled
+        """
+        t = np.linspace(0, duration, len(lo), endpoint=False).round(6).tolist()
+        line = {'color': 'red', 'width': 1}
+
+        return {
+            'data': [
+                {'x': t, 'y': hi.tolist(), 'mode': 'lines', 'line': line, 'name': 'max'},
+                {'x': t, 'y': lo.tolist(), 'mode': 'lines', 'line': line, 'name': 'min',
+                    'fill': 'tonexty', 'fillcolor': 'rgba(255, 0, 0, 0.5)'}
+            ],
+            'layout': {
+                'title': title, 'showlegend': False, 'height': cls._height,
+                'paper_bgcolor': 'black', 'plot_bgcolor': 'black', 'font': {'color': 'white'},
+                'xaxis': {'title': 'seconds'}, 'yaxis': {'range': [-1.1, 1.1]},
+                'margin': {'l': 40, 'r': 10, 't': 40, 'b': 40}
+            }
+        }
+
+    @classmethod
+    def _png(cls, draw: Callable, width: int, height: int) -> bytes:
+
+        """
+        Draws a figure straight to PNG bytes
+        ------------------------------------
+        """
+        fig = figure()(figsize=(width / 100, height / 100), dpi=100, facecolor='black')
+        ax = fig.add_subplot()
+        ax.set_facecolor('black')
+        ax.tick_params(colors='white')
+        draw(ax)
+        fig.tight_layout()
+        png = io.BytesIO()
+        fig.savefig(png, format='png', facecolor='black')
+
+        return png.getvalue()
+
+    @classmethod
+    def render(cls, view: str, freqs: List[float], wav_type: str, config: RenderConfig=None,
+                width: int=None, height: int=None) -> bytes:
+
+        """
+        Renders a view as a PNG image
+        -----------------------------
+        Receives:
+            - 'waveform' or 'spectrogram' of the first note, or
+            'system' for the waveform of every note in turn
+            - frequencies of the system
+            - wav form type
+            - render config (defaults to the class settings)
+            - size of the image in pixels
+        Returns:
+            - PNG bytes, cached by the content of the view (raises
+            ValueError on an unknown view or an empty system)
+        """
+        if view not in cls.views:
+            raise ValueError(f"unknown view: {view}")
+        if not len(freqs):
+            raise ValueError("a view needs at least one note")
+
+        config = Wav.default_config() if config is None else config
+        width = cls._width if width is None else width
+        height = cls._height if height is None else height
+        notes = freqs if view == 'system' else freqs[:1]
+        key = RENDER_CACHE.key(kind='view', view=view, width=width, height=height,
+                                notes=[Archive.note_key(freq, wav_type, config) for freq in notes])
+
+        def draw() -> bytes:
+            duration = config.duration * len(notes)
+            if view == 'spectrogram':
+                t, f, db = cls.spectrogram(notes[0], wav_type, config, width=width, height=height)
+                return cls._png(lambda ax: ax.imshow(db, origin='lower', aspect='auto', cmap='magma',
+                                                        extent=(0, config.duration, 0, f[-1])),
+                                width, height)
+
+            if view == 'system':
+                lo, hi = cls.system_envelope(notes, wav_type, config, width=width)
+            else:
+                lo, hi = cls.note_envelope(notes[0], wav_type, config, width=width)
+            t = np.linspace(0, duration, len(lo), endpoint=False)
+            return cls._png(lambda ax: ax.fill_between(t, lo, hi, color='red', linewidth=0.5),
+                            width, height)
+
+        return RENDER_CACHE.get_or_render(key, draw)
@@ -0,0 +1,14 @@
+# web utilities
+from flask import Flask, Response, request, jsonify, abort, send_from_directory, stream_with_context
+from werkzeug.wsgi import wrap_file
+import dash
+# application and server
+server = Flask(__name__)
+server.config['SECRET_KEY'] = 'pitchcraftsourcery'
+server.config.from_object(__name__)
+external_style_sheet = ['https://codepen.io/chriddyp/pen/dZVMbK.css']
+APP = dash.Dash(__name__, server=server, external_stylesheets=external_style_sheet)
+# application pages, routes and callbacks
+from core.layout import *
+from core.routes import *
+from core.callbacks import *
@@ -0,0 +1,16 @@
+# gunicorn settings (gunicorn -c gunicorn.conf.py app:server)
+
+# the master imports the application once and every worker forks
+# from it warm, sharing the imported modules copy on write
+preload_app = True
+
+# render jobs and streamed packs run on threads,
+# numpy releases the GIL in its kernels
+worker_class = 'gthread'
+threads = 4
+
+# a single worker process: render jobs (core.jobs.JOBS) live in the
+# memory of the process they were submitted to, with more workers a
+# poll, event stream or result served by another one would 404.
+# Set explicitly, as hosts may default to more (WEB_CONCURRENCY)
+workers = 1
@@ -0,0 +1,97 @@
+"""
+Headless entry point
+--------------------
+Renders a sample pack without the web application, neither
+Flask, Dash nor matplotlib are ever imported
+
+    python headless.py --hz 440 --system semi_tone --size 12 --form sine --out pack.zip
+    python headless.py --hz 440 --system semi_tone --size 12 --form sine --directory sample_packages
+    python headless.py --manifest catalogue.yaml [--root catalogue] [--keep-notes]
+
+A manifest renders a whole catalogue of packs in one run, sharing
+their notes and skipping the packs already written (see Batch)
+"""
+import argparse
+from core import os, zipfile, util, Hz, Wav, Pack, Archive, Instrument, Modulation, Batch
+
+
+def render(hz: float, system: str, size: int, form: str, out: str=None,
+            directory: str=None, workers: int=None, modulation: str='none',
+            adsr: tuple=(0.0, 0.0, 1.0, 0.0), loop: bool=False, layout: str='files') -> str:
+
+    """
+    Renders one sample pack
+    -----------------------
+    Receives:
+        - starting hz, interval system, system size and wav form
+        - zip file to stream the pack into, or
+        - directory to write the wav files into (rendered by a process pool)
+        - number of worker processes
+        - modulation and ADSR envelope of the notes
+        - boolean switch to render every note as a single loop
+        - 'files' for a wav file per note, 'instrument' for a single
+        wav file with its index and SFZ mapping
+    Returns:
+        - path of the zip file or of the directory
+    """
+    attack, decay, sustain, release = Modulation.check_adsr(*adsr)
+    config = Wav.default_config()._replace(tone_intvl=system, modulation=modulation, attack=attack,
+                                            decay=decay, sustain=sustain, release=release, loop=loop)
+    hz = Wav.check_hz(hz, config.sr)
+    freqs = Hz(hz=hz, config=config).system_array(system_size=size).tolist()
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+        write = Instrument.write if layout == 'instrument' else Pack.render
+        write(freqs, form, directory=directory, workers=workers, config=config)
+        return directory
+
+    entries = (Instrument.entries if layout == 'instrument' else Archive.wav_entries)(freqs, form, config)
+    with open(out, 'wb') as pack:
+        for chunk in Archive.stream_zip(entries, compression=zipfile.ZIP_STORED):
+            pack.write(chunk)
+
+    return out
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hz', type=float, default=440.0)
+    parser.add_argument('--system', default='semi_tone',
+                        help=f"one of {', '.join(util.Systems.tones)}, or any equal division "
+                                "of a period ('19edo', '13edt', '7ed1.5')")
+    parser.add_argument('--size', type=int, help='defaults to the size of the system')
+    parser.add_argument('--form', default='sine', choices=Wav.wav_types)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--out', help='zip file to write')
+    target.add_argument('--directory', help='directory to write the wav files into')
+    target.add_argument('--manifest', help='json or yaml manifest of packs to render')
+    parser.add_argument('--root', help="directory the packs of a manifest are written into "
+                                        "(defaults to its 'output')")
+    parser.add_argument('--keep-notes', action='store_true', help='keep the note store of a manifest')
+    parser.add_argument('--workers', type=int, help='worker processes (directory and manifest only)')
+    parser.add_argument('--modulation', default='none', choices=Modulation.types)
+    parser.add_argument('--adsr', type=float, nargs=4, default=(0.0, 0.0, 1.0, 0.0),
+                        metavar=('ATTACK', 'DECAY', 'SUSTAIN', 'RELEASE'))
+    parser.add_argument('--loop', action='store_true', help='render every note as a single loop')
+    parser.add_argument('--layout', default='files', choices=Archive.layouts,
+                        help='a wav file per note, or one instrument wav with an index and an SFZ file')
+    args = parser.parse_args()
+
+    if args.manifest:
+        Batch.run(Batch.load(args.manifest), root=args.root, workers=args.workers,
+                    keep_notes=args.keep_notes, log=print)
+        raise SystemExit(0)
+
+    try:
+        Modulation.check_adsr(*args.adsr)
+        Wav.check_hz(args.hz, Wav.default_config().sr)
+    except ValueError as error:
+        parser.error(str(error))
+    if not util.Tunings.valid(args.system):
+        parser.error(f"unknown system: {args.system}")
+    size = util.Tunings.get(args.system).size if args.size is None else args.size
+    print(render(hz=args.hz, system=args.system, size=size, form=args.form, out=args.out,
+                    directory=args.directory, workers=args.workers, modulation=args.modulation,
+                    adsr=tuple(args.adsr), loop=args.loop, layout=args.layout))
@@ -0,0 +1,25 @@
+import os
+from core import Hz, Wav, Pack, Archive
+
+CONFIG = Wav.default_config()._replace(duration=0.01)
+
+
+def dense():
+    # 10000edo notes are about a thousandth of a hz apart at 20 hz
+    return Hz(20.0, config=CONFIG._replace(tone_intvl='10000edo')).system_array(300).tolist()
+
+
+def test_dense_tuning_entries_are_unique():
+    names = [name for name, _, _ in Archive.wav_entries(dense(), 'sine', CONFIG, notes=lambda freq: b'')]
+    assert len(set(names)) == len(names) == 300
+
+
+def test_dense_tuning_files_are_not_overwritten(tmp_path):
+    paths = Pack.render(dense(), 'sine', directory=str(tmp_path), workers=1, config=CONFIG)
+    assert len(os.listdir(tmp_path)) == len(set(paths)) == 300
+
+
+def test_names_keep_hundredths_of_a_hz():
+    freqs = Hz(440.0, config=CONFIG).system_array(3).tolist()
+    names = [name for name, _, _ in Archive.wav_entries(freqs, 'sine', CONFIG, notes=lambda freq: b'')]
+    assert names == ['simple_440.0_sine.wav', 'simple_466.16_sine.wav', 'simple_493.88_sine.wav']
@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+import pytest
+import core.cache
+from core import RenderCache, Archive, Wav, Wavetable
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    RenderCache(directory=str(tmp_path)).put('key', b'pack')
+    assert RenderCache(memory_bytes=0, directory=str(tmp_path)).get('key') == b'pack'
+
+
+def test_stale_scratch_files_are_swept(tmp_path):
+    stale, fresh = tmp_path / '.key.1.1', tmp_path / '.key.2.2'
+    stale.write_bytes(b'part')
+    fresh.write_bytes(b'part')
+    old = time.time() - 2 * RenderCache._stale_seconds
+    os.utime(stale, (old, old))
+
+    RenderCache(directory=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['.key.2.2']
+
+
+def test_failed_write_leaves_no_scratch_file(tmp_path, monkeypatch):
+    class Full:
+        # a disk filling up part way through the write
+        def __init__(self, path, mode):
+            self.file = open(path, mode)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.file.close()
+
+        def write(self, data):
+            self.file.write(data[:1])
+            raise OSError(28, 'No space left on device')
+
+    cache = RenderCache(memory_bytes=0, directory=str(tmp_path))
+    monkeypatch.setattr(core.cache, 'open', Full, raising=False)
+    with pytest.raises(OSError):
+        cache.put('key', b'pack')
+    assert os.listdir(tmp_path) == []
+
+
+def test_keys_are_salted_with_the_format_version(monkeypatch):
+    key = RenderCache.key(hz=440.0)
+    monkeypatch.setattr(RenderCache, '_version', RenderCache._version + 1)
+    assert RenderCache.key(hz=440.0) != key
+
+
+@pytest.mark.parametrize('setting, value', [('_table_bits', 10), ('_interpolation', 'none')])
+def test_note_keys_follow_the_wavetable(monkeypatch, setting, value):
+    config = Wav.default_config()._replace(engine='wavetable')
+    key = Archive.note_key(440.0, 'sine', config)
+    monkeypatch.setattr(Wavetable, setting, value)
+    assert Archive.note_key(440.0, 'sine', config) != key
+
+
+def test_disk_reads_do_not_hold_up_the_cache(tmp_path, monkeypatch):
+    RenderCache(directory=str(tmp_path)).put('cold', b'pack')
+    cache = RenderCache(directory=str(tmp_path))
+    cache.put('warm', b'pack')
+
+    reading, release = threading.Event(), threading.Event()
+
+    def slow(path, mode='r'):
+        # a cold read of a large pack off a slow disk
+        reading.set()
+        release.wait(5)
+        return open(path, mode)
+
+    monkeypatch.setattr(core.cache, 'open', slow, raising=False)
+    cold = threading.Thread(target=cache.get, args=('cold',))
+    cold.start()
+    reading.wait(5)
+
+    warm = []
+    lookup = threading.Thread(target=lambda: warm.append(cache.get('warm')))
+    lookup.start()
+    lookup.join(1)
+    release.set()
+    cold.join()
+    assert warm == [b'pack']
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from core import Wav, Factory, BufferPool, wavfile
+
+CONFIG = Wav.default_config()._replace(duration=0.5)
+
+
+@pytest.mark.parametrize('wav_type', ['sine', 'triangle', 'sawtooth_blep'])
+def test_stream_matches_the_carrier(wav_type):
+    wav = Wav(440.0, config=CONFIG)
+    stream = np.concatenate([block.copy() for block in wav.stream(wav_type, chunk_size=4096, pool=BufferPool())])
+    assert stream.shape == (wav.n_samples,)
+    assert np.allclose(stream, wav.carrier(wav_type), atol=1e-6)
+
+
+def test_stream_is_continuous_across_blocks():
+    wav = Wav(261.63, config=CONFIG)
+    blocks = [np.concatenate([block.copy() for block in wav.stream('sine', chunk_size=chunk_size)])
+                for chunk_size in (1000, 4096, wav.n_samples)]
+    assert np.array_equal(blocks[0], blocks[1]) and np.array_equal(blocks[0], blocks[2])
+
+
+def test_no_phase_drift_after_an_hour():
+    # 441 hz at 44.1k repeats every 100 samples, exactly
+    wav = Wav(441.0, config=CONFIG._replace(duration=3601.0))
+    hour = 3600 * wav.sr
+    assert np.allclose(wav.window('sine', start=hour, stop=hour + 200), wav.window('sine', stop=200), atol=1e-9)
+
+
+@pytest.mark.parametrize('memmap', [False, True])
+def test_stream_wav(tmp_path, memmap):
+    wav = Wav(440.0, config=CONFIG)
+    path = wav.stream_wav('sine', path=str(tmp_path / 'note.wav'), chunk_size=3000, memmap=memmap)
+    sr, data = wavfile().read(path)
+    assert (sr, data.dtype, len(data)) == (wav.sr, np.int16, wav.n_samples)
+    assert np.abs(data.astype(np.int32) - Factory._quantize(wav.carrier('sine'))).max() <= 1
@@ -0,0 +1,29 @@
+import os
+import runpy
+from core import JOBS, JobQueue
+
+
+def wait(job):
+    while True:
+        version = job.version
+        if job.finished:
+            return job
+        job.wait(version, timeout=5)
+
+
+def test_finished_job_keeps_its_result():
+    job = wait(JOBS.submit(lambda job: 'key', total=1))
+    assert (job.state, job.result, JOBS.get(job.id)) == ('done', 'key', job)
+
+
+def test_failed_job_reports_its_error():
+    def render(job):
+        raise RuntimeError('boom')
+
+    job = wait(JobQueue(workers=1).submit(render, total=1))
+    assert job.state == 'failed' and 'boom' in job.to_dict()['error']
+
+
+def test_server_runs_one_worker_process():
+    # jobs are only known to the process they were submitted to
+    assert runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))['workers'] == 1
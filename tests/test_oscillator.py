@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+from core import Wavetable
+
+
+@pytest.mark.parametrize('hz', [-1.0, np.nan, np.inf, [440.0, -np.inf]])
+def test_tuning_word_rejects_invalid_hz(hz):
+    with pytest.raises(ValueError):
+        Wavetable.tuning_word(hz, 44100)
+
+
+def test_tuning_word_of_a_column():
+    word = Wavetable.tuning_word(np.array([[0.0], [44100 / 4]]), 44100)
+    assert word.dtype == np.uint64
+    assert word.ravel().tolist() == [0, 1 << (Wavetable._phase_bits - 2)]
@@ -0,0 +1,26 @@
+import numpy as np
+import core.pack
+from core import Pack, Wav
+
+CONFIG = Wav.default_config()._replace(duration=0.1)
+FREQS = [110.0, 220.0, 330.0]
+
+
+def serial():
+    with Pack.render_pcm(FREQS, 'sine', workers=1, config=CONFIG) as pcm:
+        return pcm
+
+
+def test_shared_pack_outlives_its_context():
+    # views kept past the context must neither break the release of the block nor go stale
+    with Pack.render_pcm(FREQS, 'sine', workers=2, config=CONFIG) as pcm:
+        row = pcm[1]
+
+    assert np.array_equal(row, serial()[1])
+
+
+def test_serial_without_shared_memory(monkeypatch):
+    # python 3.7 has no multiprocessing.shared_memory
+    monkeypatch.setattr(core.pack, 'shared_memory', None)
+    with Pack.render_pcm(FREQS, 'sine', workers=2, config=CONFIG) as pcm:
+        assert np.array_equal(pcm, serial())
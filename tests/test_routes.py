@@ -0,0 +1,16 @@
+import pytest
+from core import routes, server
+
+
+@pytest.fixture
+def client():
+    return server.test_client()
+
+
+@pytest.mark.parametrize('hz', ['0', '-5', 'nan', 'inf', '-inf', '22050', '30000', 'abc'])
+def test_pack_hz_out_of_bounds(client, hz):
+    assert client.get(f"/stream/pack.zip?hz={hz}&size=2").status_code == 400
+
+
+def test_pack_hz_below_nyquist(client):
+    assert client.get('/stream/pack.zip?hz=440&size=2').status_code == 200
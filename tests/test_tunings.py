@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from core import util
+
+
+@pytest.mark.parametrize('name, divisions, period', [
+    ('semi_tone', 12, 2.0), ('19edo', 19, 2.0), ('13edt', 13, 3.0), ('7ed1.5', 7, 1.5)])
+def test_parse(name, divisions, period):
+    assert util.Tunings.parse(name) == (divisions, period)
+
+
+@pytest.mark.parametrize('name', ['', 'tone', '0edo', '12ed1', '12ed0.5', f"{10**4 + 1}edo"])
+def test_invalid_tunings(name):
+    assert not util.Tunings.valid(name)
+    with pytest.raises(ValueError):
+        util.Tunings.get(name)
+
+
+def test_tunings_are_shared_and_read_only():
+    tuning = util.Tunings.get('12edo')
+    assert util.Tunings.get('semi_tone') is tuning
+    assert np.allclose(tuning.ratios, 2 ** (np.arange(1, 13) / 12))
+    with pytest.raises(ValueError):
+        tuning.ratios[0] = 1.0
+
+
+def test_registry_is_bounded(monkeypatch):
+    util.Tunings.clear()
+    monkeypatch.setattr(util.Tunings, '_max_bytes', 1000 * 8)
+    for divisions in (600, 700, 800):
+        util.Tunings.get(f"{divisions}edo")
+    stats = util.Tunings.stats()
+    assert stats['entries'] == 1 and stats['bytes'] == 800 * 8
+    util.Tunings.clear()
+
+
+def test_dense_tunings_keep_their_notes_apart():
+    freqs = util.Network.system_array(20.0, util.Tunings.get('10000edo').step, 300)
+    assert len(np.unique(freqs)) == 300
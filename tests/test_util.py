@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from core import util
+
+
+def test_detect_known_pitches():
+    pitches = util.Detect.detect([440.0, 261.6255653005986])
+    assert util.Detect.names(pitches.pitch_class, pitches.octave).tolist() == ['A4', 'C4']
+    assert np.allclose(pitches.cents, 0, atol=1e-6)
+
+
+def test_detect_marks_frequencies_without_a_pitch():
+    pitches = util.Detect.detect([np.inf, -np.inf, np.nan, 0.0, -440.0])
+    assert pitches.pitch_class.tolist() == [-1] * 5
+    assert pitches.octave.tolist() == [0] * 5
+    assert np.isnan(pitches.cents).all()
+    assert util.Detect.names(pitches.pitch_class, pitches.octave).tolist() == [''] * 5
+
+
+@pytest.mark.parametrize('freq', [np.inf, np.nan, 0.0, -440.0])
+def test_closest_pitch_rejects_frequencies_without_a_pitch(freq):
+    with pytest.raises(ValueError):
+        util.Detect(freq).closest_pitch()
+    with pytest.raises(ValueError):
+        util.Detect(freq).find_offset_from_closet_pitch()
+